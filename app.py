@@ -1,31 +1,30 @@
+import json
+import os
+import time
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from io import BytesIO
-import smtplib
-from email.mime.text import MIMEText
-from email.utils import formatdate
-import time
-import ssl
-from smtplib import SMTPException
-import pickle  # 用于持久化存储
-import os  # 用于文件操作
-import time as time_module
-import threading
 
-if 'email_config' not in st.session_state:
-    st.session_state.email_sending = False  # 邮件发送状态
+from patent_reminder import health, profiling, scheduler, settings, table_view
+from patent_reminder.importer import UPLOAD_TYPES, ImportFormatError, import_patents
+from patent_reminder.exporter import (EXPORT_FORMATS, EXPORT_KINDS, EXPORT_MIME_TYPES, cached_export,
+                                      export_filename, export_path, sample_template)
+from patent_reminder.migrate import migrate_pickles
+from patent_reminder.dataset import get_dataset
+from patent_reminder.analytics import fee_forecast
+from patent_reminder.events import KIND_LABELS, KIND_SEND
+from patent_reminder.jobs import STATUS_LABELS, get_queue
+from patent_reminder.reminders import claim_page_reminders, run_reminders
+from patent_reminder.search import search_index
+from patent_reminder.workspaces import (DEFAULT_WORKSPACE, WorkspaceError, create_workspace,
+                                        get_workspace, workspace_names)
+
 # 邮箱配置会话状态
 if 'email_config' not in st.session_state:
-    st.session_state.email_config = {
-        "sender_email": "",
-        "sender_password": "",
-        "smtp_server": "smtp.qq.com",
-        "smtp_port": 587,
-        "receiver_email": "",
-        "email_enabled": False
-    }
+    st.session_state.email_config = dict(settings.DEFAULT_EMAIL_CONFIG)
 
 # 页面配置
 st.set_page_config(
@@ -34,34 +33,92 @@ st.set_page_config(
     layout="wide"
 )
 
-# 配置文件路径
-CONFIG_FILE = "email_config.pkl"
-DATA_FILE = "app_data.pkl"  # 数据持久化文件
-LOG_FILE = "email_log.txt"  # 邮件发送日志文件
+# 本次运行的耗时统计
+page_started = time.perf_counter()
+
+# 后台调度器：每个进程只启动一次，负责定时检查与发送，页面只读取其状态
+@st.cache_resource
+def start_scheduler():
+    migrate_pickles()  # 旧版 pickle 数据一次性导入数据库
+    return scheduler.start_background()
+
+start_scheduler()
+
+# 工作区：各客户的专利数据、邮箱配置与提醒设置互相隔离，进程内共用调度器与发送线程
+# （?workspace=名称 可直接打开指定工作区）
+def current_workspace():
+    names = workspace_names()
+    if st.session_state.get('workspace') not in names:
+        requested = st.query_params.get("workspace")
+        st.session_state.workspace = requested if requested in names else DEFAULT_WORKSPACE
+    return get_workspace(st.session_state.workspace)
+
+# 切换工作区后，会话中的设置改为从新工作区的数据库重新加载
+def reset_workspace_state():
+    st.session_state.email_config = dict(settings.DEFAULT_EMAIL_CONFIG)
+    st.session_state.reminder_days = settings.DEFAULT_REMINDER_DAYS
+    st.session_state.last_upload_time = None
+    st.session_state.pop('imported_file_id', None)
+    st.session_state.pop('last_import_report', None)
+    st.session_state.pop('export_ready', None)
+    st.query_params["workspace"] = st.session_state.workspace
+
+def add_workspace():
+    try:
+        create_workspace(st.session_state.new_workspace_name.strip())
+    except WorkspaceError as e:
+        st.session_state.workspace_error = str(e)
+        return
+    st.session_state.workspace = st.session_state.new_workspace_name.strip()
+    st.session_state.new_workspace_name = ""
+    reset_workspace_state()
+
+workspace = current_workspace()
+store = workspace.store
+
+# 兼容旧的 ?heartbeat / ?trigger_check 地址（无法访问调度器独立端口时使用）
+# 推荐直接使用调度器的 /healthz、/status、/trigger 接口，不经过页面脚本
+def handle_heartbeat():
+    """在初始化会话状态之前处理心跳/触发请求，输出 JSON 后立即停止"""
+    query_params = st.query_params
+    if "trigger_check" in query_params:
+        # 与调度器的 /trigger 相同：需要 ?token=，未配置触发令牌时一律拒绝；页面不直接发送邮件
+        if not health.token_valid(query_params.get("token")):
+            response = {"error": "forbidden"}
+        else:
+            scheduler.request_check()
+            response = {"status": "check_requested",
+                        "scheduler_alive": scheduler.is_alive(scheduler.read_status())}
+        st.code(json.dumps(response, ensure_ascii=False), language="json")
+        st.stop()
+    if "heartbeat" in query_params:
+        response = dict(health.status_payload(store), status="healthy")
+        st.code(json.dumps(response, ensure_ascii=False), language="json")
+        st.stop()
+
+handle_heartbeat()
+
+# ?profile=1 时对本次运行做函数级分析，报告显示在页面底部
+page_profiler = None
+if "profile" in st.query_params:
+    try:
+        page_profiler = profiling.RunProfiler().start()
+    except ValueError:
+        # Python 3.12 起同一时刻只能有一个 cProfile 在运行
+        st.warning("其他会话正在进行性能分析，本次运行不分析")
 
 # 初始化会话状态
-if 'patent_data' not in st.session_state:
-    st.session_state.patent_data = None  # 存储上传的专利数据
 if 'last_upload_time' not in st.session_state:
     st.session_state.last_upload_time = None  # 记录上次上传时间
-if 'reminder_sent' not in st.session_state:
-    st.session_state.reminder_sent = set()  # 记录已发送提醒的专利ID
 if 'auto_refresh' not in st.session_state:
     st.session_state.auto_refresh = True  # 自动刷新开关
 if 'reminder_days' not in st.session_state:
-    st.session_state.reminder_days = 49  # 提醒提前天数默认值
-if 'last_email_sent_time' not in st.session_state:
-    st.session_state.last_email_sent_time = None  # 上次邮件发送时间
+    st.session_state.reminder_days = settings.DEFAULT_REMINDER_DAYS  # 提醒提前天数默认值
 if 'is_first_load' not in st.session_state:
     st.session_state.is_first_load = True  # 标记首次加载
-if 'next_scheduled_send' not in st.session_state:
-    st.session_state.next_scheduled_send = None
-
-
-if 'check_count' not in st.session_state:
-    st.session_state.check_count = 0  # 总检查次数
-if 'last_check_time' not in st.session_state:
-    st.session_state.last_check_time = None  # 上次检查时间
+if 'send_jobs' not in st.session_state:
+    st.session_state.send_jobs = []  # 本会话提交的发送任务 ID
+# 检查次数、检查/发送时间由调度器维护，状态区块直接从数据库读取，不放入会话
 
 # # 邮箱配置会话状态
 # if 'email_config' not in st.session_state:
@@ -74,109 +131,35 @@ if 'last_check_time' not in st.session_state:
 #         "email_enabled": False
 #     }
     
-# 数据持久化核心函数 - 增强版
+# 数据持久化核心函数 - 从数据库加载
+@profiling.timed('page_load')
 def load_persistent_data():
-    """从本地文件加载持久化数据到session_state，增强错误处理"""
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, 'rb') as f:
-                data = pickle.load(f)
-                # 恢复专利数据
-                if 'patent_data' in data:
-                    st.session_state.patent_data = data['patent_data']
-                # 恢复上传时间
-                if 'last_upload_time' in data:
-                    st.session_state.last_upload_time = data['last_upload_time']
-                # 恢复已发送提醒记录
-                if 'reminder_sent' in data:
-                    st.session_state.reminder_sent = data['reminder_sent']
-                # 恢复提醒天数设置
-                if 'reminder_days' in data:
-                    st.session_state.reminder_days = data['reminder_days']
-                # 恢复上次邮件发送时间（增加格式验证）
-                if 'last_email_sent_time' in data:
-                    if isinstance(data['last_email_sent_time'], datetime):
-                        st.session_state.last_email_sent_time = data['last_email_sent_time']
-                    else:
-                        st.warning(f"上次发送时间:{data['last_email_sent_time']}")
-                        st.warning("上次发送时间格式无效，已重置")
-                        st.session_state.last_email_sent_time = None
-
-                if 'next_scheduled_send' in data:
-                    if isinstance(data['next_scheduled_send'], datetime):
-                        st.session_state.next_scheduled_send = data['next_scheduled_send']
-                    else:
-                        st.warning("计划发送时间格式无效，已重置")
-                        st.session_state.next_scheduled_send = datetime.now() + timedelta(minutes=4)
-                # 恢复检查次数
-                if 'check_count' in data:
-                    st.session_state.check_count = data['check_count']
-                # 恢复上次检查时间
-                if 'last_check_time' in data:
-                    if isinstance(data['last_check_time'], datetime):
-                        st.session_state.last_check_time = data['last_check_time']
-                    else:
-                        st.warning("上次检查时间格式无效，已重置")
-                        st.session_state.last_check_time = None
-        except Exception as e:
-            st.error(f"加载数据失败：{str(e)}，已重置部分数据")
-            # 仅重置有问题的时间数据，保留其他可能可用的数据
-            if not isinstance(st.session_state.last_email_sent_time, datetime):
-                st.session_state.last_email_sent_time = None
-            if not st.session_state.next_scheduled_send or not isinstance(st.session_state.next_scheduled_send, datetime):
-                st.session_state.next_scheduled_send = datetime.now()
-
-# 数据持久化核心函数 - 关键数据保存到本地文件
-def save_persistent_data():
-    """将session_state中的关键数据保存到本地文件，增强验证"""
+    """从数据库加载持久化数据到session_state，增强错误处理"""
     try:
-        # 验证时间是否有效
-        if st.session_state.last_email_sent_time and not isinstance(st.session_state.last_email_sent_time, datetime):
-            st.warning("发送时间格式错误，未保存")
-            return
-            
-        data_to_save = {
-            'patent_data': st.session_state.patent_data,
-            'last_upload_time': st.session_state.last_upload_time,
-            'reminder_sent': st.session_state.reminder_sent,
-            'reminder_days': st.session_state.reminder_days,
-            'last_email_sent_time': st.session_state.last_email_sent_time,
-            'next_scheduled_send': st.session_state.next_scheduled_send,
-            'check_count': st.session_state.check_count,
-            'last_check_time': st.session_state.last_check_time
-        }
-        with open(DATA_FILE, 'wb') as f:
-            pickle.dump(data_to_save, f)
+        app_settings = store.settings.all()
     except Exception as e:
-        st.error(f"保存数据失败：{str(e)}")
+        st.error(f"加载数据失败：{str(e)}")
+        return
+    # 恢复上传时间与提醒天数设置
+    if app_settings.get('last_upload_time'):
+        st.session_state.last_upload_time = app_settings['last_upload_time']
+    if app_settings.get('reminder_days'):
+        st.session_state.reminder_days = app_settings['reminder_days']
 
 # 加载保存的邮箱配置
 def load_email_config():
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'rb') as f:
-                config = pickle.load(f)
-                st.session_state.email_config.update(config)
-        except:
-            st.warning("加载邮箱配置失败，使用默认配置")
+    try:
+        st.session_state.email_config.update(store.load_email_config())
+    except:
+        st.warning("加载邮箱配置失败，使用默认配置")
 
 # 保存邮箱配置
 def save_email_config():
     try:
-        with open(CONFIG_FILE, 'wb') as f:
-            pickle.dump(st.session_state.email_config, f)
+        store.save_email_config(st.session_state.email_config)
         st.success("邮箱配置已保存")
     except:
         st.error("保存邮箱配置失败")
-
-# 邮件发送日志记录
-def log_email_send(success, msg):
-    """记录邮件发送日志"""
-    try:
-        with open(LOG_FILE, 'a', encoding='utf-8') as f:
-            f.write(f"[{datetime.now():%Y-%m-%d %H:%M}] 发送状态：{'成功' if success else '失败'}，信息：{msg}\n")
-    except Exception as e:
-        st.warning(f"日志记录失败：{str(e)}")
 # <script src="https://gist.github.com/xinrenleiZZY/a02fdafd48df878689d3f9c3e54e353c.js"></script>
 # 本地弹窗提醒组件
 def local_notification(message, title="提醒"):
@@ -192,183 +175,31 @@ def local_notification(message, title="提醒"):
         unsafe_allow_html=True
     )
 
-# 邮件发送功能
-def send_email_reminder(sender_email, sender_password, smtp_server, smtp_port, 
-                       receiver_email, patent_info):
-    try:
-        # 构建邮件内容
-        subject = "专利缴费提醒"
-        body = "以下专利即将到期或已过期，请及时处理：\n\n"
-        for idx, patent in patent_info.iterrows():
-            body += f"专利名称：{patent['专利名称']}\n"
-            body += f"专利号：{patent['专利号']}\n"
-            body += f"缴费截止日期：{patent['缴费截止日期'].strftime('%Y-%m-%d')}\n"
-            body += f"距离到期天数：{patent['距离到期天数']}天\n"
-            body += f"缴费金额：{patent['缴费金额']}元\n\n"
-
-        msg = MIMEText(body)
-        msg['Subject'] = subject
-        msg['From'] = sender_email
-        msg['To'] = receiver_email
-        msg['Date'] = formatdate()
-
-        context = ssl.create_default_context()
-        if smtp_port == 465:
-            with smtplib.SMTP_SSL(smtp_server, smtp_port, context=context) as server:
-                server.login(sender_email, sender_password)
-                server.send_message(msg)
-        else:
-            with smtplib.SMTP(smtp_server, smtp_port, timeout=10) as server:
-                server.starttls(context=context)
-                server.login(sender_email, sender_password)
-                server.send_message(msg)
-
-        return True, "邮件发送成功"
-    except smtplib.SMTPAuthenticationError:
-        return False, "认证失败：请检查邮箱账号或授权码是否正确"
-    except smtplib.SMTPConnectError:
-        return False, "连接失败：请检查SMTP服务器地址或端口是否正确"
-    except Exception as e:
-        return False, f"发送失败：{str(e)}"
-
-# 自动发送提醒邮件的函数（添加了4 min 1day间隔控制）
-def auto_send_reminders(patent_data):
-    if patent_data is None:
-        return False, "无专利数据可检查"
-        
-    # 获取配置
-    cfg = st.session_state.email_config
-    if not (cfg["email_enabled"] and cfg["sender_email"] and cfg["sender_password"] and cfg["receiver_email"]):
-        return False, "邮箱配置不完整或未启用"
-    
-    # 初始化计划发送时间（首次运行或过期时）
-    now = datetime.now()
-
-    if not st.session_state.next_scheduled_send or st.session_state.next_scheduled_send <= now:
-        # 计算下次发送时间（当前时间 + 4 min 1day）
-        st.session_state.next_scheduled_send = now + timedelta(minutes=4)
-        save_persistent_data()  # 保存计划时间
-    else:
-        # 未到计划时间
-        remaining = st.session_state.next_scheduled_send - now
-        remaining_minutes = int(remaining.total_seconds() // 60)
-        return False, f"未到发送时间，剩余 {remaining_minutes} 分钟"
-    
-    # 添加4 min 1day发送间隔控制
-    now = datetime.now()
-
-    last_sent = st.session_state.last_email_sent_time
-    if last_sent is not None:
-        time_diff = now - last_sent
-        if time_diff < timedelta(minutes=4):
-            remaining_hours = int((timedelta(minutes=4) - time_diff).total_seconds() // 3600)
-            return False, f"距离上次发送不足4 min 1day，剩余{remaining_hours}分钟"
-        
-    # 处理数据
-    df = st.session_state.patent_data.copy()
-    today = datetime.today().date()
-    df['距离到期天数'] = (df['缴费截止日期'] - pd.Timestamp(today)).dt.days
-    df['状态'] = df['距离到期天数'].apply(
-        lambda x: '已过期' if x < 0 else 
-        '即将到期' if x <= st.session_state.reminder_days else 
-        '正常'
-    )
-    
-    # 检查需要提醒的专利
-    reminder_patents = df[(df['状态'] == '即将到期') | (df['状态'] == '已过期')]
-    if reminder_patents.empty:
-        return True, "没有需要提醒的专利"
-        
-    # 发送邮件
-    success, msg = send_email_reminder(
-        cfg["sender_email"], cfg["sender_password"], 
-        cfg["smtp_server"], cfg["smtp_port"],
-        cfg["receiver_email"], reminder_patents
-    )
-    
-    # 记录日志
-    log_email_send(success, msg)
-    
-    # 如果发送成功，更新上次发送时间
-    if success:
-        st.session_state.last_email_sent_time = now
-        # 确保下次发送时间正确更新
-        st.session_state.next_scheduled_send = now + timedelta(minutes=4)
-        save_persistent_data()
-        
-    return success, msg
-
-# 新增：自动刷新控制函数
-def setup_auto_refresh(interval_minutes):
-    if st.session_state.auto_refresh:
-        # 使用 JavaScript 定时刷新，更稳定
-        st.markdown(f"""
-        <script>
-            setTimeout(function() {{
-                window.location.reload();
-            }}, {interval_minutes * 60 * 1000});  // 毫秒为单位
-            console.log("自动刷新已启用，间隔 {interval_minutes} 分钟");
-        </script>
-        """, unsafe_allow_html=True)
-        return True
-    return False
-
-# 新增：定时任务执行函数（带线程锁避免重复执行）
-def run_scheduled_task():
-    """执行定时任务检查并发送邮件"""
-    st.session_state.check_count += 1
-    st.session_state.last_check_time = datetime.now()
-    save_persistent_data()  # 保存检查次数和时间
-
-    if st.session_state.email_sending:
-        return False, "已有任务在执行中"
-        
-    try:
-        st.session_state.email_sending = True
-        if st.session_state.patent_data is not None:
-            return auto_send_reminders(st.session_state.patent_data)
-        return False, "无专利数据，跳过发送（本次已记录为检查）"
-    finally:
-        st.session_state.email_sending = False
-
-# 新增：基于 Streamlit 路由的心跳接口实现
-def handle_heartbeat():
-    """处理心跳检测请求，返回符合 UptimeRobot 要求的响应"""
-    # 获取当前查询参数
-    query_params = st.query_params
-     # 如果包含 trigger_check 参数，触发检查
-    if "trigger_check" in query_params:
-        # 执行检查任务
-        success, msg = run_scheduled_task()
-        # 返回检查结果
-        response = {
-            "status": "check_completed",
-            "success": success,
-            "message": msg,
-        }
-        st.markdown(f"""```json\n{response}\n```""", unsafe_allow_html=True)
-        st.stop()
-    # 如果访问路径包含 heartbeat 参数，返回心跳响应
-    if "heartbeat" in query_params:
-        st.session_state.heartbeat_counter = st.session_state.get('heartbeat_counter', 0) + 1
-        # 构建心跳响应数据
-        response = {
-            "status": "healthy",
-            "timestamp": datetime.now().isoformat(),
-            "last_data_upload": st.session_state.last_upload_time,
-            "last_email_sent": st.session_state.last_email_sent_time.isoformat() 
-                               if st.session_state.last_email_sent_time is not None else None,
-            "heartbeat_count": st.session_state.heartbeat_counter,  # 新增计数
-            "service": "patent-management-system"
-        }
-        
-        # 使用 Streamlit 的 markdown 输出纯文本 JSON，避免页面元素干扰监控
-        st.markdown(f"""```json\n{response}\n```""", unsafe_allow_html=True)
-        
-        # 强制终止后续页面渲染，确保响应简洁
-        st.stop()
+# 分页显示表格：positions 为已筛选排序的行位置，只把当前页发送到浏览器
+@profiling.timed('render_table')
+def show_paged_table(frame, positions, key, styled=True):
+    total = len(positions)
+    col_size, col_page, col_info = st.columns([1, 1, 2])
+    page_size = col_size.selectbox("每页行数", table_view.PAGE_SIZES, key=f"{key}_page_size")
+    pages = table_view.page_count(total, page_size)
+    # 筛选后页数变少时回到第一页
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = 1
+    page = col_page.number_input("页码", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+    col_info.caption(f"共 {total} 行，{pages} 页")
+    page_df = frame.iloc[table_view.page_positions(positions, page, page_size)]
+    st.dataframe(table_view.style_page(page_df) if styled else page_df, use_container_width=True)
+
+# 输入搜索词后默认按相关度排序，清空后恢复按截止日期排序
+def sort_by_relevance():
+    st.session_state.table_sort = (table_view.RELEVANCE if st.session_state.table_search.strip()
+                                   else table_view.SORT_COLUMNS[0])
+
+# 调度器状态（由后台调度器写入，页面只读）
+def get_scheduler_status():
+    status = scheduler.read_status()
+    return status, scheduler.is_alive(status)
 
-handle_heartbeat()
 
 
 # 标题
@@ -376,7 +207,8 @@ st.title("📅 专利缴费管理系统")
 st.write("上传专利信息，系统将自动跟踪到期状态并提醒即将到期的项目")
 
 # 显示正确的心跳接口地址（适配 Streamlit Cloud）
-st.info(f"系统心跳接口：https://hszlxxts.streamlit.app/?heartbeat=1")
+st.info(f"系统心跳接口：https://hszlxxts.streamlit.app/?heartbeat=1"
+        f"（调度器状态接口：端口 {settings.HEALTH_PORT} 的 /healthz、/status）")
 
 # 加载保存的配置（邮箱配置+核心数据）
 load_email_config()
@@ -384,50 +216,160 @@ load_persistent_data()
 
 if st.session_state.is_first_load:
     st.success("欢迎使用专利缴费管理系统！首次加载完成")
-    
-    # 直接在主线程执行检查（移除子线程）
-    # 无需time.sleep，避免阻塞页面；若需延迟，用Streamlit的rerun机制
-    if st.session_state.patent_data is not None and st.session_state.email_config.get("email_enabled"):
-        # 执行检查任务
-        success, msg = run_scheduled_task()
-        st.session_state.check_result = (success, msg)
-        st.info(f"首次检查结果：{msg}")  # 可选：显示检查结果
-    else:
-        st.session_state.check_result = (False, "首次加载：无专利数据或邮箱未启用，未执行检查")
-    
     st.session_state.is_first_load = False  # 标记为已加载
-    save_persistent_data()  # 保存状态
+
+# 定时局部刷新：Streamlit 1.37 起为 st.fragment，旧版本为 st.experimental_fragment
+_fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+def run_fragment(func, run_every):
+    """以局部区块方式运行 func，run_every 秒后只重跑该区块（None 表示不自动刷新）"""
+    _fragment(func, run_every=run_every)()
+
+
+# 调度器状态区块：按间隔单独重跑，只读取状态文件和调度器状态表
+def scheduler_panel():
+    status, alive = get_scheduler_status()
+    state = store.state.all()
+    if alive:
+        st.success(f"后台调度器运行中（PID {status['pid']}）")
+    else:
+        st.warning("后台调度器未运行，可执行 `python -m patent_reminder.scheduler` 启动")
+    st.info(f"总检查次数：{state.get('check_count') or 0}")
+    if state.get('last_check_time'):
+        st.info(f"上次检查时间：{state['last_check_time']:%Y-%m-%d %H:%M}")
+    # 显示本工作区最近一次检查结果（如果有）
+    last_result = status and (status.get("workspaces") or {}).get(workspace.name, status.get("last_result"))
+    if last_result:
+        st.info(f"最近检查结果：{last_result['message']}")
+    if state.get('last_email_sent_time'):
+        st.info(f"上次邮件发送时间：{state['last_email_sent_time']:%Y-%m-%d %H:%M}")
+    next_send = state.get('next_scheduled_send')
+    if next_send and datetime.now() < next_send:
+        remaining = (next_send - datetime.now()).total_seconds()
+        st.info(f"下次计划发送时间：{next_send:%Y-%m-%d %H:%M}，"
+                f"还有{int(remaining // 3600)}小时{int(remaining % 3600 // 60)}分钟")
+    elif next_send:
+        st.info("即将检查并发送提醒邮件...")
+    job_list()
+
+
+# 本会话提交的发送任务：状态、结果与取消（任务在后台线程执行，这里只读取状态）
+def job_list():
+    jobs = get_queue().recent(5, ids=set(st.session_state.send_jobs))
+    if not jobs:
+        return
+    st.caption("发送任务")
+    for job in jobs:
+        col_info, col_cancel = st.columns([3, 1])
+        col_info.write(f"`{job.id}` {job.workspace} {job.submitted_at:%H:%M:%S} {STATUS_LABELS[job.status]}"
+                       + (f"：{job.message}" if job.message else ""))
+        if job.active and not job.cancel_requested:
+            if col_cancel.button("取消", key=f"cancel_job_{job.id}"):
+                get_queue().cancel(job.id)
+        elif job.active:
+            col_cancel.caption("正在取消")
+
+
+# 发送/检查历史：按时间范围统计并列出最近的事件（events 表按时间建索引）
+def event_history():
+    days = st.selectbox("时间范围", [1, 7, 30, 365, 3650], index=1, key="history_days",
+                        format_func=lambda d: f"最近 {d} 天")
+    since = datetime.now() - timedelta(days=days)
+    summary = store.event_summary(since)
+    sends = summary.get(KIND_SEND, {})
+    col_ok, col_failed = st.columns(2)
+    col_ok.metric("发送成功", sends.get('succeeded', 0))
+    col_failed.metric("发送失败", sends.get('failed', 0))
+    kind = st.radio("类型", [None, *KIND_LABELS], horizontal=True, key="history_kind",
+                    format_func=lambda k: KIND_LABELS.get(k, "全部"))
+    failed_only = st.checkbox("只看失败", key="history_failed")
+    events = store.query_events(since, kind, failed_only, limit=200)
+    if not events:
+        st.caption("没有记录")
+        return
+    st.dataframe(
+        pd.DataFrame(events, columns=['ts', 'kind', 'success', 'recipient', 'patents',
+                                      'latency_ms', 'error_class', 'message'])
+        .assign(kind=lambda df: df['kind'].map(KIND_LABELS).fillna(df['kind']),
+                success=lambda df: df['success'].map({1: '成功', 0: '失败'}))
+        .rename(columns={'ts': '时间', 'kind': '类型', 'success': '结果', 'recipient': '收件人',
+                         'patents': '专利数', 'latency_ms': '耗时(ms)', 'error_class': '错误类型',
+                         'message': '信息'}),
+        use_container_width=True, hide_index=True
+    )
+
+
+# 各阶段耗时（本进程内所有会话与后台调度器共用统计，单位毫秒）
+def perf_panel():
+    stats = profiling.snapshot()
+    if not stats:
+        st.caption("暂无记录")
+        return
+    st.dataframe(
+        pd.DataFrame.from_dict(stats, orient='index')[['count', 'p50', 'p95', 'max', 'total']]
+        .assign(p50=lambda df: df['p50'] * 1000, p95=lambda df: df['p95'] * 1000,
+                max=lambda df: df['max'] * 1000)
+        .rename(columns={'count': '次数', 'p50': 'p50 (ms)', 'p95': 'p95 (ms)', 'max': '最大 (ms)',
+                         'total': '累计 (s)'})
+        .round(1),
+        use_container_width=True
+    )
+    st.download_button("导出 Prometheus 格式", profiling.prometheus_text(), file_name="metrics.txt",
+                       mime="text/plain")
+
+
+# 到期统计与发送倒计时：按间隔单独重跑，使用缓存的到期日索引只做二分查找
+def status_overview():
+    dataset = get_dataset(store)
+    if not dataset.empty:
+        counts = dataset.index.counts(st.session_state.reminder_days)
+        col_expired, col_due, col_normal, col_queue = st.columns(4)
+        col_expired.metric("已过期", counts['已过期'])
+        col_due.metric("即将到期", counts['即将到期'])
+        col_normal.metric("正常", counts['正常'])
+        col_queue.metric("待发送邮件", store.outbox_depth())
+    # 邮件由后台调度器发送，这里只展示调度状态
+    if st.session_state.email_config["email_enabled"]:
+        next_send = store.state.get('next_scheduled_send')
+        if next_send and datetime.now() < next_send:
+            remaining_seconds = (next_send - datetime.now()).total_seconds()
+            remaining_hours = int(remaining_seconds // 3600)
+            remaining_minutes = int((remaining_seconds % 3600) // 60)
+            st.info(f"邮件提醒功能已启用，距离下次发送还有{remaining_hours}小时{remaining_minutes}分钟")
+        else:
+            st.info("邮件提醒功能已启用，将在下次后台检查时发送")
+    st.caption(f"状态更新时间：{datetime.now():%H:%M:%S}")
 
 
 # 侧边栏 - 设置
 with st.sidebar:
+    st.header("工作区")
+    st.selectbox("当前工作区", workspace_names(), key="workspace", on_change=reset_workspace_state)
+    with st.expander("新建工作区"):
+        st.text_input("名称", key="new_workspace_name", help="字母、数字、汉字、下划线或短横线")
+        st.button("创建", on_click=add_workspace)
+        if st.session_state.get('workspace_error'):
+            st.error(st.session_state.pop('workspace_error'))
+
     st.header("提醒设置")
     # 提醒提前天数（默认15天）
     reminder_days = st.slider("提前提醒天数", 7, 90, st.session_state.reminder_days)
     if reminder_days != st.session_state.reminder_days:
         st.session_state.reminder_days = reminder_days  # 更新会话状态
-        save_persistent_data()  # 保存修改
+        store.settings.set('reminder_days', reminder_days)  # 保存修改
     st.info(f"设置为提前 {reminder_days} 天提醒即将到期的专利")
     
-    # 自动刷新设置
+    # 自动刷新设置：只定时重跑状态区块，不重新加载整个页面
     st.subheader("自动刷新")
-    st.session_state.auto_refresh = st.checkbox("启用页面自动刷新", value=True)
-    st.write(f"自动刷新状态：{st.session_state.auto_refresh}")
-    # 缩短自动刷新间隔：支持1-60分钟（1小时），默认10分钟
-    refresh_interval = st.slider(
-        "刷新间隔（分钟）", 
-        min_value=1, 
-        max_value=60,  # 最大支持1小时
-        value=2,      # 默认10分钟
-        help="缩短了最大刷新间隔，现在最大为60分钟"
+    st.session_state.auto_refresh = st.checkbox("自动刷新状态", value=st.session_state.auto_refresh)
+    refresh_seconds = st.slider(
+        "刷新间隔（秒）",
+        min_value=10,
+        max_value=600,
+        value=30,
+        help="只刷新调度器状态、发送倒计时与到期统计，不重新加载页面"
     )
-    setup_auto_refresh(refresh_interval)
-    # 显示上次邮件发送时间
-    if st.session_state.last_email_sent_time:
-        st.info(f"上次邮件发送时间：{st.session_state.last_email_sent_time:%Y-%m-%d %H:%M}")
-        next_send_time = st.session_state.last_email_sent_time + timedelta(minutes=4)
-        if datetime.now() < next_send_time:
-            st.info(f"下次邮件发送时间：{next_send_time:%Y-%m-%d %H:%M}")
+    refresh_every = refresh_seconds if st.session_state.auto_refresh else None
     
     # 邮件提醒设置
     st.subheader("邮件提醒设置")
@@ -437,7 +379,19 @@ with st.sidebar:
         sender_password = st.text_input("邮箱授权码", type="password", value=st.session_state.email_config["sender_password"])
         smtp_server = st.text_input("SMTP服务器", value=st.session_state.email_config["smtp_server"])
         smtp_port = st.number_input("SMTP端口", 0, 65535, value=st.session_state.email_config["smtp_port"])
-        receiver_email = st.text_input("收件人邮箱", value=st.session_state.email_config["receiver_email"])
+        receiver_email = st.text_input("默认收件人邮箱", value=st.session_state.email_config["receiver_email"])
+        owner_emails_text = st.text_area(
+            "负责人邮箱（每行一个：负责人=邮箱）",
+            value="\n".join(f"{owner}={email}" for owner, email
+                            in st.session_state.email_config["owner_emails"].items()),
+            help="上传文件含「负责人」列时按此分发；含「负责人邮箱」列时优先使用该列，其余发送到默认收件人"
+        )
+        attachment_options = {"": "不附带", "xlsx": "Excel (.xlsx)", "csv": "CSV (.csv)"}
+        attachment_format = st.selectbox(
+            "附件清单", list(attachment_options),
+            index=list(attachment_options).index(st.session_state.email_config["attachment_format"]),
+            format_func=attachment_options.get
+        )
         email_enabled = st.checkbox("启用邮件提醒", value=st.session_state.email_config["email_enabled"])
         
         # 保存配置按钮
@@ -448,133 +402,174 @@ with st.sidebar:
                 "smtp_server": smtp_server,
                 "smtp_port": smtp_port,
                 "receiver_email": receiver_email,
+                "owner_emails": dict(
+                    (owner.strip(), email.strip())
+                    for owner, _, email in (line.partition('=') for line in owner_emails_text.splitlines())
+                    if owner.strip() and email.strip()
+                ),
+                "attachment_format": attachment_format,
                 "email_enabled": email_enabled
             })
             save_email_config()
     
     st.divider()
     st.info(f"上次数据上传时间：\n{st.session_state.last_upload_time}")
-    if st.session_state.next_scheduled_send:
-            now = datetime.now()
-            if now < st.session_state.next_scheduled_send:
-                remaining = st.session_state.next_scheduled_send - now
-                remaining_hours = int(remaining.total_seconds() // 3600)
-                remaining_minutes = int((remaining.total_seconds() % 3600) // 60)
-                st.info(f"下次计划发送时间：{st.session_state.next_scheduled_send:%Y-%m-%d %H:%M}")
-                st.info(f"距离下次发送还有：{remaining_hours}小时{remaining_minutes}分钟")
-            else:
-                st.info("即将检查并发送提醒邮件...")
+    recipient_states = store.recipient_states()
+    if recipient_states:
+        with st.expander(f"各收件人发送状态（{len(recipient_states)}）"):
+            st.dataframe(
+                pd.DataFrame.from_dict(recipient_states, orient='index')
+                .rename(columns={'next_scheduled_send': '下次计划发送', 'last_email_sent_time': '上次发送'}),
+                use_container_width=True
+            )
+
+    with st.expander("发送历史"):
+        event_history()
+
+    # 性能面板（设置 PATENT_REMINDER_PERF_PANEL=1 或使用 ?admin=1 打开）
+    if settings.PERF_PANEL or "admin" in st.query_params:
+        with st.expander("性能"):
+            perf_panel()
 
     st.divider()
     st.markdown("----") 
     st.write("开发者：钟工")
-    st.info(f"总检查次数：{st.session_state.check_count}")
-    if st.session_state.last_check_time:
-        st.info(f"上次检查时间：{st.session_state.last_check_time:%Y-%m-%d %H:%M}")
-    # 显示本次检查结果（如果有）
-    if 'check_result' in st.session_state:
-        success, msg = st.session_state.check_result
-        st.info(f"本次检查结果：{msg}")
+    run_fragment(scheduler_panel, refresh_every)
 # 上传Excel文件
 st.subheader("上传专利数据")
 uploaded_file = st.file_uploader(
-    "上传Excel文件（需包含列：专利名称、专利号、缴费截止日期、缴费金额）",
-    type=["xlsx", "xls"]
+    f"上传{'Excel/CSV/Parquet' if 'parquet' in UPLOAD_TYPES else 'Excel/CSV'}文件（需包含列：专利名称、专利号、缴费截止日期、缴费金额）",
+    type=list(UPLOAD_TYPES)
 )
 
-if uploaded_file is not None:
+merge_upload = st.radio(
+    "导入方式", ["替换全部数据", "合并更新（只写入新增和变化的专利）"],
+    horizontal=True
+) != "替换全部数据"
+tombstone_missing = merge_upload and st.checkbox("将本次文件中不存在的专利标记为已删除", value=False)
+
+# 同一个已上传文件在后续重跑中不再重复导入
+if uploaded_file is not None and st.session_state.get('imported_file_id') != uploaded_file.file_id:
+    progress_text = st.empty()
     try:
-        df = pd.read_excel(uploaded_file)
-        required_columns = ['专利名称', '专利号', '缴费截止日期', '缴费金额']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            st.error(f"Excel文件缺少必要的列：{', '.join(missing_columns)}")
-        else:
-            df['专利号'] = df['专利号'].astype(str)
-            df['缴费截止日期'] = pd.to_datetime(df['缴费截止日期'])
-            st.session_state.patent_data = df
+        # 流式读取并分块写入数据库，不在会话中保存完整的上传数据
+        report = import_patents(
+            uploaded_file, uploaded_file.name, store,
+            merge=merge_upload, tombstone=tombstone_missing,
+            progress=lambda rows: progress_text.caption(f"已读取 {rows} 行...")
+        )
+        progress_text.empty()
+        st.session_state.imported_file_id = uploaded_file.file_id
+        st.session_state.last_import_report = report
+        if not report.file_unchanged:
             st.session_state.last_upload_time = datetime.now().strftime('%Y-%m-%d %H:%M')
-            save_persistent_data()  # 上传成功后保存数据
-            st.success("文件上传成功并已保存！")
+            store.settings.set('last_upload_time', st.session_state.last_upload_time)
+            # 上传后立即构建检索索引（按数据版本缓存，所有会话共用），搜索时不再等待
+            search_index(get_dataset(store))
+    except ImportFormatError as e:
+        progress_text.empty()
+        st.error(str(e))
     except Exception as e:
+        progress_text.empty()
         st.error(f"文件处理失败：{str(e)}")
 
-# 显示已保存的专利数据
-if st.session_state.patent_data is not None:
-    df = st.session_state.patent_data.copy()
-    today = datetime.today().date()
-    df['距离到期天数'] = (df['缴费截止日期'] - pd.Timestamp(today)).dt.days
-    df['状态'] = df['距离到期天数'].apply(
-        lambda x: '已过期' if x < 0 else 
-        '即将到期' if x <= st.session_state.reminder_days else 
-        '正常'
-    )
+# 最近一次导入结果（差异统计）
+report = st.session_state.get('last_import_report')
+if report is not None:
+    if report.file_unchanged:
+        st.info("文件内容与上次导入相同，已跳过")
+    else:
+        st.success(f"文件上传成功并已保存！共读取 {report.rows_imported} 行")
+        col_added, col_changed, col_unchanged, col_removed = st.columns(4)
+        col_added.metric("新增", report.added)
+        col_changed.metric("变化", report.changed)
+        col_unchanged.metric("未变化", report.unchanged)
+        col_removed.metric("删除", report.removed)
+    if report.skipped_sheets:
+        st.info(f"以下工作表缺少必要的列，已跳过：{', '.join(report.skipped_sheets)}")
+    if report.error_count:
+        st.warning(f"{report.error_count} 行数据无效，已跳过")
+        with st.expander("查看无效行"):
+            st.dataframe(pd.DataFrame([vars(e) for e in report.errors])
+                         .rename(columns={'sheet': '工作表', 'row': '行号', 'message': '原因'}),
+                         use_container_width=True)
+
+# 显示已保存的专利数据（进程内所有会话共用一份，按数据版本缓存）
+dataset = get_dataset(store)
+if not dataset.empty:
+    index = dataset.index
+    reminder_days = st.session_state.reminder_days
+    df = dataset.classified(reminder_days)
     
-    reminder_patents = df[(df['状态'] == '即将到期') | (df['状态'] == '已过期')]
+    # 已过期 + 即将到期、即将到期两个集合都由索引二分切片得到，按截止日期升序
+    reminder_patents = df.iloc[index.attention(reminder_days)]
+    due_patents = df.iloc[index.due(reminder_days)]
     if not reminder_patents.empty:
-        patent_ids = [f"{row['专利号']}_{row['缴费截止日期'].strftime('%Y%m%d')}" 
-                     for _, row in reminder_patents.iterrows()]
-        
-        new_reminders = [pid for pid in patent_ids if pid not in st.session_state.reminder_sent]
-        if new_reminders:
-            reminder_count = len(new_reminders)
+        # 页面弹窗同样记入提醒台账，每个专利在每个提醒档位只弹一次
+        claimed = claim_page_reminders(store, reminder_patents)
+        if claimed:
             local_notification(
-                f"发现 {reminder_count} 项需要关注的专利，请及时处理！",
+                f"发现 {claimed} 项需要关注的专利，请及时处理！",
                 "⚠️ 专利缴费提醒"
             )
-            for pid in new_reminders:
-                st.session_state.reminder_sent.add(pid)
-            save_persistent_data()  # 提醒记录更新后保存数据
     
-    # 显示所有专利信息
+    # 显示所有专利信息（服务端搜索、筛选、排序，只发送当前页）
     st.subheader("所有专利信息")
-    def highlight_status(row):
-        if row['状态'] == '即将到期':
-            return ['background-color: #fff3cd'] * len(row)
-        elif row['状态'] == '已过期':
-            return ['background-color: #f8d7da'] * len(row)
-        else:
-            return [''] * len(row)
-    
-    styled_df = df.style.apply(highlight_status, axis=1)
-    st.dataframe(styled_df, use_container_width=True)
+    col_search, col_status, col_sort, col_order = st.columns([2, 2, 1, 1])
+    search = col_search.text_input("搜索专利号或名称", key="table_search", on_change=sort_by_relevance,
+                                   help="专利号前缀（可带或不带 ZL 与校验位）或名称片段，结果按相关度排序")
+    statuses = col_status.multiselect("状态", ['已过期', '即将到期', '正常'], key="table_status")
+    sort_by = col_sort.selectbox("排序", table_view.SORT_COLUMNS, key="table_sort")
+    descending = col_order.checkbox("降序", key="table_desc")
+    # 检索索引只做二分查找与数组运算，百万行也只需毫秒级
+    matches = search_index(dataset).search(search, limit=None).positions if search.strip() else None
+    positions = table_view.sorted_positions(
+        df, table_view.filter_mask(df, search, statuses, matches), sort_by, not descending, index, matches)
+    show_paged_table(df, positions, "all")
     
     # 显示需要关注的专利
-    upcoming = df[(df['状态'] == '即将到期') | (df['状态'] == '已过期')]
-    if not upcoming.empty:
+    if not reminder_patents.empty:
         st.subheader("⚠️ 需要关注的专利")
-        st.dataframe(upcoming, use_container_width=True)
+        show_paged_table(reminder_patents, np.arange(len(reminder_patents)), "attention")
     else:
         st.success("没有即将到期或已过期的专利，一切正常！")
     
     # 数据可视化
     st.subheader("专利状态分布")
-    status_counts = df['状态'].value_counts()
-    st.bar_chart(status_counts)
+    status_counts = pd.Series(index.counts(reminder_days))
+    st.bar_chart(status_counts[status_counts > 0].sort_values(ascending=False))
+
+    # 年费现金流预测（按数据版本缓存，切换选项只对缓存的月度汇总再做一次求和）
+    st.subheader("年费现金流预测")
+    forecast = fee_forecast(dataset, reminder_days)
+    col_range, col_freq, col_by = st.columns(3)
+    horizon = col_range.selectbox("预测范围", [12, 24, 36], index=2, key="forecast_months",
+                                  format_func=lambda m: f"未来 {m // 12} 年")
+    freq = col_freq.radio("汇总周期", ['M', 'Q'], horizontal=True, key="forecast_freq",
+                          format_func=lambda f: "按月" if f == 'M' else "按季度")
+    split = col_by.radio("拆分", ['type', 'status'], horizontal=True, key="forecast_by",
+                         format_func=lambda b: "专利类型" if b == 'type' else "状态")
+    forecast_table = forecast.table(split, freq, horizon)
+    st.caption(f"合计 {forecast_table.to_numpy().sum():,.0f} 元（本期含滞纳金，以后年度按年费标准及本期费减比例推算）")
+    st.bar_chart(forecast_table)
+    st.download_button(
+        label="导出预测明细（CSV）",
+        data=forecast.to_frame(horizon).to_csv(index=False).encode('utf-8-sig'),
+        file_name=f"年费预测_{datetime.now():%Y%m%d}.csv",
+        mime="text/csv"
+    )
     
-    # 即将到期专利的倒计时展示
-    if not df[df['状态'] == '即将到期'].empty:
+    # 即将到期专利的倒计时展示（索引切片已按截止日期排序）
+    if not due_patents.empty:
         st.subheader("📌 即将到期专利倒计时")
-        countdown_df = df[df['状态'] == '即将到期'][['专利名称', '专利号', '缴费截止日期', '距离到期天数']]
-        countdown_df = countdown_df.sort_values('距离到期天数')
-        st.dataframe(countdown_df, use_container_width=True)
+        countdown_df = due_patents[['专利名称', '专利号', '缴费截止日期', '距离到期天数']]
+        show_paged_table(countdown_df, np.arange(len(countdown_df)), "countdown", styled=False)
 
 else:
     st.info("请上传专利数据Excel文件，上传后会自动保存")
     
     # 提供模板下载
-    sample_data = {
-        '专利名称': ['发明专利A', '实用新型专利B', '外观设计专利C'],
-        '专利号': ['ZL202010000000', 'ZL202020000000', 'ZL202030000000'],
-        '缴费截止日期': [
-            (datetime.today() + timedelta(days=15)).strftime('%Y-%m-%d'),
-            (datetime.today() + timedelta(days=45)).strftime('%Y-%m-%d'),
-            (datetime.today() - timedelta(days=5)).strftime('%Y-%m-%d')
-        ],
-        '缴费金额': [1300, 900, 500]
-    }
-    sample_df = pd.DataFrame(sample_data)
+    sample_df = sample_template()
     buffer = BytesIO()
     sample_df.to_excel(buffer, index=False)
     buffer.seek(0)
@@ -585,61 +580,44 @@ else:
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
-# 自动刷新功能和邮件检查
-if st.session_state.auto_refresh:
-    refresh_js = f"""
-    <script>
-        // 检查是否是首次加载（用localStorage标记）
-        if (!localStorage.getItem('hasRefreshedOnce')) {{
-            // 首次加载：立即刷新
-            window.location.reload();
-            localStorage.setItem('hasRefreshedOnce', 'true');
-        }} else {{
-            // 非首次加载：按间隔刷新
-            setTimeout(function() {{
-                window.location.reload();
-            }}, {refresh_interval * 60 * 1000});
-        }}
-    </script>
-    """
-    st.markdown(refresh_js, unsafe_allow_html=True)
-    st.caption(f"页面将在 {refresh_interval} 分钟后自动刷新")
-    
-    # 仅在自动刷新时检查邮件（非首次启动）
-    if not st.session_state.is_first_load and st.session_state.email_config["email_enabled"]:
-        with st.spinner("自动刷新：检查邮件提醒..."):
-            result, msg = auto_send_reminders(st.session_state.patent_data)
-            if result:
-                st.success(f"邮件提醒检查完成：{msg}")
-            else:
-                st.info(f"邮件提醒检查：{msg}")
-    else:
-        # 首次加载时只显示状态信息，不发送邮件
-        if st.session_state.email_config["email_enabled"]:
-            now = datetime.now()
-            last_sent = st.session_state.last_email_sent_time
-            if last_sent is None:
-                st.info("邮件提醒功能已启用，将在首次自动刷新时检查发送")
-            else:
-                time_diff = now - last_sent
-                if time_diff < timedelta(minutes=4):
-                    remaining_seconds = (timedelta(minutes=4) - time_diff).total_seconds()
-                    remaining_hours = int(remaining_seconds // 3600)
-                    remaining_minutes = int((remaining_seconds % 3600) // 60)
-                    st.info(f"邮件提醒功能已启用，距离下次发送还有{remaining_hours}小时{remaining_minutes}分钟")
-
-if st.session_state.email_config["email_enabled"] and not st.session_state.is_first_load:
-    # 从主线程获取数据后传递给子线程
-    threading.Thread(target=auto_send_reminders, args=(st.session_state.patent_data,)).start()
-    # 确保页面加载后再启动线程，避免阻塞
-    def check_and_send(patent_data):
-        time_module.sleep(5)  # 延迟5秒，确保页面加载完成
-        auto_send_reminders(patent_data)
-    threading.Thread(target=check_and_send, args=(st.session_state.patent_data,), daemon=True).start()
-
-# 触发检查
+# 批量导出：文件按数据版本与提醒天数缓存，数据未变化时重复下载不再生成
+st.subheader("批量导出")
+col_kind, col_format, col_export = st.columns([2, 1, 2])
+export_kind = col_kind.selectbox("导出内容", list(EXPORT_KINDS), format_func=EXPORT_KINDS.get, key="export_kind")
+export_format = col_format.selectbox("格式", EXPORT_FORMATS, key="export_format")
+export_file = export_path(store, export_kind, export_format, st.session_state.reminder_days)
+if col_export.button("生成导出文件"):
+    try:
+        with st.spinner("正在生成..."):
+            cached_export(store, export_kind, export_format, st.session_state.reminder_days)
+        st.session_state.export_ready = export_file
+    except (ValueError, OSError) as e:
+        st.error(f"导出失败：{str(e)}")
+# 只有本会话请求过的文件才读入下载按钮，避免每次重跑都读取大文件
+if st.session_state.get('export_ready') == export_file and os.path.exists(export_file):
+    with open(export_file, 'rb') as f:
+        col_export.download_button(
+            label=f"下载 {export_filename(export_kind, export_format)}",
+            data=f.read(),
+            file_name=export_filename(export_kind, export_format),
+            mime=EXPORT_MIME_TYPES[export_format]
+        )
+
+# 状态区块（启用自动刷新时按间隔单独重跑）
+st.subheader("当前状态")
+run_fragment(status_overview, refresh_every)
+
+# 触发检查：提交到后台任务队列后立即返回，进度与结果在侧边栏查看
 if st.button("开始检查"):
-    run_scheduled_task()
+    job_id = workspace.submit("手动检查", run_reminders)
+    st.session_state.send_jobs.append(job_id)
+    st.info(f"已提交发送任务 {job_id}，可在侧边栏查看进度")
 # 标记为非首次加载
 if st.session_state.is_first_load:
-    st.session_state.is_first_load = False
\ No newline at end of file
+    st.session_state.is_first_load = False
+
+# 本次运行耗时；?profile=1 时显示函数级分析报告
+profiling.record('page', time.perf_counter() - page_started)
+if page_profiler is not None:
+    with st.expander(f"性能分析报告（{page_profiler.engine}）", expanded=True):
+        st.code(page_profiler.stop().report(), language="text")
@@ -0,0 +1,111 @@
+"""合成专利组合生成器（压测用）
+
+用法：python -m benchmarks.generate 100000 -o portfolio.xlsx [--seed 0] [--duplicates 0.01]
+输出格式按扩展名选择：.xlsx / .csv / .parquet。
+
+- 申请日在近 20 年内均匀分布，缴费截止日期分布在今后一年内，约 5% 已逾期（宽限期内）
+- 专利名称由中文词组拼接，专利号为 ZL + 申请年 + 类型码 + 流水号 + 校验位
+- 按 --duplicates 比例复制已有专利号（一半截止日期相同，一半为下一年度）
+- 约三分之一的专利带负责人邮箱，其余由负责人映射或默认收件人接收
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+PREFIXES = ['一种', '基于', '用于', '新型', '高效', '智能', '便携式', '多功能']
+SUBJECTS = ['锂电池', '光伏组件', '数据处理', '图像识别', '中药组合物', '机器人', '无人机',
+            '传感器', '芯片封装', '污水处理', '复合材料', '显示面板', '医疗器械', '通信']
+SUFFIXES = ['装置', '方法', '系统', '及其制备方法', '结构', '控制电路', '检测设备', '组件']
+OWNERS = ['张伟', '王芳', '李娜', '刘洋', '陈静', '杨磊', '赵敏', '黄强']
+TYPES = np.array(['发明', '实用新型', '外观设计'])
+TYPE_DIGITS = np.array([1, 2, 3])
+FEES = np.array([1200, 900, 600])
+
+
+def _pick(rng, words, n):
+    return np.asarray(words, dtype=object)[rng.integers(0, len(words), n)]
+
+
+def generate_portfolio(n, seed=0, duplicates=0.01, today=None):
+    """生成 n 行的专利数据 DataFrame（含重复专利号）"""
+    rng = np.random.default_rng(seed)
+    today = pd.Timestamp(today or pd.Timestamp.today()).normalize()
+    unique = n - int(n * duplicates)
+
+    type_index = rng.choice(3, unique, p=[0.5, 0.35, 0.15])
+    filing = today - pd.to_timedelta(rng.integers(30, 20 * 365, unique), unit='D')
+    years = filing.year.to_numpy()
+    # 约 5% 处于宽限期（已逾期不超过 180 天）
+    overdue = rng.random(unique) < 0.05
+    offset = np.where(overdue, -rng.integers(1, 181, unique), rng.integers(0, 365, unique))
+    deadlines = today + pd.to_timedelta(offset, unit='D')
+    serial = rng.integers(0, 10_000_000, unique)
+    numbers = pd.Series([
+        f"ZL{year}{digit}{seq:07d}.{seq % 10}"
+        for year, digit, seq in zip(years, TYPE_DIGITS[type_index], serial)
+    ])
+    names = _pick(rng, PREFIXES, unique) + _pick(rng, SUBJECTS, unique) + _pick(rng, SUFFIXES, unique)
+    owners = _pick(rng, OWNERS, unique)
+    emails = pd.Series(None, index=range(unique), dtype=object)
+    with_email = rng.random(unique) < 0.33
+    emails[with_email] = [f"owner{i % 50}@example.com" for i in np.flatnonzero(with_email)]
+
+    df = pd.DataFrame({
+        '专利名称': names,
+        '专利号': numbers,
+        '缴费截止日期': deadlines.strftime('%Y-%m-%d'),
+        '缴费金额': FEES[type_index] * rng.choice([1.0, 0.15, 0.3], unique, p=[0.6, 0.3, 0.1]),
+        '申请日': filing.strftime('%Y-%m-%d'),
+        '专利类型': TYPES[type_index],
+        '负责人': owners,
+        '负责人邮箱': emails,
+    })
+
+    if n > unique:
+        dup = df.iloc[rng.integers(0, unique, n - unique)].copy()
+        next_year = rng.random(len(dup)) < 0.5
+        shifted = pd.to_datetime(dup['缴费截止日期']) + pd.DateOffset(years=1)
+        dup.loc[next_year, '缴费截止日期'] = shifted[next_year].dt.strftime('%Y-%m-%d')
+        df = pd.concat([df, dup], ignore_index=True)
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def write_portfolio(df, path):
+    """按扩展名写出文件；xlsx 使用 openpyxl 只写模式，百万行也不会占用过多内存"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        df.to_csv(path, index=False)
+    elif ext == '.parquet':
+        df.to_parquet(path, index=False)
+    elif ext == '.xlsx':
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("专利")
+        ws.append(list(df.columns))
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+            ws.append(row)
+        wb.save(path)
+    else:
+        raise ValueError(f"不支持的文件类型：{ext}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成合成专利组合")
+    parser.add_argument("rows", type=int, help="行数（含重复专利号）")
+    parser.add_argument("-o", "--output", default="portfolio.xlsx", help="输出文件（.xlsx/.csv/.parquet）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicates", type=float, default=0.01, help="重复专利号比例")
+    args = parser.parse_args(argv)
+
+    df = generate_portfolio(args.rows, args.seed, args.duplicates)
+    write_portfolio(df, args.output)
+    print(f"已生成 {len(df)} 行 -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
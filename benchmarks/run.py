@@ -0,0 +1,269 @@
+"""提醒流程分阶段压测
+
+用法：
+    python -m benchmarks.run --sizes 10000 100000          # 运行并与基线比较
+    python -m benchmarks.run --sizes 10000 --update-baseline
+    python -m benchmarks.run --sizes 1000000 --stages classify filter
+
+每个阶段在独立子进程中运行，分别记录耗时与峰值内存（RSS）：
+- parse_xlsx / parse_csv：流式导入上传文件（importer.import_patents）
+- store_roundtrip：整体写入数据库后重新读取（replace_patents + load_patents）
+- classify：按年费规则计算截止日期、构建到期日索引并计算状态列（Dataset）
+- cold_load：新进程从列式快照加载数据并取出分类结果（get_dataset，快照已存在）
+- filter：取出需要提醒的专利（attention_frame）
+- forecast：未来 36 个月的年费现金流预测（analytics.build_forecast，不经缓存）
+- render：按收件人分组生成提醒邮件（正文、HTML 表格、xlsx 附件）
+- send：完整的 auto_send_reminders，投递到本地 devsmtp 测试服务器
+
+每个阶段重复运行 --repeats 次（各自独立的子进程），取耗时与峰值内存的中位数。
+中位数超过基线 (1 + --tolerance) 倍、且超出的绝对量不小于 MIN_SECONDS_DIFF /
+MIN_RSS_DIFF_MB 时以退出码 1 结束（毫秒级的阶段只按比例比较会因抖动误报）。
+基线与机器相关，更换机器后请先用 --update-baseline 重新生成。
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+STAGES = ['parse_xlsx', 'parse_csv', 'store_roundtrip', 'classify', 'cold_load', 'filter', 'forecast',
+          'render', 'send']
+REMINDER_DAYS = 49
+# 低于该差值的变化视为测量抖动
+MIN_SECONDS_DIFF = 0.05
+MIN_RSS_DIFF_MB = 20
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """当前进程的峰值 RSS（MB），不支持时返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _fresh_store(workdir, name):
+    from patent_reminder.store import PatentStore
+
+    # 使用 SQLite 备份接口复制，包含尚未写回主文件的 WAL 内容
+    path = os.path.join(workdir, f"{name}.db")
+    source = sqlite3.connect(os.path.join(workdir, "seed.db"))
+    target = sqlite3.connect(path)
+    with target:
+        source.backup(target)
+    source.close()
+    target.close()
+    return PatentStore(path)
+
+
+def _email_config(port):
+    from patent_reminder import settings
+
+    return dict(settings.DEFAULT_EMAIL_CONFIG, sender_email="bench@example.com",
+                sender_password="bench", smtp_server="127.0.0.1", smtp_port=port,
+                receiver_email="team@example.com", attachment_format="xlsx",
+                owner_emails={"张伟": "zhangwei@example.com", "王芳": "wangfang@example.com"},
+                email_enabled=True)
+
+
+def _prepare(stage, workdir):
+    """准备阶段输入（不计入耗时），返回无参数的待测函数"""
+    from patent_reminder import settings
+    from patent_reminder.dataset import Dataset, get_dataset, invalidate
+    from patent_reminder.importer import import_patents
+    from patent_reminder.mailer import build_reminder_message
+    from patent_reminder.reminders import attention_frame, auto_send_reminders, route_recipients
+    from patent_reminder.store import PatentStore
+
+    if stage in ('parse_xlsx', 'parse_csv'):
+        ext = stage.split('_')[1]
+        path = os.path.join(workdir, f"{stage}.db")
+        # 每次重复都从空数据库开始，否则文件哈希与上次相同会直接跳过导入
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        store = PatentStore(path)
+        return lambda: import_patents(os.path.join(workdir, f"portfolio.{ext}"), f"portfolio.{ext}", store)
+
+    store = _fresh_store(workdir, stage)
+    if stage == 'store_roundtrip':
+        frame = store.load_patents()
+        return lambda: (store.replace_patents(frame), store.load_patents())
+    if stage == 'classify':
+        frame = store.load_patents()
+        return lambda: Dataset(1, frame).classified(REMINDER_DAYS)
+    if stage == 'cold_load':
+        # 先生成快照再丢弃进程内缓存，只计从快照加载的耗时
+        get_dataset(store)
+        invalidate()
+        return lambda: get_dataset(store).classified(REMINDER_DAYS)
+    dataset = get_dataset(store)
+    dataset.classified(REMINDER_DAYS)
+    if stage == 'filter':
+        return lambda: attention_frame(dataset, REMINDER_DAYS)
+    if stage == 'forecast':
+        from patent_reminder.analytics import build_forecast
+
+        return lambda: build_forecast(dataset.frame, REMINDER_DAYS)
+
+    from patent_reminder.devsmtp import DevSMTPServer
+
+    server = DevSMTPServer('127.0.0.1')
+    server.start()
+    cfg = _email_config(server.port)
+    if stage == 'render':
+        patents = attention_frame(dataset, REMINDER_DAYS)
+        groups = patents.groupby(route_recipients(patents, cfg), sort=False).indices
+
+        def render():
+            for recipient, positions in groups.items():
+                build_reminder_message(cfg["sender_email"], recipient, patents.iloc[positions],
+                                       cfg["attachment_format"]).as_bytes()
+        return render
+    if stage == 'send':
+        # 压测时不限速
+        settings.SMTP_RATE_PER_SECOND = 1e9
+        settings.SMTP_BURST = 1e9
+        return lambda: auto_send_reminders(store, cfg)
+    raise ValueError(f"未知阶段：{stage}")
+
+
+def run_worker(stage, workdir):
+    """子进程入口：执行一个阶段并输出 JSON 结果"""
+    func = _prepare(stage, workdir)
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    rss = peak_rss_mb()
+    print(json.dumps({"seconds": seconds, "peak_rss_mb": rss,
+                      "rss_growth_mb": None if rss is None else rss - rss_before}))
+
+
+def _run_stage(stage, workdir):
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--worker", stage, "--workdir", workdir],
+        capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=dict(os.environ, PATENT_REMINDER_DATA_DIR=workdir))
+    if output.returncode != 0:
+        raise RuntimeError(f"阶段 {stage} 运行失败：\n{output.stderr}")
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def _median(values):
+    values = sorted(value for value in values if value is not None)
+    if not values:
+        return None
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def _run_repeated(stage, workdir, repeats):
+    """重复运行一个阶段，各项取中位数"""
+    runs = [_run_stage(stage, workdir) for _ in range(max(1, repeats))]
+    result = {key: _median(run[key] for run in runs) for key in runs[0]}
+    result["runs"] = len(runs)
+    return result
+
+
+def _prepare_inputs(size, workdir, seed):
+    from benchmarks.generate import generate_portfolio, write_portfolio
+    from patent_reminder.importer import import_patents
+    from patent_reminder.store import PatentStore
+
+    df = generate_portfolio(size, seed)
+    write_portfolio(df, os.path.join(workdir, "portfolio.csv"))
+    write_portfolio(df, os.path.join(workdir, "portfolio.xlsx"))
+    import_patents(os.path.join(workdir, "portfolio.csv"), "portfolio.csv",
+                   PatentStore(os.path.join(workdir, "seed.db")))
+
+
+def load_baseline(path=BASELINE_FILE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def compare(results, baseline, tolerance):
+    """返回超出基线的阶段说明列表"""
+    regressions = []
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            base = baseline.get(size, {}).get(stage)
+            if not base:
+                continue
+            for key, unit, floor in (("seconds", "s", MIN_SECONDS_DIFF), ("peak_rss_mb", "MB", MIN_RSS_DIFF_MB)):
+                if result.get(key) is None or base.get(key) is None:
+                    continue
+                if result[key] > base[key] * (1 + tolerance) and result[key] - base[key] >= floor:
+                    regressions.append(f"{size} 行 {stage}：{key} {result[key]:.2f}{unit}"
+                                       f"（基线 {base[key]:.2f}{unit}）")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="专利提醒流程压测")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000], help="专利数量")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="允许超出基线的比例")
+    parser.add_argument("--repeats", type=int, default=5, help="每个阶段重复运行的次数（取中位数）")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    parser.add_argument("--worker", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker, args.workdir)
+        return 0
+
+    results = {}
+    for size in args.sizes:
+        workdir = tempfile.mkdtemp(prefix=f"patent-bench-{size}-")
+        try:
+            print(f"== {size} 行：生成数据...", flush=True)
+            _prepare_inputs(size, workdir, args.seed)
+            results[str(size)] = {}
+            for stage in args.stages:
+                result = _run_repeated(stage, workdir, args.repeats)
+                results[str(size)][stage] = result
+                rss = "-" if result["peak_rss_mb"] is None else f"{result['peak_rss_mb']:.0f}MB"
+                print(f"{stage:<16}{result['seconds']:>10.3f}s   峰值内存 {rss}", flush=True)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = load_baseline(args.baseline)
+    if args.update_baseline:
+        for size, stages in results.items():
+            baseline.setdefault(size, {}).update(stages)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"基线已更新：{args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("性能回退：")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
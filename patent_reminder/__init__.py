@@ -0,0 +1,5 @@
+"""专利缴费提醒核心包：数据持久化、到期分类、邮件发送与后台调度
+
+不依赖 Streamlit，可直接在脚本、cron 或 worker 中导入；命令行入口见 cli.py
+（python -m patent_reminder check / send / import / export / status）。
+"""
@@ -0,0 +1,124 @@
+"""年费现金流预测与到期分布（按数据版本缓存）
+
+未来 FORECAST_MONTHS 个月内每笔应缴年费按 (专利类型, 状态, 月份) 汇总：
+- 本期：表格中的缴费金额 + 滞纳金，已逾期（宽限期内）的计入当月
+- 以后各年度：有申请日与专利类型的专利按年费标准逐年推算，保持本期的费减比例
+  （缴费金额 / 本年度年费标准），超出保护期的年度不再计入
+- 每笔按其自身的缴费截止日期相对今天与提醒天数分类（以后各年度通常为"正常"）
+- 三个维度合成一个整数桶号，用 np.bincount 一次求和 / 计数，不逐行循环
+
+结果缓存在 Dataset 上（见 Dataset.derived），数据版本变化时随缓存对象一起丢弃。
+"""
+import numpy as np
+
+from .annuity import ANNUITY_FEES, PATENT_TYPES, annuity_schedule, type_codes
+from .deadline_index import STATUSES, day_ordinal, status_codes_for
+
+FORECAST_MONTHS = 36
+TYPE_UNKNOWN = '未知'
+TYPE_LABELS = (*PATENT_TYPES, TYPE_UNKNOWN)
+
+
+class FeeForecast:
+    """amounts / counts 形状为 (专利类型, 状态, 月份)"""
+
+    def __init__(self, start, amounts, counts):
+        self.start = start  # 第一个月（datetime64[M]）
+        self.amounts = amounts
+        self.counts = counts
+
+    @property
+    def months(self):
+        return self.start + np.arange(self.amounts.shape[2])
+
+    @property
+    def total(self):
+        return float(self.amounts.sum())
+
+    def table(self, by='type', freq='M', months=None, counts=False):
+        """按月（freq='M'）或按季度（'Q'）汇总的 DataFrame，列为专利类型或状态（by='status'）"""
+        import pandas as pd
+
+        values = self.counts if counts else self.amounts
+        months = months or values.shape[2]
+        matrix = values.sum(axis=1 if by == 'type' else 0)[:, :months]
+        labels = TYPE_LABELS if by == 'type' else STATUSES
+        periods = pd.PeriodIndex(self.months[:months], freq='M')
+        df = pd.DataFrame(matrix.T, index=periods, columns=labels)
+        if freq == 'Q':
+            df = df.groupby(periods.asfreq('Q')).sum()
+        df = df.loc[:, df.sum() != 0]
+        df.index = df.index.astype(str)
+        return df
+
+    def to_frame(self, months=None):
+        """导出用的明细：月份、专利类型、状态、笔数、金额（只含非零行）"""
+        import pandas as pd
+
+        months = months or self.amounts.shape[2]
+        # 按月份、专利类型、状态排序
+        m, t, s = np.nonzero(self.counts[:, :, :months].transpose(2, 0, 1))
+        return pd.DataFrame({
+            '月份': pd.PeriodIndex(self.months[m], freq='M').astype(str),
+            '专利类型': np.array(TYPE_LABELS)[t],
+            '状态': np.array(STATUSES)[s],
+            '笔数': self.counts[t, s, m],
+            '金额': self.amounts[t, s, m].round(2),
+        })
+
+
+def _column(df, name, default=np.nan):
+    return df[name].to_numpy(dtype=float, na_value=np.nan) if name in df else np.full(len(df), default)
+
+
+def build_forecast(df, reminder_days, today=None, months=FORECAST_MONTHS):
+    """由（已按年费规则修正的）专利数据计算预测，状态按每笔的截止日期与 reminder_days 判断"""
+    n = len(df)
+    start = np.datetime64(day_ordinal(today), 'D').astype('datetime64[M]')
+    codes = type_codes(df['专利类型']) if '专利类型' in df else np.full(n, -1)
+    type_index = np.where(codes >= 0, codes, len(PATENT_TYPES))
+
+    # 本期：表格金额 + 滞纳金，逾期的计入当月
+    due = df['缴费截止日期'].to_numpy(dtype='datetime64[D]')
+    amount = _column(df, '缴费金额')
+    current = np.nan_to_num(amount) + np.nan_to_num(_column(df, '滞纳金', 0.0))
+    flows_due, flows_amount, flows_row = [due], [current], [np.arange(n)]
+
+    # 以后各年度：按年费标准推算，保持本期费减比例
+    year = _column(df, '年费年度', 0.0)
+    year = np.where(np.isnan(year), 0, year).astype(np.int64)
+    if year.any() and '申请日' in df:
+        horizon = months // 12 + 1
+        later_due, later_fee = annuity_schedule(df['申请日'], df['专利类型'], np.where(year > 0, year + 1, 0),
+                                                horizon)
+        standard = ANNUITY_FEES[np.clip(codes, 0, None), np.clip(year, 0, 20)]
+        ratio = np.where((standard > 0) & ~np.isnan(amount), amount / np.where(standard > 0, standard, 1), 1.0)
+        # 无法按年费规则计算的行只计本期
+        ratio = np.where(year > 0, ratio, 0.0)
+        flows_due.append(later_due.ravel())
+        flows_amount.append((later_fee * ratio[:, None]).ravel())
+        flows_row.append(np.repeat(np.arange(n), horizon))
+
+    due = np.concatenate(flows_due)
+    amount = np.concatenate(flows_amount)
+    rows = np.concatenate(flows_row)
+    month = np.maximum((due.astype('datetime64[M]') - start).astype(np.int64), 0)
+    keep = ~np.isnat(due) & (month < months) & (amount > 0)
+    month, amount, rows = month[keep], amount[keep], rows[keep]
+    status = status_codes_for(due[keep], reminder_days, today)
+
+    shape = (len(TYPE_LABELS), len(STATUSES), months)
+    bucket = (type_index[rows] * shape[1] + status) * months + month
+    size = shape[0] * shape[1] * months
+    return FeeForecast(
+        start,
+        np.bincount(bucket, weights=amount, minlength=size).reshape(shape),
+        np.bincount(bucket, minlength=size).reshape(shape),
+    )
+
+
+def fee_forecast(dataset, reminder_days, today=None, months=FORECAST_MONTHS):
+    """数据集的年费现金流预测（按 提醒天数、日期、月数 缓存在 dataset 上）"""
+    def build():
+        return build_forecast(dataset.frame, reminder_days, today, months)
+    return dataset.derived(('fee_forecast', reminder_days, day_ordinal(today), months), build)
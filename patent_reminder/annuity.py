@@ -0,0 +1,213 @@
+"""年费期限计算：工作日历 + 按申请日、专利类型向量化计算整个专利组合
+
+规则（国家知识产权局）：
+- 年费应在每个申请日对应日前缴纳；期限届满日是法定休假日或周末的，顺延至其后的
+  第一个工作日（调休上班的周末视为工作日）
+- 届满后 6 个月为宽限期：超过 1 个月起每满 1 个月加收当年年费标准 5% 的滞纳金，最高 25%
+- 保护期：发明 20 年、实用新型 10 年、外观设计 15 年（2021-06-01 前申请的外观设计为 10 年）
+
+整列使用 datetime64[D] 数组运算与 np.busday_offset，不逐行计算。
+没有申请日或专利类型的行仍使用表格中的缴费截止日期，只按工作日历顺延。
+表格中的缴费截止日期视为当前待缴年度：计算出的期限是顺延后不早于它的第一个申请日对应日
+（之前的年度视为已缴），宽限期已过仍未更新的行保持已过期，不会推进到未缴的下一年度。
+"""
+import numpy as np
+import pandas as pd
+
+from .deadline_index import day_ordinal
+
+TYPE_INVENTION = '发明'
+TYPE_UTILITY = '实用新型'
+TYPE_DESIGN = '外观设计'
+PATENT_TYPES = (TYPE_INVENTION, TYPE_UTILITY, TYPE_DESIGN)
+
+# 年费标准（元），下标为年度（第 1～20 年），0 表示该年度无年费
+ANNUITY_FEES = np.zeros((len(PATENT_TYPES), 21))
+ANNUITY_FEES[0, 1:4], ANNUITY_FEES[0, 4:7], ANNUITY_FEES[0, 7:10] = 900, 1200, 2000
+ANNUITY_FEES[0, 10:13], ANNUITY_FEES[0, 13:16], ANNUITY_FEES[0, 16:21] = 4000, 6000, 8000
+ANNUITY_FEES[1:, 1:4], ANNUITY_FEES[1:, 4:6], ANNUITY_FEES[1:, 6:9], ANNUITY_FEES[1:, 9:11] = 600, 900, 1200, 2000
+ANNUITY_FEES[2, 11:16] = 3000
+
+# 保护期（年）
+TERMS = np.array([20, 10, 15])
+DESIGN_TERM_CHANGE = np.datetime64('2021-06-01')
+OLD_DESIGN_TERM = 10
+
+GRACE_MONTHS = 6
+SURCHARGE_RATE = 0.05
+MAX_SURCHARGE_MONTHS = 5
+
+# 法定节假日（放假日）与调休上班日，每年国务院办公厅公布放假安排后补充
+CN_HOLIDAYS = (
+    '2024-01-01', '2024-02-10', '2024-02-11', '2024-02-12', '2024-02-13', '2024-02-14',
+    '2024-02-15', '2024-02-16', '2024-02-17', '2024-04-04', '2024-04-05', '2024-04-06',
+    '2024-05-01', '2024-05-02', '2024-05-03', '2024-05-04', '2024-05-05', '2024-06-10',
+    '2024-09-15', '2024-09-16', '2024-09-17', '2024-10-01', '2024-10-02', '2024-10-03',
+    '2024-10-04', '2024-10-05', '2024-10-06', '2024-10-07',
+    '2025-01-01', '2025-01-28', '2025-01-29', '2025-01-30', '2025-01-31', '2025-02-01',
+    '2025-02-02', '2025-02-03', '2025-02-04', '2025-04-04', '2025-04-05', '2025-04-06',
+    '2025-05-01', '2025-05-02', '2025-05-03', '2025-05-04', '2025-05-05', '2025-05-31',
+    '2025-06-01', '2025-06-02', '2025-10-01', '2025-10-02', '2025-10-03', '2025-10-04',
+    '2025-10-05', '2025-10-06', '2025-10-07', '2025-10-08',
+    '2026-01-01', '2026-01-02', '2026-01-03', '2026-02-15', '2026-02-16', '2026-02-17',
+    '2026-02-18', '2026-02-19', '2026-02-20', '2026-02-21', '2026-02-22', '2026-02-23',
+    '2026-04-04', '2026-04-05', '2026-04-06', '2026-05-01', '2026-05-02', '2026-05-03',
+    '2026-05-04', '2026-05-05', '2026-06-19', '2026-06-20', '2026-06-21', '2026-09-25',
+    '2026-09-26', '2026-09-27', '2026-10-01', '2026-10-02', '2026-10-03', '2026-10-04',
+    '2026-10-05', '2026-10-06', '2026-10-07',
+)
+CN_MAKEUP_WORKDAYS = (
+    '2024-02-04', '2024-02-18', '2024-04-07', '2024-04-28', '2024-05-11', '2024-09-14',
+    '2024-09-29', '2024-10-12',
+    '2025-01-26', '2025-02-08', '2025-04-27', '2025-09-28', '2025-10-11',
+    '2026-01-04', '2026-02-14', '2026-02-28', '2026-05-09', '2026-09-20', '2026-10-10',
+)
+
+_CALENDAR_RANGE = ('1985-01-01', '2100-01-01')
+_calendar = None
+
+
+def business_calendar():
+    """工作日历：周末（调休上班日除外）与法定节假日为非工作日"""
+    global _calendar
+    if _calendar is None:
+        days = np.arange(*_CALENDAR_RANGE, dtype='datetime64[D]')
+        # 1970-01-01 是星期四，(天序号 + 3) % 7 为 0～6 对应周一至周日
+        weekend = (days.astype(np.int64) + 3) % 7 >= 5
+        closed = days[weekend & ~np.isin(days, np.array(CN_MAKEUP_WORKDAYS, dtype='datetime64[D]'))]
+        holidays = np.union1d(closed, np.array(CN_HOLIDAYS, dtype='datetime64[D]'))
+        _calendar = np.busdaycalendar(weekmask='1111111', holidays=holidays)
+    return _calendar
+
+
+def roll_forward(days):
+    """非工作日顺延到下一个工作日（NaT 保持不变）"""
+    return np.busday_offset(np.asarray(days, dtype='datetime64[D]'), 0, roll='forward',
+                            busdaycal=business_calendar())
+
+
+def add_months(days, months):
+    """日期加整月，月末不存在的日期取该月最后一天（如 2 月 29 日 -> 2 月 28 日）"""
+    days = np.asarray(days, dtype='datetime64[D]')
+    month_start = days.astype('datetime64[M]')
+    day_of_month = days - month_start.astype('datetime64[D]')
+    target = month_start + np.asarray(months)
+    last_day = (target + 1).astype('datetime64[D]') - 1
+    return np.minimum(target.astype('datetime64[D]') + day_of_month, last_day)
+
+
+def _months_between(start, end):
+    """start 到 end 之间满几个月"""
+    months = end.astype('datetime64[M]').astype(np.int64) - start.astype('datetime64[M]').astype(np.int64)
+    start_day = start - start.astype('datetime64[M]').astype('datetime64[D]')
+    end_day = end - end.astype('datetime64[M]').astype('datetime64[D]')
+    return months - (end_day < start_day)
+
+
+def type_codes(types):
+    """专利类型文本 -> 0 发明 / 1 实用新型 / 2 外观设计 / -1 未知"""
+    # 类型取值很少，只对去重后的值做字符串匹配
+    inverse, uniques = pd.factorize(pd.Series(types, dtype=object).fillna(''))
+    unique_codes = np.full(len(uniques) + 1, -1)
+    for i, value in enumerate(uniques):
+        text = str(value).strip()
+        for code, name in enumerate(PATENT_TYPES):
+            if text.startswith(name):
+                unique_codes[i] = code
+    return unique_codes[inverse]
+
+
+def _terms(codes, filing):
+    """每行的保护期（年）"""
+    terms = TERMS[np.clip(codes, 0, None)]
+    return np.where((codes == 2) & (filing < DESIGN_TERM_CHANGE), OLD_DESIGN_TERM, terms)
+
+
+def _first_anniversary_on_or_after(filing, deadlines):
+    """顺延后不早于 deadlines 的第一个申请日对应日的序号（deadlines 为 NaT 的行为 1）"""
+    deadlines = np.asarray(deadlines, dtype='datetime64[D]')
+    known = ~np.isnat(filing) & ~np.isnat(deadlines)
+    elapsed = deadlines.astype('datetime64[Y]').astype(np.int64) - filing.astype('datetime64[Y]').astype(np.int64)
+    k = np.where(known, np.maximum(1, elapsed - 1), 1)
+    # 比较顺延后的日期：表格中的日期通常已按节假日顺延
+    for _ in range(3):
+        k = np.where(known & (roll_forward(add_months(filing, 12 * k)) < deadlines), k + 1, k)
+    return k
+
+
+def compute_annuity(filing_dates, types, today=None, deadlines=None):
+    """计算每件专利当前应缴的年费期限
+
+    deadlines 为表格中的缴费截止日期（可为空）：有日期的行取不早于它的第一个申请日对应日，
+    既不退回已缴的年度，也不因宽限期已过跳过未缴的年度；没有日期的行按今天推算当前年度。
+    返回字典（均为与输入等长的数组）：
+    due 缴费截止日（已顺延）、grace_end 宽限期截止日（已顺延）、year 年费年度、
+    fee 年费标准、surcharge 按今天计算的滞纳金。无法计算（缺少申请日/类型、保护期已满）的行为 NaT/NaN。
+    """
+    filing = pd.to_datetime(pd.Series(filing_dates), errors='coerce').to_numpy(dtype='datetime64[D]')
+    codes = type_codes(types)
+    today_d = np.datetime64(day_ordinal(today), 'D')
+    valid = ~np.isnat(filing) & (codes >= 0)
+
+    # 没有表格日期时：从去年的申请日对应日开始，宽限期已过则顺延到下一个对应日（最多前进两次）
+    elapsed = today_d.astype('datetime64[Y]').astype(np.int64) - filing.astype('datetime64[Y]').astype(np.int64)
+    k = np.where(valid, np.maximum(1, elapsed - 1), 1)
+    for _ in range(3):
+        grace_end = roll_forward(add_months(add_months(filing, 12 * k), GRACE_MONTHS))
+        k = np.where(valid & (grace_end < today_d), k + 1, k)
+    if deadlines is not None:
+        deadlines = np.asarray(deadlines, dtype='datetime64[D]')
+        k = np.where(np.isnat(deadlines), k, _first_anniversary_on_or_after(filing, deadlines))
+    anniversary = add_months(filing, 12 * k)
+    grace_end = roll_forward(add_months(anniversary, GRACE_MONTHS))
+    due = roll_forward(anniversary)
+
+    year = k + 1
+    valid &= year <= _terms(codes, filing)
+
+    fee = ANNUITY_FEES[np.clip(codes, 0, None), np.clip(year, 0, 20)]
+    late_months = np.clip(_months_between(due, np.full(len(due), today_d)), 0, MAX_SURCHARGE_MONTHS)
+    surcharge = np.where(today_d > due, fee * SURCHARGE_RATE * late_months, 0.0)
+
+    nat = np.datetime64('NaT', 'D')
+    return {
+        'due': np.where(valid, due, nat),
+        'grace_end': np.where(valid, grace_end, nat),
+        'year': np.where(valid, year, 0),
+        'fee': np.where(valid, fee, np.nan),
+        'surcharge': np.where(valid, surcharge, np.nan),
+    }
+
+
+def annuity_schedule(filing_dates, types, first_year, count):
+    """每行从 first_year 起连续 count 个年度的缴费截止日（已顺延）与年费标准
+
+    返回 (due, fee)，形状均为 (行数, count)；超出保护期或无法计算的年度 due 为 NaT、fee 为 0。
+    """
+    filing = pd.to_datetime(pd.Series(filing_dates), errors='coerce').to_numpy(dtype='datetime64[D]')
+    codes = type_codes(types)
+    years = np.asarray(first_year, dtype=np.int64)[:, None] + np.arange(count)
+    valid = ((~np.isnat(filing) & (codes >= 0))[:, None]
+             & (years >= 1) & (years <= _terms(codes, filing)[:, None]))
+    due = roll_forward(add_months(filing[:, None], 12 * (years - 1)))
+    fee = ANNUITY_FEES[np.clip(codes, 0, None)[:, None], np.clip(years, 0, 20)]
+    return np.where(valid, due, np.datetime64('NaT', 'D')), np.where(valid, fee, 0.0)
+
+
+def annuity_columns(df, today=None):
+    """按年费规则计算的列：修正后的 缴费截止日期，以及 年费年度、宽限期截止日、滞纳金
+
+    有申请日和专利类型的行使用计算出的截止日期（不早于表格中的日期），其余行沿用表格中的日期并按工作日历顺延。
+    只读取 缴费截止日期、申请日、专利类型 三列。
+    """
+    deadlines = roll_forward(df['缴费截止日期'].to_numpy(dtype='datetime64[D]'))
+    if '申请日' not in df or '专利类型' not in df:
+        return {'缴费截止日期': pd.to_datetime(deadlines)}
+    result = compute_annuity(df['申请日'], df['专利类型'], today, deadlines)
+    computed = ~np.isnat(result['due'])
+    return {
+        '缴费截止日期': pd.to_datetime(np.where(computed, result['due'], deadlines)),
+        '年费年度': pd.Series(result['year'], index=df.index).where(computed).astype('Int64'),
+        '宽限期截止日': pd.to_datetime(result['grace_end']),
+        '滞纳金': result['surcharge'],
+    }
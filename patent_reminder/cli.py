@@ -0,0 +1,258 @@
+"""命令行入口：python -m patent_reminder <命令>
+
+- check：统计已过期 / 即将到期 / 正常的专利数，列出需要提醒的专利（不发送）
+- send：执行一次提醒发送（与调度器共用租约，不会重复发送）
+- import：导入 Excel / CSV / Parquet 专利数据
+- export：导出全部专利（带状态列）、需要关注的专利或提醒记录（.csv / .xlsx / .parquet，分块写出）
+- search：按专利号前缀（可带或不带 ZL 与校验位）或名称片段检索，按匹配度排序
+- forecast：未来 1～3 年的年费现金流预测（按月 / 季度，按专利类型或状态拆分）
+- status：输出调度器状态（JSON）
+- workspace：列出 / 新建工作区；其他命令加 --workspace 名称 即在该工作区中执行
+
+加 --profile 时对本次命令做函数级分析，报告输出到标准错误。
+pandas 等较重的模块只在命令执行时导入，--help 与 status 不会加载它们。
+"""
+import argparse
+import json
+import sys
+
+from . import settings
+
+
+def _workspace_store(args):
+    """--workspace 指定的工作区的数据库，未指定时为 --db"""
+    from .store import get_store
+    from .workspaces import WorkspaceError, get_workspace
+
+    if not args.workspace:
+        return get_store(args.db)
+    try:
+        return get_workspace(args.workspace).store
+    except WorkspaceError as e:
+        sys.exit(str(e))
+
+
+def _open_store(args):
+    from .migrate import migrate_pickles
+
+    store = _workspace_store(args)
+    # 旧版 pickle 数据只迁移到默认数据库
+    if not args.workspace:
+        migrate_pickles(store)
+    return store
+
+
+def _reminder_days(store, days):
+    if days is not None:
+        return days
+    return store.settings.get('reminder_days', settings.DEFAULT_REMINDER_DAYS)
+
+
+def cmd_check(args):
+    from .dataset import get_dataset
+    from .reminders import attention_frame
+
+    store = _open_store(args)
+    dataset = get_dataset(store)
+    if dataset.empty:
+        print("无专利数据")
+        return 0
+    days = _reminder_days(store, args.days)
+    counts = dataset.index.counts(days)
+    print("，".join(f"{status} {count} 项" for status, count in counts.items())
+          + f"（提醒天数 {days}）")
+    patents = attention_frame(dataset, days)
+    if not patents.empty and args.limit:
+        columns = ['专利号', '专利名称', '缴费截止日期', '距离到期天数', '状态']
+        print(patents[columns].head(args.limit).to_string(index=False))
+        if len(patents) > args.limit:
+            print(f"……共 {len(patents)} 项")
+    # 有需要提醒的专利时以 2 退出，便于 cron / 监控脚本判断
+    return 2 if len(patents) else 0
+
+
+def cmd_send(args):
+    from .reminders import run_reminders
+
+    success, msg = run_reminders(_open_store(args))
+    print(msg)
+    return 0 if success else 1
+
+
+def cmd_import(args):
+    from .importer import ImportFormatError, import_patents
+
+    store = _open_store(args)
+    try:
+        report = import_patents(args.file, args.file, store, merge=args.merge, tombstone=args.tombstone)
+    except (ImportFormatError, OSError) as e:
+        print(f"导入失败：{e}", file=sys.stderr)
+        return 1
+    if report.file_unchanged:
+        print("文件与上次导入相同，已跳过")
+        return 0
+    print(f"已导入 {report.rows_imported} 行：新增 {report.added}，变化 {report.changed}，"
+          f"删除 {report.removed}，无效行 {report.error_count}")
+    for error in report.errors[:20]:
+        print(f"  {error.sheet} 第 {error.row} 行：{error.message}", file=sys.stderr)
+    return 0
+
+
+def cmd_export(args):
+    from .dataset import get_dataset
+    from .exporter import export_chunks, export_frame, write_chunks
+
+    store = _open_store(args)
+    days = _reminder_days(store, args.days)
+    if args.kind != 'history' and get_dataset(store).empty:
+        print("无专利数据", file=sys.stderr)
+        return 1
+    try:
+        if args.status and args.kind == 'portfolio':
+            df = get_dataset(store).classified(days)
+            rows = export_frame(df[df['状态'].isin(args.status)], args.file)
+        else:
+            rows = write_chunks(export_chunks(store, args.kind, days), args.file)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"已导出 {rows} 行 -> {args.file}")
+    return 0
+
+
+def cmd_search(args):
+    from .dataset import get_dataset
+    from .search import search_patents
+
+    store = _open_store(args)
+    dataset = get_dataset(store)
+    if dataset.empty:
+        print("无专利数据", file=sys.stderr)
+        return 1
+    found = search_patents(dataset, args.query, args.limit, _reminder_days(store, args.days))
+    if found.empty:
+        print("没有匹配的专利")
+        return 1
+    columns = ['匹配度', '专利号', '专利名称', '缴费截止日期', '距离到期天数', '状态']
+    print(found[columns].to_string(index=False))
+    return 0
+
+
+def cmd_forecast(args):
+    from .analytics import fee_forecast
+    from .dataset import get_dataset
+    from .exporter import export_frame
+
+    store = _open_store(args)
+    dataset = get_dataset(store)
+    if dataset.empty:
+        print("无专利数据", file=sys.stderr)
+        return 1
+    forecast = fee_forecast(dataset, _reminder_days(store, args.days))
+    if args.file:
+        try:
+            rows = export_frame(forecast.to_frame(args.months), args.file)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"已导出 {rows} 行 -> {args.file}")
+        return 0
+    table = forecast.table(args.by, 'Q' if args.quarterly else 'M', args.months)
+    print(table.to_string(float_format=lambda x: f"{x:,.0f}"))
+    print(f"合计 {table.to_numpy().sum():,.0f} 元")
+    return 0
+
+
+def cmd_status(args):
+    from .health import status_payload
+
+    print(json.dumps(status_payload(_workspace_store(args)), ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_workspace(args):
+    from .workspaces import WorkspaceError, all_workspaces, create_workspace
+
+    if args.action == 'create':
+        try:
+            workspace = create_workspace(args.name, args.max_jobs)
+        except WorkspaceError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"已创建工作区 {workspace.name} -> {workspace.db_path}")
+        return 0
+    for workspace in all_workspaces():
+        print(f"{workspace.name}\t配额 {workspace.max_jobs}\t{workspace.db_path}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m patent_reminder", description="专利缴费提醒")
+    parser.add_argument("--db", default=settings.DB_FILE, help="数据库文件")
+    parser.add_argument("--workspace", help="工作区名称（指定时忽略 --db）")
+    parser.add_argument("--profile", action="store_true", help="输出本次命令的性能分析报告")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    check = commands.add_parser("check", help="检查到期情况（不发送）")
+    check.add_argument("--days", type=int, help="提醒提前天数（默认使用页面保存的设置）")
+    check.add_argument("--limit", type=int, default=20, help="最多列出的专利数，0 表示只输出统计")
+    check.set_defaults(func=cmd_check)
+
+    send = commands.add_parser("send", help="执行一次提醒发送")
+    send.set_defaults(func=cmd_send)
+
+    imp = commands.add_parser("import", help="导入专利数据")
+    imp.add_argument("file", help="Excel / CSV / Parquet 文件")
+    imp.add_argument("--merge", action="store_true", help="按 (专利号, 缴费截止日期) 合并，而不是整体替换")
+    imp.add_argument("--tombstone", action="store_true", help="合并时把文件中缺失的专利标记为已删除")
+    imp.set_defaults(func=cmd_import)
+
+    exp = commands.add_parser("export", help="导出专利数据或提醒记录")
+    exp.add_argument("file", help="输出文件（.csv / .xlsx / .parquet）")
+    exp.add_argument("--kind", choices=['portfolio', 'due', 'history'], default='portfolio',
+                     help="全部专利、需要关注的专利或提醒记录")
+    exp.add_argument("--days", type=int, help="提醒提前天数（默认使用页面保存的设置）")
+    exp.add_argument("--status", nargs="+", choices=['已过期', '即将到期', '正常'],
+                     help="只导出这些状态（全部专利）")
+    exp.set_defaults(func=cmd_export)
+
+    search = commands.add_parser("search", help="检索专利号或名称")
+    search.add_argument("query", help="专利号前缀或名称片段")
+    search.add_argument("--limit", type=int, default=20, help="最多列出的专利数")
+    search.add_argument("--days", type=int, help="提醒提前天数（默认使用页面保存的设置）")
+    search.set_defaults(func=cmd_search)
+
+    fc = commands.add_parser("forecast", help="年费现金流预测")
+    fc.add_argument("file", nargs="?", help="导出明细（.csv / .xlsx / .parquet），省略时打印汇总表")
+    fc.add_argument("--months", type=int, default=36, choices=[12, 24, 36], help="预测月数")
+    fc.add_argument("--quarterly", action="store_true", help="按季度汇总")
+    fc.add_argument("--by", choices=['type', 'status'], default='type', help="按专利类型或状态拆分")
+    fc.add_argument("--days", type=int, help="提醒提前天数（影响状态拆分）")
+    fc.set_defaults(func=cmd_forecast)
+
+    status = commands.add_parser("status", help="输出调度器状态（JSON）")
+    status.set_defaults(func=cmd_status)
+
+    ws = commands.add_parser("workspace", help="列出 / 新建工作区")
+    ws.add_argument("action", choices=['list', 'create'])
+    ws.add_argument("name", nargs="?", help="新建的工作区名称")
+    ws.add_argument("--max-jobs", type=int, help="同时执行的任务数配额")
+    ws.set_defaults(func=cmd_workspace)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.profile:
+        return args.func(args)
+    from .profiling import RunProfiler
+
+    profiler = RunProfiler().start()
+    try:
+        return args.func(args)
+    finally:
+        print(profiler.stop().report(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""进程级专利数据缓存
+
+所有 Streamlit 会话与后台调度器共用同一份只读的专利数据、到期日索引及派生列，
+会话中只保存各自的界面状态。缓存以数据库中的 dataset_version 为版本戳：
+导入在同一事务内递增版本号，下一次读取发现版本变化时整体替换缓存对象，
+正在使用旧对象的会话不受影响。
+
+缴费截止日期按年费规则与工作日历计算（见 annuity.py），结果随日期变化，
+因此日期变化时也会重新构建。
+
+数据优先从列式快照（见 snapshot.py）内存映射读取，快照不存在时读取数据库并写出快照，
+之后其他进程冷启动只需映射文件。构建到期日索引只读取 KEY_COLUMNS，
+其余列在首次访问 frame 时才读取。
+"""
+import logging
+import threading
+
+from .annuity import annuity_columns
+from .deadline_index import DeadlineIndex, day_ordinal
+from .profiling import timed
+from .snapshot import Snapshot, open_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# 每份数据最多缓存的派生结果个数（分类结果、统计等）
+MAX_DERIVED = 16
+# 计算截止日期与分类所需的列
+KEY_COLUMNS = ('专利号', '缴费截止日期', '申请日', '专利类型')
+
+
+def _with_columns(frame, columns):
+    """替换 / 追加列并返回新的 DataFrame，其余列与原数据共享内存（DataFrame.assign 会整体复制）"""
+    import pandas as pd
+
+    data = {name: frame[name] for name in frame.columns}
+    data.update(columns)
+    return pd.DataFrame(data, index=frame.index, copy=False)
+
+
+class Dataset:
+    """某一版本的专利数据（只读，调用方不要修改 frame）
+
+    source 为 DataFrame 或 Snapshot，为 None 时表示没有数据。
+    """
+
+    def __init__(self, version, source, today=None):
+        self.version = version
+        self.built_on = day_ordinal(today)
+        self._source = source
+        self._frame = None
+        self._derived = {}
+        # 可重入：derived() 的构建函数中可以访问 frame
+        self._lock = threading.RLock()
+        self.index = None
+        if source is not None:
+            keys = source.frame(KEY_COLUMNS) if isinstance(source, Snapshot) else source
+            self._rules = annuity_columns(keys, today)
+            self.index = DeadlineIndex(self._rules['缴费截止日期'])
+
+    @property
+    def empty(self):
+        return self._source is None
+
+    @property
+    def frame(self):
+        """按年费规则修正后的完整数据，首次访问时读取全部列"""
+        if self._frame is None and self._source is not None:
+            with self._lock:
+                if self._frame is None:
+                    with timed('load_columns'):
+                        source = self._source
+                        if isinstance(source, Snapshot):
+                            source = source.frame()
+                        self._frame = _with_columns(source, self._rules)
+        return self._frame
+
+    def derived(self, key, build):
+        """按 key 缓存 build() 的结果（派生数据随本对象一起在版本变化时丢弃）"""
+        with self._lock:
+            value = self._derived.get(key)
+            if value is None:
+                value = build()
+                if len(self._derived) >= MAX_DERIVED:
+                    self._derived.pop(next(iter(self._derived)))
+                self._derived[key] = value
+            return value
+
+    def classified(self, reminder_days, today=None):
+        """带 距离到期天数、状态 两列的数据，按 (提醒天数, 日期) 缓存"""
+        def build():
+            frame = self.frame
+            with timed('classify'):
+                return _with_columns(frame, {
+                    '距离到期天数': self.index.days_to_deadline(today),
+                    '状态': self.index.status_column(reminder_days, today),
+                })
+        return self.derived(('classified', reminder_days, day_ordinal(today)), build)
+
+
+def dataset_stamp(store, version):
+    # 版本号之外加上导入时生成的随机令牌，数据库重建后版本号从头计数也不会误用旧快照
+    return f"v{version}-{store.settings.get('dataset_token', '')}"
+
+
+def _load_source(store, version):
+    """优先打开快照；没有快照时读取数据库并写出快照"""
+    stamp = dataset_stamp(store, version)
+    snapshot = open_snapshot(store.path, stamp)
+    if snapshot is not None:
+        return snapshot
+    frame = store.load_patents()
+    # 读取期间有新的导入时不写快照，避免旧版本戳对应新数据
+    if frame is not None and dataset_stamp(store, store.settings.get('dataset_version', 0)) == stamp:
+        try:
+            write_snapshot(frame, store.path, stamp)
+        except OSError:
+            logger.exception("写入数据快照失败")
+    return frame
+
+
+_cache_lock = threading.Lock()
+_cache = {}  # 数据库路径 -> Dataset
+
+
+def get_dataset(store):
+    """返回当前版本的数据，版本变化时才重新读取数据库并构建索引"""
+    version = store.settings.get('dataset_version', 0)
+    today = day_ordinal()
+    dataset = _cache.get(store.path)
+    if dataset is not None and (dataset.version, dataset.built_on) == (version, today):
+        return dataset
+    with _cache_lock:
+        dataset = _cache.get(store.path)
+        if dataset is None or (dataset.version, dataset.built_on) != (version, today):
+            with timed('load'):
+                dataset = _cache[store.path] = Dataset(version, _load_source(store, version))
+        return dataset
+
+
+def invalidate(store=None):
+    """丢弃缓存（store 为空时丢弃全部）"""
+    with _cache_lock:
+        if store is None:
+            _cache.clear()
+        else:
+            _cache.pop(store.path, None)
@@ -0,0 +1,110 @@
+"""到期日索引：按缴费截止日期排序的天序号数组 + 行置换
+
+每次上传只构建一次。"已过期"、"提前 N 天内到期"、"正常"三类都由二分查找
+切片得到，调整提醒天数只需一次 bisect，不再逐行计算。
+"""
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+STATUS_EXPIRED = '已过期'
+STATUS_DUE = '即将到期'
+STATUS_NORMAL = '正常'
+# status_codes 返回的编码顺序
+STATUSES = (STATUS_EXPIRED, STATUS_DUE, STATUS_NORMAL)
+
+# 缺失截止日期的行排在最后，始终归为"正常"
+_MISSING = np.iinfo(np.int64).max
+
+_EPOCH = date(1970, 1, 1)
+
+
+def day_ordinal(value=None):
+    """日期转为 1970-01-01 起的天数（与 datetime64[D] 一致）"""
+    if value is None:
+        value = date.today()
+    elif isinstance(value, datetime):
+        value = value.date()
+    return (value - _EPOCH).days
+
+
+def status_codes_for(deadlines, reminder_days, today=None):
+    """任意一组截止日期（datetime64[D]）的状态编码，规则与 DeadlineIndex.status_codes 相同"""
+    days = np.asarray(deadlines, dtype='datetime64[D]')
+    t = day_ordinal(today)
+    raw = days.astype(np.int64)
+    codes = np.full(len(days), STATUSES.index(STATUS_NORMAL), dtype=np.int8)
+    codes[(raw <= t + reminder_days) & ~np.isnat(days)] = STATUSES.index(STATUS_DUE)
+    codes[(raw < t) & ~np.isnat(days)] = STATUSES.index(STATUS_EXPIRED)
+    return codes
+
+
+class DeadlineIndex:
+    """截止日期排序索引
+
+    days：升序排列的天序号（int64）
+    order：days[i] 对应的原始行位置
+    """
+
+    def __init__(self, deadlines):
+        values = pd.to_datetime(pd.Series(deadlines)).to_numpy(dtype='datetime64[D]')
+        raw = values.astype(np.int64)
+        missing = np.isnat(values)
+        raw[missing] = _MISSING
+        self.raw_days = raw
+        self.missing = missing
+        self.order = np.argsort(raw, kind='stable')
+        self.days = raw[self.order]
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(df['缴费截止日期'])
+
+    def __len__(self):
+        return len(self.days)
+
+    def bounds(self, reminder_days, today=None):
+        """返回 (lo, hi)：order[:lo] 已过期，order[lo:hi] 即将到期，其余正常"""
+        t = day_ordinal(today)
+        lo = int(np.searchsorted(self.days, t, side='left'))
+        hi = int(np.searchsorted(self.days, t + reminder_days, side='right'))
+        return lo, max(lo, hi)
+
+    def due(self, reminder_days, today=None):
+        """即将到期的行位置，按截止日期升序"""
+        lo, hi = self.bounds(reminder_days, today)
+        return self.order[lo:hi]
+
+    def attention(self, reminder_days, today=None):
+        """需要提醒（已过期 + 即将到期）的行位置，按截止日期升序"""
+        _, hi = self.bounds(reminder_days, today)
+        return self.order[:hi]
+
+    def counts(self, reminder_days, today=None):
+        lo, hi = self.bounds(reminder_days, today)
+        return {
+            STATUS_EXPIRED: lo,
+            STATUS_DUE: hi - lo,
+            STATUS_NORMAL: len(self.days) - hi,
+        }
+
+    def days_to_deadline(self, today=None):
+        """按原始行顺序返回距离到期天数（缺失日期为 NaN）"""
+        diff = self.raw_days - day_ordinal(today)
+        if self.missing.any():
+            diff = diff.astype(float)
+            diff[self.missing] = np.nan
+        return diff
+
+    def status_codes(self, reminder_days, today=None):
+        """按原始行顺序返回状态编码（STATUSES 中的下标）"""
+        lo, hi = self.bounds(reminder_days, today)
+        codes = np.full(len(self.days), STATUSES.index(STATUS_NORMAL), dtype=np.int8)
+        codes[self.order[:lo]] = STATUSES.index(STATUS_EXPIRED)
+        codes[self.order[lo:hi]] = STATUSES.index(STATUS_DUE)
+        return codes
+
+    def status_column(self, reminder_days, today=None):
+        """按原始行顺序返回状态数组"""
+        return np.array(STATUSES, dtype=object)[self.status_codes(reminder_days, today)]
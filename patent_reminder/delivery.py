@@ -0,0 +1,245 @@
+"""邮件投递：连接复用、限速、重试与持久化发件箱
+
+- 邮件先写入数据库 outbox 表，再由 DeliveryEngine.flush() 发送，进程重启后仍会继续重试
+- 同一 SMTP 账号复用一个已登录连接，单次会话连续发送多封邮件，减少 TLS 握手与登录次数
+- 令牌桶限制发送速率，避免触发 QQ / Exchange 的频率限制
+- 4xx 临时错误与网络错误按指数退避重试，5xx 永久错误直接标记失败
+- 每封邮件发送前在数据库中认领（claim_outbox），多个进程同时 flush 或一轮发送超过
+  检查租约时长时，同一封邮件也只会被发送一次
+"""
+import random
+import smtplib
+import ssl
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.utils import getaddresses
+
+from . import settings
+from .profiling import timed
+
+# error 为失败时的异常类名，latency_ms 为本封邮件的发送耗时（含等待连接）
+DeliveryResult = namedtuple('DeliveryResult', 'success message recipient error latency_ms',
+                            defaults=(None, None))
+
+
+class TokenBucket:
+    """令牌桶限速器，acquire() 在令牌不足时阻塞等待"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SMTPConnectionPool:
+    """按 (服务器, 端口, 账号) 复用的已登录 SMTP 连接
+
+    连接在发送 SMTP_MAX_MESSAGES_PER_SESSION 封后或空闲超时后重建。
+    本地测试服务器（不支持 STARTTLS / AUTH）也可直接使用。
+    """
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self.lock = threading.Lock()
+        self._server = None
+        self._sent_in_session = 0
+        self._last_used = 0.0
+
+    @timed('smtp_connect')
+    def _connect(self):
+        cfg = self.cfg
+        port = int(cfg["smtp_port"])
+        timeout = settings.SMTP_TIMEOUT_SECONDS
+        context = ssl.create_default_context()
+        if port == 465:
+            server = smtplib.SMTP_SSL(cfg["smtp_server"], port, context=context, timeout=timeout)
+        else:
+            server = smtplib.SMTP(cfg["smtp_server"], port, timeout=timeout)
+            server.ehlo()
+            if server.has_extn('starttls'):
+                server.starttls(context=context)
+                server.ehlo()
+        if cfg.get("sender_password") and server.has_extn('auth'):
+            server.login(cfg["sender_email"], cfg["sender_password"])
+        return server
+
+    def _alive(self):
+        if self._server is None:
+            return False
+        if self._sent_in_session >= settings.SMTP_MAX_MESSAGES_PER_SESSION:
+            return False
+        if time.monotonic() - self._last_used > settings.SMTP_IDLE_SECONDS:
+            return False
+        try:
+            return self._server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    @contextmanager
+    def connection(self):
+        """取得可用连接；发送出错时丢弃连接，下次重新建立"""
+        with self.lock:
+            if not self._alive():
+                self.close()
+                self._server = self._connect()
+                self._sent_in_session = 0
+            try:
+                yield self._server
+            except Exception as e:
+                if _is_connection_error(e):
+                    self._discard()
+                else:
+                    # 单封邮件被拒绝时重置会话，连接继续复用
+                    try:
+                        self._server.rset()
+                    except Exception:
+                        self._discard()
+                raise
+            finally:
+                self._last_used = time.monotonic()
+
+    def record_sent(self):
+        self._sent_in_session += 1
+
+    def _discard(self):
+        self._server = None
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_buckets = {}
+
+
+def get_pool(cfg):
+    """同一账号在进程内共用一个连接池与令牌桶"""
+    key = (cfg["smtp_server"], int(cfg["smtp_port"]), cfg["sender_email"])
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.cfg.get("sender_password") != cfg.get("sender_password"):
+            if pool is not None:
+                pool.close()
+            pool = _pools[key] = SMTPConnectionPool(dict(cfg))
+            _buckets.setdefault(key, TokenBucket(settings.SMTP_RATE_PER_SECOND, settings.SMTP_BURST))
+        return pool, _buckets[key]
+
+
+def backoff_delay(attempts):
+    """第 attempts 次失败后的等待秒数（指数退避 + 抖动）"""
+    delay = min(settings.OUTBOX_RETRY_MAX_SECONDS, settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** attempts)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def describe_error(error):
+    """把 SMTP 异常转换为中文说明"""
+    if isinstance(error, smtplib.SMTPAuthenticationError):
+        return "认证失败：请检查邮箱账号或授权码是否正确"
+    if isinstance(error, (smtplib.SMTPConnectError, ConnectionRefusedError)):
+        return "连接失败：请检查SMTP服务器地址或端口是否正确"
+    return f"发送失败：{str(error)}"
+
+
+def _is_connection_error(error):
+    """服务器不可用（认证失败、连接失败、断线、超时）"""
+    if isinstance(error, (smtplib.SMTPAuthenticationError, smtplib.SMTPConnectError,
+                          smtplib.SMTPServerDisconnected)):
+        return True
+    # SMTPException 也是 OSError 的子类，这里只把纯网络错误算作连接错误
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def _is_temporary(error):
+    # 连接类错误（含认证失败，可能是授权码尚未更新）稍后重试
+    if _is_connection_error(error):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return all(400 <= code < 500 for code in codes)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return False
+
+
+class DeliveryEngine:
+    """从发件箱批量发送邮件"""
+
+    def __init__(self, store, cfg):
+        self.store = store
+        self.cfg = cfg
+        self.pool, self.bucket = get_pool(cfg)
+
+    def enqueue(self, msg):
+        """写入发件箱，返回 outbox id"""
+        return self.store.enqueue_outbox(msg['To'], msg['Subject'], msg.as_bytes())
+
+    @timed('send')
+    def _send(self, server, recipient, message):
+        recipients = [addr for _, addr in getaddresses([recipient]) if addr]
+        server.sendmail(self.cfg["sender_email"], recipients, message)
+
+    def flush(self, ids=None, now=None, cancel=None):
+        """发送到期的邮件，返回 {outbox_id: DeliveryResult}
+
+        ids 不为空时只发送指定的邮件（仍需处于待发送状态）。
+        认证失败或连接失败、或 cancel（threading.Event）被设置时停止本轮发送，剩余邮件留待下一轮。
+        """
+        now = now or datetime.now()
+        results = {}
+        due = self.store.due_outbox(now)
+        if ids is not None:
+            due = [row for row in due if row[0] in ids]
+        for outbox_id, recipient, message, attempts in due:
+            if cancel is not None and cancel.is_set():
+                break
+            # 已被其他进程认领或发出的邮件跳过
+            if not self.store.claim_outbox(outbox_id, now):
+                continue
+            self.bucket.acquire()
+            started = time.perf_counter()
+            try:
+                with self.pool.connection() as server:
+                    self._send(server, recipient, message)
+                    self.pool.record_sent()
+            except Exception as e:
+                msg = describe_error(e)
+                if _is_temporary(e) and attempts + 1 < settings.OUTBOX_MAX_ATTEMPTS:
+                    retry_at = datetime.now() + timedelta(seconds=backoff_delay(attempts))
+                    self.store.mark_outbox_retry(outbox_id, retry_at, msg)
+                else:
+                    self.store.mark_outbox_failed(outbox_id, msg)
+                results[outbox_id] = DeliveryResult(False, msg, recipient, type(e).__name__,
+                                                    (time.perf_counter() - started) * 1000)
+                if _is_connection_error(e):
+                    # 服务器不可用时停止本轮，剩余邮件保持待发送，下一轮再试
+                    break
+                continue
+            self.store.mark_outbox_sent(outbox_id)
+            results[outbox_id] = DeliveryResult(True, "邮件发送成功", recipient, None,
+                                                (time.perf_counter() - started) * 1000)
+        return results
@@ -0,0 +1,99 @@
+"""本地 SMTP 测试服务器（aiosmtpd 风格的替身，仅用于开发与压测）
+
+用法：python -m patent_reminder.devsmtp --port 1025
+收到的邮件保存在 server.messages 中；fail_next 可注入临时错误以测试重试逻辑。
+不支持 STARTTLS 与 AUTH，DeliveryEngine 会自动跳过这两步。
+"""
+import argparse
+import socketserver
+import sys
+import threading
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        server = self.server
+        self._reply("220 devsmtp ready")
+        mail_from, rcpts = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb in ('EHLO', 'HELO'):
+                self._reply("250 devsmtp")
+            elif verb == 'MAIL':
+                mail_from, rcpts = command[10:].strip(' <>'), []
+                self._reply("250 OK")
+            elif verb == 'RCPT':
+                rcpts.append(command[8:].strip(' <>'))
+                self._reply("250 OK")
+            elif verb == 'DATA':
+                with server.lock:
+                    if server.fail_next > 0:
+                        server.fail_next -= 1
+                        self._reply("451 Try again later")
+                        continue
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                chunks = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                    chunks.append(data[1:] if data.startswith(b"..") else data)
+                with server.lock:
+                    server.messages.append((mail_from, rcpts, b"".join(chunks)))
+                self._reply("250 OK: queued")
+            elif verb == 'RSET':
+                mail_from, rcpts = None, []
+                self._reply("250 OK")
+            elif verb == 'NOOP':
+                self._reply("250 OK")
+            elif verb == 'QUIT':
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class DevSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0):
+        super().__init__((host, port), _Handler)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.fail_next = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """在后台线程中运行，返回自身"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地 SMTP 测试服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args(argv)
+    server = DevSMTPServer(args.host, args.port)
+    print(f"devsmtp 监听 {args.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
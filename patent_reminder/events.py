@@ -0,0 +1,130 @@
+"""结构化事件日志：检查、发送等事件写入数据库 events 表，并另存一份 JSON Lines 文件
+
+- record() 只追加到内存缓冲区；缓冲区满 EVENT_BUFFER_SIZE 条、距上次写入超过
+  EVENT_FLUSH_SECONDS 秒、每轮检查结束或进程退出时批量写入（一个事务 + 一次文件写入）
+- events 表按 ts、(kind, ts) 建索引，按时间范围统计、查询多年的历史也只扫描对应区间
+- 默认数据库写入 EVENT_LOG_FILE，其他数据库（工作区）写入数据库所在目录的 events.jsonl
+- JSON Lines 文件超过 EVENT_LOG_MAX_BYTES 或跨过零点（EVENT_LOG_ROTATE_DAILY）时轮转，
+  保留 EVENT_LOG_BACKUPS 个；
+  多个进程写同一文件时轮转可能丢失少量行，以数据库为准
+- 写入失败只记录到 logging，不影响检查与发送
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+from . import settings
+
+logger = logging.getLogger(__name__)
+
+KIND_CHECK = 'check'
+KIND_SEND = 'send'
+KIND_LABELS = {KIND_CHECK: '检查', KIND_SEND: '发送'}
+
+# events 表的列，其余字段以 JSON 保存在 data 列
+COLUMNS = ('ts', 'kind', 'success', 'recipient', 'patents', 'latency_ms', 'error_class', 'message')
+
+_handlers = {}
+_handlers_lock = threading.Lock()
+
+
+class _RotatingHandler(logging.handlers.RotatingFileHandler):
+    """按大小轮转，另外在日期变化后（按文件最后修改日期判断）轮转"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        try:
+            self._day = date.fromtimestamp(os.path.getmtime(self.baseFilename))
+        except OSError:
+            self._day = date.today()
+
+    def shouldRollover(self, record):
+        if settings.EVENT_LOG_ROTATE_DAILY and date.today() != self._day and os.path.exists(self.baseFilename):
+            return True
+        return super().shouldRollover(record)
+
+    def emit(self, record):
+        super().emit(record)
+        # 记录最后写入的日期（delay=True 时文件在首次写入才创建）
+        self._day = date.today()
+
+
+def _file_handler(path):
+    # 同一文件在进程内共用一个轮转 handler，文件保持打开，不再每条日志打开一次
+    with _handlers_lock:
+        handler = _handlers.get(path)
+        if handler is None:
+            handler = _handlers[path] = _RotatingHandler(
+                path, maxBytes=settings.EVENT_LOG_MAX_BYTES,
+                backupCount=settings.EVENT_LOG_BACKUPS, encoding='utf-8', delay=True)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+        return handler
+
+
+def log_file(db_path):
+    """数据库对应的 JSON Lines 文件（未配置 EVENT_LOG_FILE 时为空）"""
+    if not settings.EVENT_LOG_FILE or os.path.abspath(db_path) == os.path.abspath(settings.DB_FILE):
+        return settings.EVENT_LOG_FILE
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), "events.jsonl")
+
+
+class EventLog:
+    """带缓冲的事件日志（每个 PatentStore 一个）"""
+
+    def __init__(self, store):
+        self.store = store
+        self.path = log_file(store.path)
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def record(self, kind, success=None, recipient=None, patents=None, latency_ms=None,
+               error_class=None, message='', **data):
+        """追加一条事件，data 为额外字段"""
+        event = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'kind': kind,
+            'success': success,
+            'recipient': recipient,
+            'patents': patents,
+            'latency_ms': None if latency_ms is None else round(latency_ms, 1),
+            'error_class': error_class,
+            'message': message,
+        }
+        event.update(data)
+        with self._lock:
+            self._buffer.append(event)
+            due = (len(self._buffer) >= settings.EVENT_BUFFER_SIZE
+                   or time.monotonic() - self._last_flush >= settings.EVENT_FLUSH_SECONDS)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """把缓冲区中的事件写入数据库与 JSON Lines 文件"""
+        with self._lock:
+            events, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+        if not events:
+            return
+        try:
+            self.store.insert_events([
+                tuple(event.get(col) for col in COLUMNS)
+                + (json.dumps({k: v for k, v in event.items() if k not in COLUMNS}, ensure_ascii=False)
+                   if len(event) > len(COLUMNS) else None,)
+                for event in events])
+        except sqlite3.Error:
+            logger.exception("写入事件日志失败（数据库）")
+        if self.path:
+            try:
+                # 整批作为一条记录写出：一次写入、一次轮转检查
+                lines = "\n".join(json.dumps(event, ensure_ascii=False, default=str) for event in events)
+                _file_handler(self.path).handle(logging.makeLogRecord({'msg': lines}))
+            except OSError:
+                logger.exception("写入事件日志失败（文件）")
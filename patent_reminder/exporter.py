@@ -0,0 +1,222 @@
+"""专利数据导出（CSV / Excel / Parquet）与示例模板
+
+- 所有格式都按 EXPORT_CHUNK_ROWS 行分块写出：CSV 逐块追加，Excel 使用 openpyxl 只写模式
+  （逐行写入，超过单表行数上限时续写到新工作表），Parquet 每块一个 row group，
+  不在内存中构建完整的工作簿
+- cached_export() 生成的文件按 (导出内容, 格式, 数据版本, 提醒天数, 日期) 缓存在
+  <数据库文件>.exports/ 下，重复下载直接返回已有文件；提醒记录按台账与发件箱的变化缓存
+"""
+import hashlib
+import importlib.util
+import os
+import tempfile
+import threading
+from datetime import date
+
+from . import settings
+
+# Parquet 依赖可选的 pyarrow，未安装时不提供
+PARQUET_SUPPORTED = importlib.util.find_spec('pyarrow') is not None
+EXPORT_FORMATS = ('.csv', '.xlsx', '.parquet') if PARQUET_SUPPORTED else ('.csv', '.xlsx')
+# 可导出的内容
+EXPORT_KINDS = {
+    'due': '需要关注的专利',
+    'portfolio': '全部专利',
+    'history': '提醒记录',
+}
+EXPORT_MIME_TYPES = {
+    '.csv': "text/csv",
+    '.xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    '.parquet': "application/octet-stream",
+}
+# Excel 单个工作表的最大行数（含表头）
+XLSX_MAX_ROWS = 1048576
+
+
+def iter_chunks(df, size=None):
+    """把 DataFrame 按行切成若干块（切片不复制数据）"""
+    size = size or settings.EXPORT_CHUNK_ROWS
+    if df.empty:
+        yield df
+    for start in range(0, len(df), size):
+        yield df.iloc[start:start + size]
+
+
+def _write_csv(chunks, path):
+    rows = 0
+    # 带 BOM，Excel 直接打开不乱码
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=i == 0)
+            rows += len(chunk)
+    return rows
+
+
+def _write_xlsx(chunks, path):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, rows, header = None, 0, 0, None
+    for chunk in chunks:
+        header = list(chunk.columns)
+        # NaN / NaT 写为空单元格
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            # 超过单表行数上限时续写到新工作表
+            if sheet is None or sheet_rows >= XLSX_MAX_ROWS:
+                sheet = workbook.create_sheet(f"Sheet{len(workbook.worksheets) + 1}")
+                sheet.append(header)
+                sheet_rows = 1
+            sheet.append(row)
+            sheet_rows += 1
+        rows += len(chunk)
+    if sheet is None:
+        sheet = workbook.create_sheet("Sheet1")
+        if header:
+            sheet.append(header)
+    workbook.save(path)
+    return rows
+
+
+def _write_parquet(chunks, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("导出 Parquet 文件需要安装 pyarrow")
+    writer, rows = None, 0
+    try:
+        for chunk in chunks:
+            # 后续块按第一块的结构转换（某一块整列为空时类型推断不同）
+            table = pa.Table.from_pandas(chunk, schema=writer and writer.schema, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+_WRITERS = {'.csv': _write_csv, '.xlsx': _write_xlsx, '.parquet': _write_parquet}
+
+
+def write_chunks(chunks, path):
+    """按扩展名把若干 DataFrame 块依次写入同一文件，返回写出的行数"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in _WRITERS:
+        raise ValueError(f"不支持的导出格式：{ext}（支持 {' / '.join(EXPORT_FORMATS)}）")
+    return _WRITERS[ext](chunks, path)
+
+
+def export_frame(df, path):
+    """按扩展名写出 DataFrame，返回写出的行数"""
+    return write_chunks(iter_chunks(df), path)
+
+
+def export_chunks(store, kind, reminder_days, today=None):
+    """导出内容对应的 DataFrame 块"""
+    if kind == 'history':
+        return store.reminder_history_chunks(settings.EXPORT_CHUNK_ROWS)
+    from .dataset import get_dataset
+
+    dataset = get_dataset(store)
+    if dataset.empty:
+        return iter(())
+    df = dataset.classified(reminder_days, today)
+    if kind == 'due':
+        df = df.iloc[dataset.index.attention(reminder_days, today)]
+    return iter_chunks(df)
+
+
+def export_root(db_path):
+    return f"{db_path}.exports"
+
+
+def _cache_key(store, kind, reminder_days, today):
+    from .dataset import dataset_stamp
+    from .deadline_index import day_ordinal
+
+    if kind == 'history':
+        version = store.reminder_history_version()
+    else:
+        version = (dataset_stamp(store, store.settings.get('dataset_version', 0)), reminder_days,
+                   day_ordinal(today))
+    return hashlib.sha1(repr(version).encode('utf-8')).hexdigest()[:16]
+
+
+_export_locks = {}
+_export_locks_lock = threading.Lock()
+
+
+def export_path(store, kind, fmt, reminder_days, today=None):
+    """导出文件的缓存路径（不生成文件，数据变化后路径随之变化）"""
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"不支持的导出内容：{kind}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式：{fmt}（支持 {' / '.join(EXPORT_FORMATS)}）")
+    return os.path.join(export_root(store.path), f"{kind}-{_cache_key(store, kind, reminder_days, today)}{fmt}")
+
+
+def cached_export(store, kind, fmt, reminder_days, today=None):
+    """生成（或复用已缓存的）导出文件，返回文件路径
+
+    同一进程中对同一文件的并发请求只生成一次；写入临时文件后原子改名，
+    其他进程不会读到写了一半的文件。
+    """
+    path = export_path(store, kind, fmt, reminder_days, today)
+    root = os.path.dirname(path)
+    with _export_locks_lock:
+        lock = _export_locks.setdefault(path, threading.Lock())
+    with lock:
+        if not os.path.exists(path):
+            os.makedirs(root, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=root, prefix=".tmp-", suffix=fmt)
+            os.close(fd)
+            try:
+                write_chunks(export_chunks(store, kind, reminder_days, today), tmp)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            _prune(root)
+    with _export_locks_lock:
+        _export_locks.pop(path, None)
+    return path
+
+
+def _prune(root):
+    # 只保留最近生成的 MAX_CACHED_EXPORTS 个文件
+    files = [os.path.join(root, name) for name in os.listdir(root) if not name.startswith('.tmp-')]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for path in files[settings.MAX_CACHED_EXPORTS:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def export_filename(kind, fmt, today=None):
+    """下载时的文件名，如 需要关注的专利_20240101.xlsx"""
+    return f"{EXPORT_KINDS[kind]}_{(today or date.today()):%Y%m%d}{fmt}"
+
+
+def sample_template(today=None):
+    """示例模板：三种专利类型各一行，截止日期分别为 15 天后、45 天后与已过期 5 天"""
+    import pandas as pd
+
+    today = today or date.today()
+
+    def shifted(days, years=0):
+        return (pd.Timestamp(today) + pd.Timedelta(days=days) - pd.DateOffset(years=years)).strftime('%Y-%m-%d')
+
+    return pd.DataFrame({
+        '专利名称': ['发明专利A', '实用新型专利B', '外观设计专利C'],
+        '专利号': ['ZL202010000000', 'ZL202020000000', 'ZL202030000000'],
+        '缴费截止日期': [shifted(15), shifted(45), shifted(-5)],
+        '缴费金额': [1300, 900, 500],
+        # 可选列：填写申请日与专利类型后按年费规则自动计算截止日期、宽限期与滞纳金
+        '申请日': [shifted(15, 5), shifted(45, 3), shifted(-5, 4)],
+        '专利类型': ['发明', '实用新型', '外观设计'],
+    })
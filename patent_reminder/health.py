@@ -0,0 +1,140 @@
+"""健康检查 / 状态 / 手动触发的 HTTP 接口
+
+由持有单实例锁的调度器在独立端口上启动，不经过 Streamlit 页面脚本：
+
+- GET  /healthz  调度器在线返回 200，否则 503
+- GET  /status   JSON：最近检查、最近发送、发件箱积压、数据版本、工作区列表
+- GET  /metrics  Prometheus 文本格式的各阶段耗时（见 profiling.py，只含本进程）
+- POST /trigger  请求立即检查，需要 Authorization: Bearer <令牌>（或 ?token=）
+
+只读取状态文件与两条 SQLite 查询，不加载专利数据。
+"""
+import hmac
+import json
+import logging
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from . import profiling, scheduler, settings
+from .store import get_store
+from .workspaces import workspace_names
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "patent-management-system"
+
+
+def status_payload(store=None):
+    """调度器状态 + 发件箱积压 + 数据版本"""
+    store = store or get_store()
+    status = scheduler.read_status() or {}
+    return {
+        "service": SERVICE_NAME,
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "scheduler_alive": scheduler.is_alive(status),
+        "check_count": status.get("check_count", 0),
+        "last_check": status.get("last_check_time"),
+        "last_email_sent": status.get("last_email_sent_time"),
+        "next_check": status.get("next_check_time"),
+        "last_result": status.get("last_result"),
+        "queue_depth": store.outbox_depth(),
+        "dataset_version": store.settings.get('dataset_version', 0),
+        "workspaces": workspace_names(),
+    }
+
+
+def token_valid(token):
+    """校验触发令牌；未配置令牌时一律拒绝"""
+    expected = settings.TRIGGER_TOKEN
+    return bool(expected) and bool(token) and hmac.compare_digest(str(token), expected)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "PatentReminder"
+    timeout = 5
+
+    def _reply(self, code, payload, content_type="application/json; charset=utf-8"):
+        body = (payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)).encode('utf-8')
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _token(self, query):
+        auth = self.headers.get("Authorization", "")
+        if auth.startswith("Bearer "):
+            return auth[len("Bearer "):].strip()
+        return (query.get("token") or [None])[0]
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/healthz":
+            alive = scheduler.is_alive(scheduler.read_status())
+            self._reply(200 if alive else 503, {"status": "ok" if alive else "scheduler_down"})
+        elif url.path == "/status":
+            self._reply(200, status_payload(self.server.store))
+        elif url.path == "/metrics":
+            self._reply(200, profiling.prometheus_text(), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._reply(404, {"error": "not found"})
+
+    do_HEAD = do_GET
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/trigger":
+            self._reply(404, {"error": "not found"})
+            return
+        if not token_valid(self._token(parse_qs(url.query))):
+            self._reply(403, {"error": "forbidden"})
+            return
+        scheduler.request_check()
+        self._reply(202, {"status": "check_requested"})
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class HealthServer:
+    """单线程 HTTP 服务（请求处理都在同一线程，复用同一个数据库连接）"""
+
+    def __init__(self, host=None, port=None):
+        self.httpd = HTTPServer((host or settings.HEALTH_HOST,
+                                 settings.HEALTH_PORT if port is None else port), _Handler)
+        self.httpd.store = None
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def _serve(self):
+        self.httpd.store = get_store()
+        self.httpd.serve_forever(poll_interval=0.5)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._serve, name="patent-reminder-health", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def start_health_server(host=None, port=None):
+    """启动健康检查接口；端口为 0 时不启动，端口被占用时记录日志并返回 None"""
+    if (settings.HEALTH_PORT if port is None else port) == 0:
+        return None
+    try:
+        server = HealthServer(host, port).start()
+    except OSError as e:
+        logger.warning("健康检查接口启动失败：%s", e)
+        return None
+    logger.info("健康检查接口：http://%s:%s/healthz", server.httpd.server_address[0], server.port)
+    return server
@@ -0,0 +1,279 @@
+"""流式导入专利数据（Excel / CSV / Parquet）
+
+- Excel 使用 openpyxl 只读模式逐行读取，所有包含必要列的工作表都会导入
+- 只读取必要列（及已知的可选列），按块转换类型后直接写入数据库
+- 无效行不会中断导入，而是记录行号与原因
+- 文件内容哈希与上次导入相同时直接跳过；合并模式只写入新增/变化的行
+"""
+import hashlib
+import importlib.util
+import numbers
+import os
+import re
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from . import settings
+
+CHUNK_SIZE = 5000
+# 可上传的文件类型；Parquet 依赖可选的 pyarrow，未安装时不提供
+PARQUET_SUPPORTED = importlib.util.find_spec('pyarrow') is not None
+UPLOAD_TYPES = ('xlsx', 'xls', 'csv', 'parquet') if PARQUET_SUPPORTED else ('xlsx', 'xls', 'csv')
+MAX_REPORTED_ERRORS = 1000
+
+# 中文日期：2026年12月6日 -> 2026-12-6
+# 数字单元格按 Excel 日期序列号（1900 日期系统）解析，只接受该范围（1927 ～ 2173 年），其余视为无效
+EXCEL_SERIAL_RANGE = (10000, 100000)
+_EXCEL_EPOCH = '1899-12-30'
+# CSV 中与日期混在同一列的序列号读出来是文本（如 "46000"）
+_SERIAL_TEXT = re.compile(r'\s*\d{5}(?:\.\d+)?\s*')
+_CN_DATE = re.compile(r'^\s*(\d{4})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})\s*日?\s*$')
+
+
+class ImportFormatError(ValueError):
+    """文件格式或表头不符合要求"""
+
+
+@dataclass
+class RowError:
+    sheet: str
+    row: int
+    message: str
+
+
+@dataclass
+class ImportReport:
+    rows_imported: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)
+    sheets: list = field(default_factory=list)
+    skipped_sheets: list = field(default_factory=list)
+    file_unchanged: bool = False
+    added: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+    def add_error(self, sheet, row, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(RowError(sheet, row, message))
+
+
+def _wanted_columns(header):
+    """返回 {列名: 列位置}，缺少必要列时返回 None"""
+    positions = {}
+    for i, name in enumerate(header):
+        name = str(name).strip() if name is not None else ''
+        if name in settings.REQUIRED_COLUMNS or name in settings.OPTIONAL_COLUMNS:
+            positions.setdefault(name, i)
+    if any(col not in positions for col in settings.REQUIRED_COLUMNS):
+        return None
+    return positions
+
+
+def _missing_message(header):
+    names = {str(name).strip() for name in header if name is not None}
+    missing = [col for col in settings.REQUIRED_COLUMNS if col not in names]
+    return f"文件缺少必要的列：{', '.join(missing)}"
+
+
+def _iter_excel(source):
+    """逐个工作表产出 (表名, 起始行号, 行块 DataFrame)"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        first_header = None
+        found = False
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            first_header = first_header or header
+            positions = _wanted_columns(header)
+            if positions is None:
+                yield ws.title, None, None
+                continue
+            found = True
+            names = list(positions)
+            picks = [positions[name] for name in names]
+            buffer = []
+            start = 2
+            for row in rows:
+                buffer.append([row[i] if i < len(row) else None for i in picks])
+                if len(buffer) >= CHUNK_SIZE:
+                    yield ws.title, start, pd.DataFrame(buffer, columns=names)
+                    start += len(buffer)
+                    buffer = []
+            if buffer:
+                yield ws.title, start, pd.DataFrame(buffer, columns=names)
+        if not found:
+            raise ImportFormatError(_missing_message(first_header or ()))
+    finally:
+        wb.close()
+
+
+def _iter_xls(source):
+    # 旧版 .xls 不支持 openpyxl，只能整表读取后分块
+    header = pd.read_excel(source, nrows=0).columns
+    if _wanted_columns(header) is None:
+        raise ImportFormatError(_missing_message(header))
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    usecols = list(_wanted_columns(header))
+    df = pd.read_excel(source, usecols=usecols)
+    for start in range(0, len(df), CHUNK_SIZE):
+        yield "Sheet1", start + 2, df.iloc[start:start + CHUNK_SIZE]
+
+
+def _iter_csv(source):
+    header = pd.read_csv(source, nrows=0).columns
+    if _wanted_columns(header) is None:
+        raise ImportFormatError(_missing_message(header))
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    usecols = list(_wanted_columns(header))
+    start = 2
+    for chunk in pd.read_csv(source, usecols=usecols, dtype={'专利号': str}, chunksize=CHUNK_SIZE):
+        yield "CSV", start, chunk
+        start += len(chunk)
+
+
+def _iter_parquet(source):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportFormatError("导入 Parquet 文件需要安装 pyarrow")
+    pf = pq.ParquetFile(source)
+    header = pf.schema_arrow.names
+    if _wanted_columns(header) is None:
+        raise ImportFormatError(_missing_message(header))
+    start = 2
+    for batch in pf.iter_batches(batch_size=CHUNK_SIZE, columns=list(_wanted_columns(header))):
+        chunk = batch.to_pandas()
+        yield "Parquet", start, chunk
+        start += len(chunk)
+
+
+def _normalize_number(value):
+    # Excel 中的数字专利号读出来可能是 float，去掉多余的 .0
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def parse_dates(values):
+    """逐值识别日期格式（同一列可混用 2026-12-01、2026/12/5、2026年12月6日），无法识别的为 NaT
+
+    不按第一个值推断整列格式，结果与分块位置无关。数字（CSV 中的 Excel 序列号、
+    数字格式的 Excel 单元格）按 Excel 日期序列号解析，超出 EXCEL_SERIAL_RANGE 的为 NaT。
+    """
+    values = pd.Series(values)
+    if values.dtype.kind in 'biuf':
+        numeric = pd.Series(True, index=values.index)
+    else:
+        numeric = values.map(lambda v: (isinstance(v, numbers.Number) and not isinstance(v, bool))
+                             or (isinstance(v, str) and _SERIAL_TEXT.fullmatch(v) is not None)).astype(bool)
+    serials = pd.to_numeric(values[numeric], errors='coerce')
+    serials = serials[serials.between(*EXCEL_SERIAL_RANGE)]
+    # 数字不交给 to_datetime 按纳秒时间戳解析
+    values = values.astype(object).where(~numeric, None)
+    # 绝大多数是 ISO 格式，先整列快速解析，只对剩下的值逐个识别
+    dates = pd.to_datetime(values, errors='coerce', format='ISO8601')
+    dates[serials.index] = pd.to_datetime(serials, unit='D', origin=_EXCEL_EPOCH)
+    rest = dates.isna() & values.notna()
+    if rest.any():
+        others = values[rest].map(lambda v: _CN_DATE.sub(r'\1-\2-\3', v) if isinstance(v, str) else v)
+        dates[rest] = pd.to_datetime(others, errors='coerce', format='mixed')
+    return dates
+
+
+def convert_chunk(chunk, sheet, start, report):
+    """按列转换类型，无效行记入报告并剔除，返回有效行"""
+    chunk = chunk.reset_index(drop=True)
+    numbers = chunk['专利号']
+    number_missing = numbers.isna() | (numbers.astype(str).str.strip() == '')
+    chunk['专利号'] = numbers.map(_normalize_number, na_action='ignore')
+    raw_deadlines = chunk['缴费截止日期']
+    deadlines = parse_dates(raw_deadlines)
+    deadline_invalid = deadlines.isna()
+    chunk['缴费截止日期'] = deadlines
+    chunk['缴费金额'] = pd.to_numeric(chunk['缴费金额'], errors='coerce')
+    chunk['专利名称'] = chunk['专利名称'].astype(object).where(chunk['专利名称'].notna(), '')
+    if '申请日' in chunk:
+        # 申请日统一保存为 YYYY-MM-DD，无法识别的留空（该行按表格中的截止日期提醒）
+        chunk['申请日'] = parse_dates(chunk['申请日']).dt.strftime('%Y-%m-%d')
+
+    invalid = number_missing | deadline_invalid
+    for i in invalid[invalid].index:
+        reason = "专利号为空" if number_missing[i] else f"缴费截止日期无效：{raw_deadlines[i]}"
+        report.add_error(sheet, start + i, reason)
+    return chunk[~invalid]
+
+
+def file_digest(source):
+    """分块计算文件内容的 SHA-256，计算后把读取位置复位"""
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    else:
+        source.seek(0)
+        for block in iter(lambda: source.read(1 << 20), b''):
+            digest.update(block)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def iter_chunks(source, filename):
+    """按文件扩展名选择读取方式"""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.xlsx' or ext == '.xlsm':
+        return _iter_excel(source)
+    if ext == '.xls':
+        return _iter_xls(source)
+    if ext == '.csv':
+        return _iter_csv(source)
+    if ext == '.parquet':
+        return _iter_parquet(source)
+    raise ImportFormatError(f"不支持的文件类型：{ext}")
+
+
+def import_patents(source, filename, store, merge=False, tombstone=False, progress=None):
+    """流式导入专利数据
+
+    merge=False 时整体替换旧数据；merge=True 时按 (专利号, 缴费截止日期) 合并，
+    tombstone=True 时把文件中缺失的专利标记为已删除。
+    progress(rows_done) 在每个数据块转换后回调。任何块写入失败时整体回滚。
+    """
+    report = ImportReport()
+    # 导入方式也计入指纹：同一文件从合并改为替换时结果不同，不能跳过
+    fingerprint = f"{file_digest(source)}:{'merge' if merge else 'replace'}:{int(tombstone)}"
+    if store.settings.get('last_file_hash') == fingerprint:
+        report.file_unchanged = True
+        return report
+
+    def chunks():
+        for sheet, start, chunk in iter_chunks(source, filename):
+            if chunk is None:
+                report.skipped_sheets.append(sheet)
+                continue
+            if sheet not in report.sheets:
+                report.sheets.append(sheet)
+            valid = convert_chunk(chunk, sheet, start, report)
+            report.rows_imported += len(valid)
+            if progress:
+                progress(report.rows_imported)
+            yield valid
+
+    diff = store.import_patents_chunks(chunks(), merge=merge, tombstone=tombstone,
+                                       file_hash=fingerprint)
+    report.added = diff['added']
+    report.changed = diff['changed']
+    report.unchanged = diff['unchanged']
+    report.removed = diff['removed']
+    return report
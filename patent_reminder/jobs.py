@@ -0,0 +1,200 @@
+"""后台任务队列：提醒发送等涉及网络 I/O 的任务在进程内的有界线程池中执行
+
+- submit() 立即返回任务 ID，页面按 ID 轮询状态与结果，渲染不等待 SMTP
+- 同时执行的任务数由 settings.JOB_WORKERS 限制，其余任务排队
+- 所有工作区共用一个队列；指定 workspace 的任务另受该工作区配额（limit）限制，
+  超出配额的任务先在工作区自己的队列中等待，不占用线程，其他工作区的任务照常执行
+- 排队中的任务取消后不再执行；执行中的任务收到取消信号后在下一个检查点停止
+  （认领台账之前、发送下一封邮件之前），已写入发件箱的邮件留待下一轮发送
+- 线程池随进程存在，只保留最近 settings.MAX_FINISHED_JOBS 个已结束任务
+"""
+import logging
+import threading
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from . import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+STATUS_LABELS = {
+    QUEUED: '排队中',
+    RUNNING: '执行中',
+    SUCCEEDED: '已完成',
+    FAILED: '失败',
+    CANCELLED: '已取消',
+}
+
+
+@dataclass
+class Job:
+    id: str
+    name: str
+    workspace: str = None
+    status: str = QUEUED
+    submitted_at: datetime = field(default_factory=datetime.now)
+    started_at: datetime = None
+    finished_at: datetime = None
+    success: bool = None
+    message: str = ''
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+    future: object = field(default=None, repr=False)
+    done_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def cancel_requested(self):
+        return self.cancel_event.is_set()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'workspace': self.workspace,
+            'status': self.status,
+            'submitted_at': self.submitted_at.isoformat(timespec='seconds'),
+            'started_at': self.started_at and self.started_at.isoformat(timespec='seconds'),
+            'finished_at': self.finished_at and self.finished_at.isoformat(timespec='seconds'),
+            'success': self.success,
+            'message': self.message,
+            'cancel_requested': self.cancel_requested,
+        }
+
+
+class JobQueue:
+    """进程内任务队列
+
+    任务函数以 func(*args, cancel=threading.Event) 调用，返回 (success, message)。
+    """
+
+    def __init__(self, max_workers=None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or settings.JOB_WORKERS,
+                                        thread_name_prefix="patent-reminder-job")
+        self._lock = threading.Lock()
+        self._jobs = {}  # 按提交顺序
+        # 工作区配额：已交给线程池的任务数、等待配额的任务
+        self._limits = {}
+        self._dispatched = defaultdict(int)
+        self._waiting = defaultdict(deque)
+
+    def submit(self, name, func, *args, workspace=None, limit=None):
+        """提交任务，返回任务 ID；workspace 不为空时同一工作区最多同时执行 limit 个任务"""
+        job = Job(uuid.uuid4().hex[:12], name, workspace)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._trim()
+            if workspace is not None:
+                self._limits[workspace] = max(1, limit or settings.WORKSPACE_MAX_JOBS)
+            if workspace is not None and self._dispatched[workspace] >= self._limits[workspace]:
+                self._waiting[workspace].append((job, func, args))
+            else:
+                self._dispatch(job, func, args)
+        return job.id
+
+    def _dispatch(self, job, func, args):
+        if job.workspace is not None:
+            self._dispatched[job.workspace] += 1
+        job.future = self._pool.submit(self._run, job, func, args)
+
+    def _release(self, job):
+        """任务结束后让出工作区配额，派发该工作区下一个等待的任务（需持有锁）"""
+        if job.workspace is None:
+            return
+        self._dispatched[job.workspace] -= 1
+        waiting = self._waiting[job.workspace]
+        while waiting and self._dispatched[job.workspace] < self._limits[job.workspace]:
+            self._dispatch(*waiting.popleft())
+        if not waiting:
+            del self._waiting[job.workspace]
+        if not self._dispatched[job.workspace]:
+            del self._dispatched[job.workspace]
+
+    @staticmethod
+    def _finish(job, status, message):
+        job.status, job.message, job.finished_at = status, message, datetime.now()
+        job.done_event.set()
+
+    def _run(self, job, func, args):
+        with self._lock:
+            if job.cancel_requested:
+                self._finish(job, CANCELLED, "任务在执行前已取消")
+                self._release(job)
+                return
+            job.status = RUNNING
+            job.started_at = datetime.now()
+        try:
+            success, message = func(*args, cancel=job.cancel_event)
+        except Exception as e:
+            logger.exception("后台任务 %s（%s）失败", job.id, job.name)
+            success, message = False, f"任务失败：{str(e)}"
+        with self._lock:
+            job.success = success
+            self._finish(job, CANCELLED if job.cancel_requested else SUCCEEDED if success else FAILED,
+                         message)
+            self._release(job)
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - settings.MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def recent(self, limit=10, ids=None):
+        """最近提交的任务（新的在前），ids 不为空时只返回其中的任务"""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if ids is None or job.id in ids]
+        return jobs[::-1][:limit]
+
+    def cancel(self, job_id):
+        """取消任务：排队中的直接取消，执行中的发出取消信号；任务已结束或不存在时返回 False"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return False
+            job.cancel_event.set()
+            if job.status != QUEUED:
+                return True
+            if job.future is None:
+                # 仍在等待工作区配额，直接移出等待队列
+                waiting = self._waiting[job.workspace]
+                waiting.remove(next(item for item in waiting if item[0] is job))
+                if not waiting:
+                    del self._waiting[job.workspace]
+                self._finish(job, CANCELLED, "任务在执行前已取消")
+            elif job.future.cancel():
+                self._finish(job, CANCELLED, "任务在执行前已取消")
+                self._release(job)
+            return True
+
+    def shutdown(self, cancel=True):
+        if cancel:
+            for job in self.recent(len(self._jobs)):
+                self.cancel(job.id)
+        self._pool.shutdown(wait=False)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """进程内共用的任务队列（首次使用时创建）"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
@@ -0,0 +1,164 @@
+"""提醒台账：记录每个 (专利号, 缴费截止日期, 提醒档位, 收件人) 是否已提醒
+
+- 提醒档位（默认 90/30/7/0 天）：距离到期天数每跨入一个更近的档位，才会再次提醒
+- 发送前先在数据库中"认领"台账条目（INSERT OR IGNORE + run_id），多个进程同时运行时
+  同一条目也只会被一个进程发送
+- 内存中保存已提醒键的集合，判断"是否已提醒"为 O(1)
+- 缴费截止日期已不在专利数据中（已缴费、已删除）的条目在导入时由 PatentStore 清理
+"""
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from . import settings
+
+# 页面弹窗提醒使用的收件人标识
+PAGE_RECIPIENT = "页面"
+
+# 认领后超过该时间仍未关联发件箱的条目视为中断，重新开放
+CLAIM_TIMEOUT = timedelta(minutes=10)
+
+_SEP = "\x1f"
+
+
+def tier_for_days(days):
+    """距离到期天数对应的提醒档位：不小于该天数的最小档位（已过期归入最小档位）"""
+    import numpy as np
+
+    tiers = np.array(sorted(settings.REMINDER_TIERS))
+    positions = np.searchsorted(tiers, np.asarray(days, dtype=float), side='left')
+    return tiers[np.clip(positions, 0, len(tiers) - 1)]
+
+
+def ledger_keys(frame):
+    """由 专利号、deadline、tier、recipient 四列拼出台账键（向量化）"""
+    return (frame['专利号'].astype(str) + _SEP + frame['deadline'].astype(str) + _SEP
+            + frame['tier'].astype(str) + _SEP + frame['recipient'].astype(str))
+
+
+class Ledger:
+
+    def __init__(self, store):
+        self.store = store
+        self._keys = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self):
+        return self.store.conn
+
+    def _load(self):
+        if self._keys is None:
+            self._keys = {
+                _SEP.join((number, deadline, str(tier), recipient))
+                for number, deadline, tier, recipient in self.conn.execute(
+                    "SELECT 专利号, deadline, tier, recipient FROM reminder_ledger")
+            }
+        return self._keys
+
+    def invalidate(self):
+        with self._lock:
+            self._keys = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load())
+
+    def contains(self, keys):
+        """keys 为台账键 Series，返回布尔数组"""
+        import numpy as np
+
+        with self._lock:
+            seen = self._load()
+            return np.fromiter((key in seen for key in keys), dtype=bool, count=len(keys))
+
+    def new_entries(self, frame):
+        """过滤掉已提醒的行，frame 需含 专利号、deadline、tier、recipient 列"""
+        if frame.empty:
+            return frame
+        return frame[~self.contains(ledger_keys(frame))]
+
+    def claim(self, frame):
+        """在数据库中认领条目，返回 (run_id, 本次认领成功的行)"""
+        run_id = uuid.uuid4().hex
+        if frame.empty:
+            return run_id, frame
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = list(zip(frame['专利号'].astype(str), frame['deadline'].astype(str),
+                        frame['tier'].astype(int).tolist(), frame['recipient'].astype(str)))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO reminder_ledger"
+                "(专利号, deadline, tier, recipient, notified_at, run_id) VALUES (?, ?, ?, ?, ?, ?)",
+                [row + (now, run_id) for row in rows])
+        claimed = {
+            _SEP.join((number, deadline, str(tier), recipient))
+            for number, deadline, tier, recipient in self.conn.execute(
+                "SELECT 专利号, deadline, tier, recipient FROM reminder_ledger WHERE run_id = ?",
+                (run_id,))
+        }
+        keys = ledger_keys(frame)
+        with self._lock:
+            self._load().update(keys)
+        return run_id, frame[keys.isin(claimed).to_numpy()]
+
+    def attach_outbox(self, run_id, recipient, outbox_id):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE reminder_ledger SET outbox_id = ? WHERE run_id = ? AND recipient = ?",
+                (outbox_id, run_id, recipient))
+
+    def release(self, run_id, recipient=None):
+        """撤销认领（邮件未能写入发件箱时）"""
+        with self.conn:
+            if recipient is None:
+                self.conn.execute("DELETE FROM reminder_ledger WHERE run_id = ?", (run_id,))
+            else:
+                self.conn.execute("DELETE FROM reminder_ledger WHERE run_id = ? AND recipient = ?",
+                                  (run_id, recipient))
+        self.invalidate()
+
+    def release_undelivered(self, now=None):
+        """重新开放最终发送失败或认领后中断的条目，返回条目数"""
+        now = now or datetime.now()
+        stale = (now - CLAIM_TIMEOUT).isoformat(timespec='seconds')
+        with self.conn:
+            removed = self.conn.execute("""
+                DELETE FROM reminder_ledger
+                WHERE outbox_id IN (SELECT id FROM outbox WHERE status = 'failed')
+                   OR (outbox_id IS NULL AND recipient != ? AND notified_at < ?)
+            """, (PAGE_RECIPIENT, stale)).rowcount
+        if removed:
+            self.invalidate()
+        return removed
+
+    def import_legacy_ids(self, ids):
+        """导入旧版 reminder_sent 记录（专利号_YYYYMMDD），视为页面已在最终档位提醒过"""
+        rows = []
+        for pid in ids:
+            number, _, day = str(pid).rpartition('_')
+            try:
+                deadline = datetime.strptime(day, '%Y%m%d').strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+            rows.append((number, deadline, min(settings.REMINDER_TIERS), PAGE_RECIPIENT))
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO reminder_ledger"
+                "(专利号, deadline, tier, recipient, notified_at) VALUES (?, ?, ?, ?, ?)",
+                [row + (now,) for row in rows])
+        self.invalidate()
+        return len(rows)
+
+
+def ledger_frame(patents, recipients):
+    """由需要提醒的专利生成台账所需的列（按原索引对齐）"""
+    import pandas as pd
+
+    return pd.DataFrame({
+        '专利号': patents['专利号'].astype(str),
+        'deadline': patents['缴费截止日期'].dt.strftime('%Y-%m-%d'),
+        'tier': tier_for_days(patents['距离到期天数']),
+        'recipient': recipients,
+    }, index=patents.index)
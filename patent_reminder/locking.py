@@ -0,0 +1,127 @@
+"""跨进程并发控制
+
+- FileLock：基于锁文件的排他锁（flock / msvcrt），进程退出时由操作系统自动释放
+- atomic_write：先写同目录临时文件并 fsync，再 os.replace 替换，读者不会读到半个文件
+- Lease：数据库中的租约，同一名称同一时刻只有一个持有者，持有者崩溃后到期自动失效；
+  所有共用同一数据库的进程（页面、独立调度器、命令行）都受其约束
+"""
+import os
+import socket
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """锁文件排他锁，可用作上下文管理器（阻塞获取）"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = None
+
+    def _try_lock(self, fh):
+        try:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def acquire(self, blocking=False, timeout=None):
+        """获取锁，成功返回 True；blocking=True 时等待至 timeout 秒（None 表示一直等待）"""
+        if self._fh is not None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        fh = open(self.path, 'a+')
+        while not self._try_lock(fh):
+            if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                fh.close()
+                return False
+            time.sleep(0.05)
+        fh.seek(0)
+        fh.truncate()
+        fh.write(str(os.getpid()))
+        fh.flush()
+        self._fh = fh
+        return True
+
+    def release(self):
+        if self._fh is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            else:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self):
+        self.acquire(blocking=True)
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def atomic_write(path, data):
+    """原子写入文件，data 为 str 时按 UTF-8 写入"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class Lease:
+    """数据库租约（表 leases），acquire() 在租约空闲、已过期或本身持有时成功"""
+
+    def __init__(self, store, name, ttl):
+        self.store = store
+        self.name = name
+        self.ttl = ttl if isinstance(ttl, timedelta) else timedelta(seconds=ttl)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self, now=None):
+        now = now or datetime.now()
+        conn = self.store.conn
+        with conn:
+            # 单条 upsert：冲突时只有租约已过期或属于自己才会覆盖
+            cur = conn.execute("""
+                INSERT INTO leases(name, owner, acquired_at, expires_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    owner = excluded.owner,
+                    acquired_at = excluded.acquired_at,
+                    expires_at = excluded.expires_at
+                WHERE leases.expires_at <= excluded.acquired_at OR leases.owner = excluded.owner
+            """, (self.name, self.owner, now.isoformat(timespec='seconds'),
+                  (now + self.ttl).isoformat(timespec='seconds')))
+        return cur.rowcount == 1
+
+    def release(self):
+        conn = self.store.conn
+        with conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (self.name, self.owner))
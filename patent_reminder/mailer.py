@@ -0,0 +1,33 @@
+"""提醒邮件构建"""
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formatdate
+
+from .profiling import timed
+from .render import build_attachment, format_due_frame, render_html, render_text
+
+
+# 构建提醒邮件：纯文本 + HTML 表格，可选附带 xlsx/csv 清单
+@timed('render_email')
+def build_reminder_message(sender_email, receiver_email, patent_info, attachment_format=""):
+    formatted = format_due_frame(patent_info)
+    body = MIMEMultipart('alternative')
+    body.attach(MIMEText(render_text(formatted), 'plain', 'utf-8'))
+    body.attach(MIMEText(render_html(formatted), 'html', 'utf-8'))
+
+    if attachment_format:
+        msg = MIMEMultipart('mixed')
+        msg.attach(body)
+        filename, content, subtype = build_attachment(patent_info, formatted, attachment_format)
+        part = MIMEApplication(content, _subtype=subtype)
+        part.add_header('Content-Disposition', 'attachment', filename=('utf-8', '', filename))
+        msg.attach(part)
+    else:
+        msg = body
+    msg['Subject'] = "专利缴费提醒"
+    msg['From'] = sender_email
+    msg['To'] = receiver_email
+    msg['Date'] = formatdate()
+    return msg
+
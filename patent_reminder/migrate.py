@@ -0,0 +1,75 @@
+"""一次性迁移：将旧版 app_data.pkl / email_config.pkl 导入 SQLite 数据库
+
+用法：python -m patent_reminder.migrate [--data app_data.pkl] [--config email_config.pkl]
+迁移成功后旧文件重命名为 *.migrated，不会重复导入。
+"""
+import argparse
+import os
+import pickle
+import sys
+
+from . import settings
+from .locking import FileLock
+from .store import get_store
+
+# 旧 pickle 中由调度器维护的字段
+SCHEDULER_KEYS = ('check_count', 'last_check_time', 'next_scheduled_send', 'last_email_sent_time')
+# 旧 pickle 中由页面维护的字段
+SETTING_KEYS = ('last_upload_time', 'reminder_days')
+
+
+def migrate_pickles(store=None, data_file=None, config_file=None):
+    """导入旧文件，返回已迁移的文件列表
+
+    页面与独立调度器可能同时启动，迁移在文件锁内进行，后到的进程等待后直接跳过。
+    """
+    store = store or get_store()
+    data_file = data_file or settings.DATA_FILE
+    config_file = config_file or settings.CONFIG_FILE
+    if not os.path.exists(data_file) and not os.path.exists(config_file):
+        return []
+    with FileLock(settings.MIGRATE_LOCK_FILE):
+        return _migrate(store, data_file, config_file)
+
+
+def _migrate(store, data_file, config_file):
+    migrated = []
+
+    if os.path.exists(data_file):
+        with open(data_file, 'rb') as f:
+            data = pickle.load(f)
+        if data.get('patent_data') is not None:
+            store.replace_patents(data['patent_data'])
+        if data.get('reminder_sent'):
+            store.ledger.import_legacy_ids(data['reminder_sent'])
+        store.state.update({key: data[key] for key in SCHEDULER_KEYS if data.get(key) is not None})
+        store.settings.update({key: data[key] for key in SETTING_KEYS if data.get(key) is not None})
+        os.replace(data_file, data_file + ".migrated")
+        migrated.append(data_file)
+
+    if os.path.exists(config_file):
+        with open(config_file, 'rb') as f:
+            store.save_email_config(pickle.load(f))
+        os.replace(config_file, config_file + ".migrated")
+        migrated.append(config_file)
+
+    return migrated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="将旧版 pickle 数据迁移到 SQLite")
+    parser.add_argument("--data", default=settings.DATA_FILE, help="旧数据文件")
+    parser.add_argument("--config", default=settings.CONFIG_FILE, help="旧邮箱配置文件")
+    parser.add_argument("--db", default=settings.DB_FILE, help="目标数据库")
+    args = parser.parse_args(argv)
+
+    migrated = migrate_pickles(get_store(args.db), args.data, args.config)
+    if migrated:
+        print(f"已迁移：{', '.join(migrated)} -> {args.db}")
+    else:
+        print("未找到需要迁移的旧数据文件")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
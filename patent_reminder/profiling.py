@@ -0,0 +1,139 @@
+"""分阶段耗时统计与单次运行的性能分析
+
+- timed(stage) 既可作上下文管理器也可作装饰器，记录该阶段的耗时
+- 每个阶段在进程内保留最近 PROFILE_WINDOW 次耗时，按需计算 p50 / p95，另累计总次数与总耗时
+- 超过 PROFILE_SLOW_SECONDS 的阶段写入日志（INFO），其余只在 DEBUG 级别输出
+- prometheus_text() 以 Prometheus 文本格式导出（summary：quantile 0.5 / 0.95、_sum、_count），
+  由健康检查接口的 /metrics 提供
+- RunProfiler 对单次运行做函数级分析：装有 pyinstrument 时使用它，否则使用 cProfile
+
+只依赖标准库，记录一次耗时只是一次加锁的 deque 追加。
+"""
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import ContextDecorator
+
+from . import settings
+
+logger = logging.getLogger(__name__)
+
+METRIC_NAME = "patent_reminder_stage_seconds"
+QUANTILES = (0.5, 0.95)
+
+
+class StageStats:
+    """单个阶段：最近若干次耗时（秒）及累计次数、总耗时"""
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def record(stage, seconds):
+    """记录一次阶段耗时"""
+    with _stats_lock:
+        stats = _stats.get(stage)
+        if stats is None:
+            stats = _stats[stage] = StageStats(settings.PROFILE_WINDOW)
+        stats.add(seconds)
+    if seconds >= settings.PROFILE_SLOW_SECONDS:
+        logger.info("阶段 %s 耗时 %.0f ms", stage, seconds * 1000)
+    else:
+        logger.debug("阶段 %s 耗时 %.1f ms", stage, seconds * 1000)
+
+
+class timed(ContextDecorator):
+    """记录代码块 / 函数的耗时：with timed('load'): ... 或 @timed('send')"""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self._started = threading.local()
+
+    def __enter__(self):
+        # 同一个装饰器实例可能在多个线程中同时使用，起始时间按线程保存
+        self._started.__dict__.setdefault('stack', []).append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self._started.stack.pop())
+        return False
+
+
+def snapshot():
+    """各阶段统计：{阶段: {count, total, p50, p95, max}}（耗时单位为秒，按阶段名排序）"""
+    with _stats_lock:
+        items = [(stage, stats.count, stats.total, list(stats.samples)) for stage, stats in _stats.items()]
+    result = {}
+    for stage, count, total, samples in sorted(items):
+        samples.sort()
+        result[stage] = {'count': count, 'total': total, 'max': samples[-1]}
+        for q in QUANTILES:
+            result[stage][f"p{int(q * 100)}"] = samples[min(len(samples) - 1, int(q * len(samples)))]
+    return result
+
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
+
+
+def prometheus_text():
+    """Prometheus 文本格式（0.0.4）"""
+    lines = [f"# HELP {METRIC_NAME} 各阶段耗时（最近 {settings.PROFILE_WINDOW} 次的分位数）",
+             f"# TYPE {METRIC_NAME} summary"]
+    for stage, stats in snapshot().items():
+        for q in QUANTILES:
+            value = stats[f"p{int(q * 100)}"]
+            lines.append(f'{METRIC_NAME}{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+        lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {stats["total"]:.6f}')
+        lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {stats["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+class RunProfiler:
+    """单次运行的函数级分析：start() … stop() 后用 report() 取得文本报告"""
+
+    def __init__(self):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+        self.engine = 'pyinstrument' if Profiler else 'cProfile'
+        self._profiler = Profiler() if Profiler else cProfile.Profile()
+
+    def start(self):
+        if self.engine == 'pyinstrument':
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+        return self
+
+    def stop(self):
+        if self.engine == 'pyinstrument':
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+        return self
+
+    def report(self, limit=40):
+        if self.engine == 'pyinstrument':
+            return self._profiler.output_text(unicode=True)
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
+
@@ -0,0 +1,219 @@
+"""到期状态分类与自动提醒逻辑（不依赖 Streamlit）"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from . import settings
+from .dataset import get_dataset
+from .delivery import DeliveryEngine
+from .ledger import PAGE_RECIPIENT, ledger_frame
+from .locking import Lease
+from .events import KIND_CHECK, KIND_SEND
+from .mailer import build_reminder_message
+from .profiling import timed
+
+
+def email_config_ready(cfg):
+    return bool(cfg["email_enabled"] and cfg["sender_email"]
+                and cfg["sender_password"] and cfg["receiver_email"])
+
+
+def route_recipients(patents, cfg):
+    """确定每行的收件人：负责人邮箱列 > 负责人映射 > 默认收件人"""
+    recipients = pd.Series(None, index=patents.index, dtype=object)
+    if '负责人邮箱' in patents:
+        emails = patents['负责人邮箱'].astype(object)
+        recipients = emails.where(emails.notna() & (emails.astype(str).str.strip() != ''))
+    owner_emails = cfg.get("owner_emails") or {}
+    if owner_emails and '负责人' in patents:
+        recipients = recipients.fillna(patents['负责人'].map(owner_emails))
+    return (recipients.fillna(cfg["receiver_email"]).astype(str)
+            .str.replace('；', ',').str.replace(';', ',').str.strip())
+
+
+def attention_frame(dataset, reminder_days):
+    """需要提醒的专利（已过期 + 即将到期），按截止日期升序"""
+    return dataset.classified(reminder_days).iloc[dataset.index.attention(reminder_days)]
+
+
+def claim_page_reminders(store, patents):
+    """页面弹窗同样记入提醒台账，返回本次新认领的条目数（每个专利在每个档位只弹一次）"""
+    new_entries = store.ledger.new_entries(ledger_frame(patents, PAGE_RECIPIENT))
+    if new_entries.empty:
+        return 0
+    _, claimed = store.ledger.claim(new_entries)
+    return len(claimed)
+
+
+def _gate(state, now, interval):
+    """单个收件人的发送间隔控制，返回 None 表示可以发送，否则返回原因"""
+    next_send = state.get('next_scheduled_send')
+    if isinstance(next_send, datetime) and next_send > now:
+        remaining_minutes = int((next_send - now).total_seconds() // 60)
+        return f"未到发送时间，剩余 {remaining_minutes} 分钟"
+    last_sent = state.get('last_email_sent_time')
+    if isinstance(last_sent, datetime) and now - last_sent < interval:
+        remaining_minutes = int((interval - (now - last_sent)).total_seconds() // 60)
+        return f"距离上次发送时间不足，剩余{remaining_minutes}分钟"
+    return None
+
+
+def _record_results(store, results, now, interval, patent_counts=None):
+    """记录发送事件并更新发送成功的收件人状态，返回成功的收件人集合"""
+    delivered = set()
+    for result in results:
+        store.events.record(KIND_SEND, success=result.success, recipient=result.recipient,
+                            patents=(patent_counts or {}).get(result.recipient),
+                            latency_ms=result.latency_ms, error_class=result.error, message=result.message)
+        if result.success:
+            delivered.add(result.recipient)
+    if delivered:
+        store.update_recipient_states({
+            recipient: {'last_email_sent_time': now, 'next_scheduled_send': now + interval}
+            for recipient in delivered
+        })
+        store.state.update({'last_email_sent_time': now, 'next_scheduled_send': now + interval})
+    return delivered
+
+
+# 自动发送提醒邮件的函数（按收件人分组，每个收件人独立控制发送间隔）
+@timed('check')
+def auto_send_reminders(store, cfg, now=None, cancel=None):
+    """按收件人汇总需要提醒的专利并发送，计划/发送时间直接写回数据库
+
+    cancel（threading.Event）被设置时：认领台账之前直接返回，发送过程中停止发送下一封，
+    已写入发件箱的邮件留待下一轮发送。每次调用记录一条检查事件（结果、耗时、专利数）。
+    """
+    started = time.perf_counter()
+    stats = {}
+    success, message, error_class = False, "", None
+    try:
+        success, message = _send_reminders(store, cfg, now, cancel, stats)
+        return success, message
+    except Exception as e:
+        error_class, message = type(e).__name__, str(e)
+        raise
+    finally:
+        store.events.record(KIND_CHECK, success=success, message=message, error_class=error_class,
+                            latency_ms=(time.perf_counter() - started) * 1000, **stats)
+        store.events.flush()
+
+
+def _send_reminders(store, cfg, now, cancel, stats):
+    if store.patent_count() == 0:
+        return False, "无专利数据可检查"
+
+    if not email_config_ready(cfg):
+        return False, "邮箱配置不完整或未启用"
+
+    now = now or datetime.now()
+    interval = settings.SEND_INTERVAL
+
+    # 先重试发件箱中到期的邮件（包括进程重启前未发出的），补发成功即视为该收件人本轮已发送
+    engine = DeliveryEngine(store, cfg)
+    retried, retry_ok = set(), True
+    if store.outbox_depth():
+        retry_results = list(engine.flush(cancel=cancel).values())
+        retried = _record_results(store, retry_results, now, interval)
+        # 补发失败时本轮记为失败；没有需要补发的邮件或全部补发成功时，下面的"无需发送"都算成功
+        retry_ok = all(result.success for result in retry_results)
+
+    # 检查需要提醒的专利
+    reminder_days = store.settings.get('reminder_days', settings.DEFAULT_REMINDER_DAYS)
+    dataset = get_dataset(store)
+    if dataset.empty:
+        return False, "无专利数据可检查"
+    patents = attention_frame(dataset, reminder_days)
+    stats['patents'] = len(patents)
+    if patents.empty:
+        return True, "没有需要提醒的专利"
+
+    # 只保留提醒台账中尚未提醒过的 (专利, 截止日期, 档位, 收件人)
+    store.ledger.release_undelivered(now)
+    entries = store.ledger.new_entries(ledger_frame(patents, route_recipients(patents, cfg)))
+    if entries.empty:
+        return retry_ok, "没有新的需要提醒的专利"
+
+    # 一次分组得到每个收件人的行位置
+    groups = entries.groupby('recipient', sort=False).indices
+    states = store.recipient_states()
+    pending = store.pending_recipients()
+    eligible, skipped = [], {}
+    for recipient in groups:
+        reason = (
+            "已补发待重试邮件" if recipient in retried else
+            "发件箱中有邮件等待重试" if recipient in pending else
+            _gate(states.get(recipient, {}), now, interval)
+        )
+        if reason:
+            skipped[recipient] = reason
+        else:
+            eligible.append(recipient)
+    if not eligible:
+        if len(skipped) == 1:
+            return retry_ok, next(iter(skipped.values()))
+        return retry_ok, f"{len(skipped)} 位收件人本轮无需发送"
+
+    if cancel is not None and cancel.is_set():
+        return retry_ok, "任务已取消，本轮未发送新的提醒"
+
+    # 在台账中认领条目，其他进程已认领的条目不会重复发送
+    run_id, claimed = store.ledger.claim(entries[entries['recipient'].isin(eligible)])
+    if claimed.empty:
+        return retry_ok, "没有新的需要提醒的专利"
+    patents = patents.loc[claimed.index]
+    groups = claimed.groupby('recipient', sort=False).indices
+    eligible = list(groups)
+    stats['recipients'] = len(eligible)
+
+    # 先占用本轮计划时间，避免发送失败时立即重复发送
+    store.update_recipient_states({r: {'next_scheduled_send': now + interval} for r in eligible})
+
+    # 并行生成各收件人的邮件，统一写入发件箱后复用同一连接发送
+    outbox_ids = []
+    try:
+        with ThreadPoolExecutor(max_workers=min(settings.RENDER_WORKERS, len(eligible))) as pool:
+            messages = list(pool.map(
+                lambda r: build_reminder_message(cfg["sender_email"], r, patents.iloc[groups[r]],
+                                                 cfg.get("attachment_format", "")),
+                eligible))
+        for recipient, message in zip(eligible, messages):
+            outbox_ids.append(engine.enqueue(message))
+            store.ledger.attach_outbox(run_id, recipient, outbox_ids[-1])
+    except Exception:
+        # 未写入发件箱的条目撤销认领，下一轮重新发送
+        for recipient in eligible[len(outbox_ids):]:
+            store.ledger.release(run_id, recipient)
+        raise
+    results = engine.flush(cancel=cancel)
+    delivered = _record_results(store, [results[i] for i in outbox_ids if i in results], now, interval,
+                                {r: len(groups[r]) for r in eligible})
+
+    unsent = sum(1 for i in outbox_ids if i not in results)
+    if unsent and cancel is not None and cancel.is_set():
+        return bool(delivered), (f"任务已取消：已向 {len(delivered)} 位收件人发送提醒，"
+                                 f"其余 {unsent} 封留在发件箱等待下一轮")
+    if len(eligible) == 1 and not skipped:
+        result = results.get(outbox_ids[0])
+        return (True, result.message) if result and result.success else (
+            False, result.message if result else "邮件已进入发件箱，等待发送")
+    failed = len(eligible) - len(delivered)
+    return bool(delivered), (f"已向 {len(delivered)} 位收件人发送提醒，"
+                             f"{failed} 位发送失败，{len(skipped)} 位本轮无需发送")
+
+
+def run_reminders(store, cfg=None, now=None, cancel=None):
+    """在数据库租约内执行一次 auto_send_reminders
+
+    所有共用同一数据库的进程中同一时刻只有一个提醒检查在执行，其余直接跳过。
+    """
+    lease = Lease(store, 'reminder_run', settings.RUN_LEASE_SECONDS)
+    if not lease.acquire(now):
+        # 另一个进程正在检查，本轮跳过不算失败
+        return True, "其他进程正在执行提醒检查，本轮跳过"
+    try:
+        return auto_send_reminders(store, cfg or store.load_email_config(), now, cancel)
+    finally:
+        lease.release()
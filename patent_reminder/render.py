@@ -0,0 +1,100 @@
+"""提醒邮件内容生成（按列向量化格式化，一次拼接）
+
+同一份格式化结果同时生成纯文本正文、HTML 表格和可选的 xlsx/csv 附件。
+"""
+import csv
+import html
+import io
+
+import numpy as np
+import pandas as pd
+
+# 附件与 HTML 表格的列
+DUE_COLUMNS = ['专利名称', '专利号', '缴费截止日期', '距离到期天数', '缴费金额', '状态']
+
+# 与页面表格一致的状态底色
+STATUS_COLORS = {'即将到期': '#fff3cd', '已过期': '#f8d7da'}
+
+
+def _format_amount(amounts):
+    values = pd.to_numeric(amounts, errors='coerce')
+    integral = values.notna() & (values == np.floor(values))
+    text = values.astype(str)
+    text[integral] = values[integral].astype(np.int64).astype(str)
+    text[values.isna()] = ''
+    return text
+
+
+def format_due_frame(patents):
+    """把需要提醒的专利格式化为字符串列（每列一次向量化转换）"""
+    days = pd.to_numeric(patents['距离到期天数'], errors='coerce')
+    return pd.DataFrame({
+        '专利名称': patents['专利名称'].astype(str),
+        '专利号': patents['专利号'].astype(str),
+        '缴费截止日期': patents['缴费截止日期'].dt.strftime('%Y-%m-%d'),
+        '距离到期天数': days.astype('Int64').astype(str).replace('<NA>', ''),
+        '缴费金额': _format_amount(patents['缴费金额']),
+        '状态': patents['状态'].astype(str) if '状态' in patents else '',
+    }, index=patents.index)
+
+
+def render_text(formatted):
+    blocks = ("专利名称：" + formatted['专利名称']
+              + "\n专利号：" + formatted['专利号']
+              + "\n缴费截止日期：" + formatted['缴费截止日期']
+              + "\n距离到期天数：" + formatted['距离到期天数'] + "天"
+              + "\n缴费金额：" + formatted['缴费金额'] + "元\n\n")
+    return "以下专利即将到期或已过期，请及时处理：\n\n" + "".join(blocks.tolist())
+
+
+def render_html(formatted):
+    escaped = {col: formatted[col].map(html.escape) for col in DUE_COLUMNS}
+    colors = formatted['状态'].map(STATUS_COLORS).fillna('#ffffff')
+    rows = '<tr style="background-color:' + colors + '">'
+    for col in DUE_COLUMNS:
+        rows = rows + "<td>" + escaped[col] + "</td>"
+    rows = rows + "</tr>"
+    header = "".join(f"<th>{col}</th>" for col in DUE_COLUMNS)
+    return (
+        "<p>以下专利即将到期或已过期，请及时处理：</p>"
+        '<table border="1" cellspacing="0" cellpadding="4" style="border-collapse:collapse">'
+        f"<thead><tr>{header}</tr></thead><tbody>"
+        + "".join(rows.tolist())
+        + "</tbody></table>"
+    )
+
+
+def build_attachment(patents, formatted, fmt):
+    """在内存中生成附件，返回 (文件名, 字节内容, MIME 子类型)
+
+    csv 直接使用格式化后的字符串；xlsx 保留日期与数值类型，便于在 Excel 中筛选求和。
+    """
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(DUE_COLUMNS)
+        writer.writerows(formatted[DUE_COLUMNS].itertuples(index=False, name=None))
+        # 带 BOM，Excel 打开中文不乱码
+        return "专利缴费提醒.csv", buffer.getvalue().encode('utf-8-sig'), 'csv'
+    if fmt == 'xlsx':
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("需要关注的专利")
+        ws.append(DUE_COLUMNS)
+        values = pd.DataFrame({
+            '专利名称': formatted['专利名称'],
+            '专利号': formatted['专利号'],
+            '缴费截止日期': patents['缴费截止日期'].dt.date,
+            '距离到期天数': pd.to_numeric(patents['距离到期天数'], errors='coerce'),
+            '缴费金额': pd.to_numeric(patents['缴费金额'], errors='coerce'),
+            '状态': formatted['状态'],
+        }).astype(object)
+        values = values.where(values.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            ws.append(row)
+        buffer = io.BytesIO()
+        wb.save(buffer)
+        return ("专利缴费提醒.xlsx", buffer.getvalue(),
+                'vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    raise ValueError(f"不支持的附件格式：{fmt}")
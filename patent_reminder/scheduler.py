@@ -0,0 +1,278 @@
+"""后台提醒调度器
+
+独立运行：python -m patent_reminder.scheduler
+也可由页面以守护线程方式嵌入。无论哪种方式，同一时刻只有持有单实例锁的
+调度器会执行检查，页面只读取调度器写出的状态文件。
+持有锁的调度器同时在独立端口上提供 /healthz、/status、/trigger 接口（见 health.py）。
+一个调度器负责所有工作区（见 workspaces.py）：每轮检查把各工作区的提醒发送提交到共用的
+任务队列，按工作区配额并行执行，等待全部结束后写出状态。
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from . import settings
+from .locking import FileLock, atomic_write
+from .migrate import migrate_pickles
+from .store import get_store
+from .workspaces import DEFAULT_WORKSPACE, all_workspaces
+
+logger = logging.getLogger(__name__)
+
+
+class InstanceLock(FileLock):
+    """调度器单实例锁"""
+
+    def __init__(self, path=None):
+        super().__init__(path or settings.SCHEDULER_LOCK_FILE)
+
+
+def _isoformat(value):
+    return value.isoformat(timespec='seconds') if isinstance(value, datetime) else None
+
+
+def write_status(status, path=None):
+    """原子写入状态文件（先写临时文件再替换）"""
+    atomic_write(path or settings.SCHEDULER_STATUS_FILE, json.dumps(status, ensure_ascii=False))
+
+
+def read_status(path=None):
+    """读取调度器状态，文件不存在或损坏时返回 None"""
+    path = path or settings.SCHEDULER_STATUS_FILE
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_alive(status, now=None):
+    """心跳在三个检查周期内视为调度器在线"""
+    if not status or not status.get('heartbeat'):
+        return False
+    now = now or datetime.now()
+    heartbeat = datetime.fromisoformat(status['heartbeat'])
+    return now - heartbeat < timedelta(seconds=3 * status.get('interval', settings.CHECK_INTERVAL_SECONDS))
+
+
+def request_check(path=None):
+    """请求调度器尽快执行一次检查（页面按钮、心跳接口使用）"""
+    atomic_write(path or settings.SCHEDULER_TRIGGER_FILE, datetime.now().isoformat(timespec='seconds'))
+
+
+def _consume_trigger(path=None):
+    path = path or settings.SCHEDULER_TRIGGER_FILE
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _check_workspace(store, now, cancel=None):
+    """单个工作区的一次检查（在任务队列中执行）"""
+    # 提醒流程依赖 pandas，只在真正检查时导入
+    from .reminders import run_reminders
+
+    store.state.increment('check_count')
+    store.state.set('last_check_time', now)
+    return run_reminders(store, now=now, cancel=cancel)
+
+
+class Scheduler:
+    """按固定周期（带随机抖动）执行提醒检查，停机后启动会立即补做一次检查"""
+
+    HEARTBEAT_SECONDS = 5
+
+    def __init__(self, interval=None, jitter=None):
+        self.interval = interval or settings.CHECK_INTERVAL_SECONDS
+        self.jitter = settings.CHECK_JITTER_SECONDS if jitter is None else jitter
+        self.stop_event = threading.Event()
+        self.started_at = datetime.now()
+        self.next_check_time = None
+        self.last_result = None
+        self.workspace_results = {}
+        self._state = {}
+        self._last_heartbeat = 0.0
+
+    def _next_delay(self):
+        return max(1.0, self.interval + random.uniform(-self.jitter, self.jitter))
+
+    def _status(self):
+        state = self._state
+        return {
+            "pid": os.getpid(),
+            "interval": self.interval,
+            "started_at": _isoformat(self.started_at),
+            "heartbeat": _isoformat(datetime.now()),
+            "next_check_time": _isoformat(self.next_check_time),
+            "check_count": state.get('check_count') or 0,
+            "last_check_time": _isoformat(state.get('last_check_time')),
+            "last_email_sent_time": _isoformat(state.get('last_email_sent_time')),
+            "next_scheduled_send": _isoformat(state.get('next_scheduled_send')),
+            "last_result": self.last_result,
+            "workspaces": self.workspace_results,
+        }
+
+    def _heartbeat(self, force=False):
+        if not force and time.monotonic() - self._last_heartbeat < self.HEARTBEAT_SECONDS:
+            return
+        try:
+            write_status(self._status())
+            self._last_heartbeat = time.monotonic()
+        except Exception:
+            logger.exception("写入调度器状态失败")
+
+    def run_check(self, reason="scheduled"):
+        """对所有工作区执行一次检查并保存调度器负责的字段"""
+        # 任务队列在首次检查时才创建，状态查询与健康检查保持轻量
+        from .jobs import get_queue
+
+        now = datetime.now()
+        queue = get_queue()
+        jobs, results = {}, {}
+        for workspace in all_workspaces():
+            # 某个工作区的数据库损坏或被锁定时只记录该工作区失败，不影响其他工作区
+            try:
+                jobs[workspace.name] = queue.get(workspace.submit("定时检查", _check_workspace, now))
+            except Exception as e:
+                logger.exception("提交检查失败（工作区 %s）", workspace.name)
+                results[workspace.name] = {"time": _isoformat(now), "reason": reason,
+                                           "success": False, "message": f"提交检查失败：{e}"}
+        for name, job in jobs.items():
+            # 发送大量邮件时一轮检查可能超过多个周期，等待期间继续写心跳，避免被判为离线
+            while not job.done_event.wait(self.HEARTBEAT_SECONDS):
+                self._heartbeat()
+            results[name] = {"time": _isoformat(now), "reason": reason,
+                             "success": bool(job.success), "message": job.message}
+            logger.info("检查完成（%s，工作区 %s）：%s", reason, name, job.message)
+        self._load_state()
+        self.workspace_results = results
+        # 只有默认工作区时与单租户部署一致，否则汇总各工作区结果
+        self.last_result = results.get(DEFAULT_WORKSPACE) if len(results) == 1 else {
+            "time": _isoformat(now),
+            "reason": reason,
+            "success": all(result["success"] for result in results.values()),
+            "message": f"已检查 {len(results)} 个工作区，"
+                       f"{sum(result['success'] for result in results.values())} 个成功",
+        }
+        self._heartbeat(force=True)
+        return self.last_result["success"], self.last_result["message"]
+
+    def _load_state(self):
+        # 读取失败（如数据库被锁定）时保留上次读取的状态
+        try:
+            self._state = get_store().state.all()
+        except Exception:
+            logger.exception("读取调度器状态失败")
+
+    def _initial_check_time(self):
+        # 根据上次检查时间计算首次检查时间；停机超过一个周期则立即补做
+        self._load_state()
+        last_check = self._state.get('last_check_time')
+        now = datetime.now()
+        if isinstance(last_check, datetime):
+            return max(now, last_check + timedelta(seconds=self.interval))
+        return now
+
+    def run_forever(self):
+        self.next_check_time = self._initial_check_time()
+        self._heartbeat(force=True)
+        while not self.stop_event.is_set():
+            now = datetime.now()
+            # 单轮检查出错只记录日志，调度器继续运行（嵌入页面的线程不会被重新启动）
+            try:
+                if _consume_trigger():
+                    self.run_check("manual")
+                    self.next_check_time = datetime.now() + timedelta(seconds=self._next_delay())
+                elif now >= self.next_check_time:
+                    # 错过的多个周期（休眠、停机）只合并补做一次
+                    late = (now - self.next_check_time).total_seconds()
+                    self.run_check("catch-up" if late > self.interval else "scheduled")
+                    self.next_check_time = datetime.now() + timedelta(seconds=self._next_delay())
+                else:
+                    self._heartbeat()
+            except Exception:
+                logger.exception("提醒检查失败")
+                self.next_check_time = datetime.now() + timedelta(seconds=self._next_delay())
+                self._heartbeat(force=True)
+            self.stop_event.wait(1)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def _start_health():
+    # 只有持有锁的调度器对外提供状态接口
+    from .health import start_health_server
+    return start_health_server()
+
+
+def start_background(interval=None):
+    """在当前进程中启动守护线程调度器
+
+    线程会周期性尝试获取单实例锁，若已有独立调度器进程在运行则只等待，
+    该进程退出后自动接管。
+    """
+    scheduler = Scheduler(interval)
+    lock = InstanceLock()
+
+    def _run():
+        while not scheduler.stop_event.is_set():
+            if lock.acquire():
+                health = _start_health()
+                try:
+                    scheduler.run_forever()
+                finally:
+                    if health:
+                        health.stop()
+                    lock.release()
+                return
+            scheduler.stop_event.wait(scheduler.interval)
+
+    thread = threading.Thread(target=_run, name="patent-reminder-scheduler", daemon=True)
+    thread.start()
+    return scheduler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="专利缴费提醒调度器")
+    parser.add_argument("--interval", type=int, default=settings.CHECK_INTERVAL_SECONDS,
+                        help="检查周期（秒）")
+    parser.add_argument("--once", action="store_true", help="只执行一次检查后退出")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    lock = InstanceLock()
+    if not lock.acquire():
+        logger.error("已有调度器实例在运行（锁文件：%s）", lock.path)
+        return 1
+
+    migrate_pickles()
+    scheduler = Scheduler(args.interval)
+    health = None
+    try:
+        if args.once:
+            scheduler.run_check("manual")
+            return 0
+        signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+        health = _start_health()
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if health:
+            health.stop()
+        lock.release()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""专利号前缀 / 专利名称片段检索索引
+
+每个数据版本构建一次（缓存在 Dataset 上，见 search_index），查询只做二分查找与数组运算：
+
+- 专利号：统一为去掉 ZL / CN 前缀、校验位与分隔符的大写形式（ZL202010000000.5、
+  2020100000005、202010000000 都是同一个号），排序后按前缀二分查找一个区间
+- 专利名称：小写、去空白后按相邻两个字符（二元组）建倒排索引，所有名称拼接为一个
+  码点数组后向量化生成，按二元组排序存为 CSR（keys + offsets + rows）。
+  单字查询取以该字开头的全部二元组区间；多字查询取各二元组的命中行，
+  全部命中且确实包含查询串的为片段匹配，命中比例不低于 FUZZY_MIN_RATIO 的为模糊匹配
+
+匹配度：专利号完全相同 100、专利号前缀 90、名称相同 95、名称以查询串开头 85、
+名称包含查询串 80、模糊匹配 50 × 命中比例。同分时按原始行顺序。
+"""
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from .profiling import timed
+
+FUZZY_MIN_RATIO = 0.5
+# 码点不超过 0x10FFFF（21 位），二元组编码为 前一字 << 21 | 后一字，名称末尾的后一字记为 0
+_SHIFT = 21
+# 二元组编码 + 行号合成一个 int64 排序时，行号可用的位数
+_ROW_BITS = 63 - 2 * _SHIFT
+
+# 前缀 ZL / CN、小数点后的校验位及所有非字母数字字符
+_NUMBER_NOISE = re.compile(r'^[^0-9A-Z]*(?:ZL|CN)|\..*$|[^0-9A-Z]')
+
+SearchResult = namedtuple('SearchResult', 'positions scores')
+
+
+def normalize_number(text):
+    """专利号规范化：ZL202010000000.5、2020100000005、202010000000 都得到 202010000000"""
+    number = _NUMBER_NOISE.sub('', str(text).upper())
+    # 12 位申请号后直接跟校验位（共 13 位）时去掉校验位
+    return number[:12] if len(number) == 13 else number
+
+
+def normalize_title(text):
+    return ''.join(str(text).lower().split())
+
+
+def _title_codes(titles):
+    """所有名称拼接后的文本与码点数组（名称之间以 0 分隔），以及每个名称的起始位置"""
+    normalized = [normalize_title(title) if isinstance(title, str) else '' for title in titles]
+    text = '\0'.join(normalized) + '\0'
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    starts = np.zeros(len(normalized) + 1, dtype=np.int64)
+    np.cumsum([len(title) + 1 for title in normalized], out=starts[1:])
+    return text, codes, starts
+
+
+class SearchIndex:
+
+    def __init__(self, numbers, titles):
+        # 专利号：排序后的规范化号码（ASCII 字节串）与对应行位置
+        normalized = np.array([normalize_number(number).encode('ascii', 'ignore') for number in numbers],
+                              dtype='S')
+        self.number_order = np.argsort(normalized, kind='stable')
+        self.numbers = normalized[self.number_order]
+
+        # 专利名称：二元组倒排索引
+        self._text, codes, self._starts = _title_codes(titles)
+        n = len(self._starts) - 1
+        first, second = codes[:-1], codes[1:]
+        valid = first != 0
+        grams = (first[valid] << _SHIFT) | second[valid]
+        rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(self._starts))[:-1][valid]
+        # 每个名称的第一个二元组与长度（判断"以查询串开头""与查询串相同"）
+        heads = self._starts[:-1]
+        self.first_grams = (codes[heads] << _SHIFT) | codes[np.minimum(heads + 1, len(codes) - 1)]
+        self.lengths = np.diff(self._starts) - 1
+        del codes, first, second, valid
+        # 按 (二元组, 行号) 排序并去掉同一名称中重复的二元组；行号超出可合并的位数时改用稳定排序
+        if n < 1 << _ROW_BITS:
+            keys = np.unique((grams << _ROW_BITS) | rows)
+            grams, rows = keys >> _ROW_BITS, keys & ((1 << _ROW_BITS) - 1)
+        else:
+            order = np.argsort(grams, kind='stable')
+            grams, rows = grams[order], rows[order]
+            keep = np.ones(len(grams), dtype=bool)
+            keep[1:] = (grams[1:] != grams[:-1]) | (rows[1:] != rows[:-1])
+            grams, rows = grams[keep], rows[keep]
+        self.rows = rows.astype(np.int32)
+        self.keys, starts = np.unique(grams, return_index=True)
+        self.offsets = np.append(starts, len(grams))
+
+    def __len__(self):
+        return len(self._starts) - 1
+
+    # 专利号
+    def number_prefix(self, query):
+        """规范化专利号以 query 开头的行位置，以及完全相同的行位置"""
+        prefix = normalize_number(query).encode('ascii', 'ignore')
+        if not prefix:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        lo = np.searchsorted(self.numbers, prefix, side='left')
+        hi = np.searchsorted(self.numbers, prefix + b'\xff', side='left')
+        exact = np.searchsorted(self.numbers, prefix, side='right')
+        return self.number_order[lo:hi], self.number_order[lo:exact]
+
+    # 专利名称
+    def _postings(self, lo_key, hi_key):
+        lo, hi = np.searchsorted(self.keys, [lo_key, hi_key], side='left')
+        return self.rows[self.offsets[lo]:self.offsets[hi]]
+
+    def _title(self, row):
+        return self._text[self._starts[row]:self._starts[row + 1] - 1]
+
+    def title_matches(self, query):
+        """返回 (行位置, 匹配度)"""
+        text = normalize_title(query)
+        if not text:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        if len(text) == 1:
+            c = ord(text)
+            hit = np.zeros(len(self), dtype=bool)
+            hit[self._postings(c << _SHIFT, (c + 1) << _SHIFT)] = True
+            rows = np.flatnonzero(hit)
+            return rows, np.where(self.lengths[rows] == 1, 95.0, 80.0)
+        grams = [(ord(a) << _SHIFT) | ord(b) for a, b in zip(text, text[1:])]
+        unique_grams = sorted(set(grams))
+        hits = np.bincount(np.concatenate([self._postings(g, g + 1) for g in unique_grams]),
+                           minlength=len(self))
+        ratio = hits / len(unique_grams)
+        rows = np.flatnonzero(ratio >= FUZZY_MIN_RATIO)
+        ratio = ratio[rows]
+        scores = 50 * ratio
+        complete = np.flatnonzero(ratio == 1)
+        if len(grams) == 1:
+            # 两个字的查询串：二元组命中即包含
+            candidates = rows[complete]
+            starts_with = self.first_grams[candidates] == grams[0]
+            scores[complete] = np.where(starts_with, np.where(self.lengths[candidates] == 2, 95, 85), 80)
+            return rows, scores
+        # 全部二元组都命中的行再确认是否真正包含查询串
+        for i in complete:
+            title = self._title(rows[i])
+            if title == text:
+                scores[i] = 95
+            elif title.startswith(text):
+                scores[i] = 85
+            elif text in title:
+                scores[i] = 80
+        return rows, scores
+
+    def search(self, query, limit=50):
+        """按匹配度排序的结果（SearchResult），limit 为 None 时返回全部匹配"""
+        query = str(query or '').strip()
+        if not query:
+            return SearchResult(np.empty(0, dtype=np.intp), np.empty(0))
+        scores = np.zeros(len(self))
+        title_rows, title_scores = self.title_matches(query)
+        scores[title_rows] = title_scores
+        prefix, exact = self.number_prefix(query)
+        scores[prefix] = np.maximum(scores[prefix], 90)
+        scores[exact] = 100
+        positions = np.flatnonzero(scores)
+        # 匹配度降序，同分按行顺序
+        positions = positions[np.argsort(-scores[positions], kind='stable')]
+        if limit is not None:
+            positions = positions[:limit]
+        return SearchResult(positions, scores[positions])
+
+
+def search_index(dataset):
+    """数据集的检索索引（按数据版本缓存在 dataset 上）"""
+    def build():
+        frame = dataset.frame
+        with timed('search_index'):
+            return SearchIndex(frame['专利号'].tolist(), frame['专利名称'].tolist())
+    return dataset.derived(('search_index',), build)
+
+
+def search_patents(dataset, query, limit=20, reminder_days=None):
+    """检索专利，返回按匹配度排序的 DataFrame（带 匹配度 列）；reminder_days 不为空时带状态列"""
+    if dataset.empty:
+        return None
+    result = search_index(dataset).search(query, limit)
+    frame = dataset.frame if reminder_days is None else dataset.classified(reminder_days)
+    found = frame.iloc[result.positions].copy()
+    found.insert(0, '匹配度', np.round(result.scores).astype(int))
+    return found
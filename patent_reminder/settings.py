@@ -0,0 +1,97 @@
+"""全局配置：文件路径、默认值与时间间隔"""
+import os
+from datetime import timedelta
+
+# 数据目录（默认当前工作目录，与原 app.py 的相对路径行为一致）
+DATA_DIR = os.environ.get("PATENT_REMINDER_DATA_DIR", ".")
+
+# 数据库文件（专利数据、提醒记录、调度状态与配置）
+DB_FILE = os.path.join(DATA_DIR, "patent_reminder.db")
+# 多租户工作区目录：每个工作区一个子目录（独立的数据库、快照与事件日志），
+# 默认工作区仍使用 DB_FILE
+WORKSPACES_DIR = os.environ.get("PATENT_REMINDER_WORKSPACES_DIR", os.path.join(DATA_DIR, "workspaces"))
+# 旧版 pickle 文件，仅供一次性迁移使用
+CONFIG_FILE = os.path.join(DATA_DIR, "email_config.pkl")
+DATA_FILE = os.path.join(DATA_DIR, "app_data.pkl")
+
+# 调度器文件：状态（供页面读取）、单实例锁、手动触发标记
+SCHEDULER_STATUS_FILE = os.path.join(DATA_DIR, "scheduler_status.json")
+SCHEDULER_LOCK_FILE = os.path.join(DATA_DIR, "scheduler.lock")
+SCHEDULER_TRIGGER_FILE = os.path.join(DATA_DIR, "scheduler.trigger")
+# 旧数据迁移锁：多个进程同时启动时只有一个执行迁移
+MIGRATE_LOCK_FILE = os.path.join(DATA_DIR, "migrate.lock")
+# 结构化事件日志（检查、发送）：数据库 events 表之外另写一份 JSON Lines 文件，按大小与日期轮转
+EVENT_LOG_FILE = os.environ.get("PATENT_REMINDER_EVENT_LOG", os.path.join(DATA_DIR, "events.jsonl"))
+EVENT_LOG_MAX_BYTES = 10 * 1024 * 1024
+EVENT_LOG_BACKUPS = 10
+# 跨过零点后写入的第一批事件前轮转，每个文件只含一天的事件
+EVENT_LOG_ROTATE_DAILY = True
+# 事件缓冲：满该条数或距上次写入超过该秒数时批量写入
+EVENT_BUFFER_SIZE = 100
+EVENT_FLUSH_SECONDS = 30
+
+# 同一收件人两次发送之间的最短时间
+SEND_INTERVAL = timedelta(minutes=4)
+# 调度器检查周期及随机抖动（秒）
+CHECK_INTERVAL_SECONDS = int(os.environ.get("PATENT_REMINDER_CHECK_INTERVAL", 60))
+CHECK_JITTER_SECONDS = 5
+# 提醒检查租约时长（秒）：持有者崩溃后超过该时间其他进程才能接管
+RUN_LEASE_SECONDS = 900
+# 后台任务队列：同时执行的任务数、保留的已结束任务数
+JOB_WORKERS = int(os.environ.get("PATENT_REMINDER_JOB_WORKERS", 2))
+MAX_FINISHED_JOBS = 50
+# 每个工作区同时执行的任务数（默认配额，可按工作区单独设置），超出的任务在队列中等待
+WORKSPACE_MAX_JOBS = int(os.environ.get("PATENT_REMINDER_WORKSPACE_MAX_JOBS", 1))
+
+# 分阶段耗时统计：每个阶段保留的最近耗时个数（用于 p50 / p95），超过该秒数的阶段写入日志；
+# PERF_PANEL 为 1 时页面侧边栏显示「性能」面板（也可用 ?admin=1 打开）
+PROFILE_WINDOW = 1000
+PROFILE_SLOW_SECONDS = float(os.environ.get("PATENT_REMINDER_PROFILE_SLOW_SECONDS", 1.0))
+PERF_PANEL = os.environ.get("PATENT_REMINDER_PERF_PANEL", "") == "1"
+
+# 健康检查接口（由调度器启动，端口为 0 时不启动）与手动触发令牌（为空时禁止触发）
+HEALTH_HOST = os.environ.get("PATENT_REMINDER_HEALTH_HOST", "127.0.0.1")
+HEALTH_PORT = int(os.environ.get("PATENT_REMINDER_HEALTH_PORT", 8765))
+TRIGGER_TOKEN = os.environ.get("PATENT_REMINDER_TRIGGER_TOKEN", "")
+
+# SMTP 发送：令牌桶限速（每秒封数、突发上限）、单连接最多发送封数
+SMTP_RATE_PER_SECOND = 1.0
+SMTP_BURST = 5
+SMTP_MAX_MESSAGES_PER_SESSION = 50
+SMTP_TIMEOUT_SECONDS = 10
+SMTP_IDLE_SECONDS = 60  # 连接空闲超过该时间后关闭
+RENDER_WORKERS = 8  # 并行生成邮件内容的线程数
+# 发件箱重试：指数退避（基数、上限）与最大尝试次数
+OUTBOX_RETRY_BASE_SECONDS = 30
+OUTBOX_RETRY_MAX_SECONDS = 3600
+OUTBOX_MAX_ATTEMPTS = 6
+# 发送前认领邮件的时长（秒）：发送进程崩溃后超过该时间邮件才重新到期
+OUTBOX_CLAIM_SECONDS = 300
+
+# 提醒档位（天）：距离到期天数每跨入一个更近的档位再提醒一次
+REMINDER_TIERS = (90, 30, 7, 0)
+
+# 提醒提前天数默认值
+DEFAULT_REMINDER_DAYS = 49
+
+# 批量导出：每次写出的行数（CSV / Excel / Parquet 均分块写出），缓存的导出文件个数
+EXPORT_CHUNK_ROWS = 50000
+MAX_CACHED_EXPORTS = 20
+
+# 上传文件必须包含的列
+REQUIRED_COLUMNS = ['专利名称', '专利号', '缴费截止日期', '缴费金额']
+# 上传文件中可选的列（存在时一并导入）：负责人及其邮箱用于按收件人分发提醒，
+# 申请日与专利类型用于按年费规则计算缴费截止日期、宽限期与滞纳金
+OPTIONAL_COLUMNS = ['负责人', '负责人邮箱', '申请日', '专利类型']
+
+# 默认邮箱配置
+DEFAULT_EMAIL_CONFIG = {
+    "sender_email": "",
+    "sender_password": "",
+    "smtp_server": "smtp.qq.com",
+    "smtp_port": 587,
+    "receiver_email": "",  # 默认收件人（未指定负责人邮箱的专利发送到这里）
+    "owner_emails": {},  # 负责人 -> 邮箱
+    "attachment_format": "",  # 附件格式：""（不附带）、"xlsx"、"csv"
+    "email_enabled": False
+}
@@ -0,0 +1,148 @@
+"""专利数据的列式快照：每列一个 .npy 文件，以内存映射方式读取
+
+SQLite 仍是唯一的数据源，快照只是按数据版本缓存的只读副本：
+- 日期、数值列按原 dtype 保存，读取时零拷贝
+- 文本列按分类编码保存（int32 编码 + 去重后的取值），读取时按编码取值还原；
+  取值拼接为一段 UTF-8 文本并另存 int64 字符偏移，不按最长取值补齐定长字符串
+- np.load(mmap_mode='r', allow_pickle=False)：数据页由操作系统按需换入并在进程间共享，
+  共享目录中的文件也不会像 pickle 那样执行任何代码
+- 可以只读取部分列（分类只需要 专利号、缴费截止日期、申请日、专利类型）
+
+目录结构：<数据库文件>.snapshots/<版本戳>/manifest.json + c<列序号>.npy
+（文本列另有 c<列序号>.cat.npy 与 c<列序号>.off.npy）
+"""
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 2
+
+
+def snapshot_root(db_path):
+    return f"{db_path}.snapshots"
+
+
+def _encode_column(values):
+    """返回 (类型, {文件后缀: 数组})"""
+    import pandas as pd
+
+    if values.dtype.kind == 'M':
+        return 'datetime', {'': values.to_numpy(dtype='datetime64[ns]')}
+    if values.dtype.kind in 'biuf':
+        return 'numeric', {'': values.to_numpy()}
+    codes, uniques = pd.factorize(values.astype(object).where(values.notna(), None))
+    texts = [str(v) for v in uniques]
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in texts], out=offsets[1:])
+    return 'category', {
+        '': codes.astype(np.int32),
+        '.cat': np.frombuffer(''.join(texts).encode('utf-8'), dtype=np.uint8),
+        '.off': offsets,
+    }
+
+
+def write_snapshot(df, db_path, stamp):
+    """把 DataFrame 写为版本戳 stamp 的快照；先写临时目录再原子改名，同一版本只保留先完成的一份"""
+    root = snapshot_root(db_path)
+    os.makedirs(root, exist_ok=True)
+    target = os.path.join(root, stamp)
+    if os.path.isdir(target):
+        if _compatible(target):
+            return target
+        # 旧格式的快照：删除后按当前格式重写
+        shutil.rmtree(target, ignore_errors=True)
+    tmp = tempfile.mkdtemp(dir=root, prefix=".tmp-")
+    try:
+        columns = []
+        for i, name in enumerate(df.columns):
+            kind, arrays = _encode_column(df[name])
+            for suffix, array in arrays.items():
+                np.save(os.path.join(tmp, f"c{i}{suffix}.npy"), array, allow_pickle=False)
+            columns.append({'name': name, 'kind': kind})
+        with open(os.path.join(tmp, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump({'format': FORMAT_VERSION, 'rows': len(df), 'columns': columns},
+                      f, ensure_ascii=False)
+        os.rename(tmp, target)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(target):
+            raise
+    _prune(root, keep=os.path.basename(target))
+    return target
+
+
+def _compatible(path):
+    try:
+        with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+            return json.load(f).get('format') == FORMAT_VERSION
+    except (OSError, ValueError):
+        return False
+
+
+def _prune(root, keep):
+    # 旧版本的快照可能仍被其他进程映射：POSIX 下删除不影响已打开的映射，Windows 下删除失败时留到下次
+    for name in os.listdir(root):
+        if name != keep and not name.startswith('.tmp-'):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+class Snapshot:
+    """只读快照，按列惰性读取"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != FORMAT_VERSION:
+            raise ValueError(f"快照格式不兼容：{path}")
+        self.rows = manifest['rows']
+        self._columns = {col['name']: (i, col['kind']) for i, col in enumerate(manifest['columns'])}
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def _load(self, name, suffix=''):
+        i, _ = self._columns[name]
+        return np.load(os.path.join(self.path, f"c{i}{suffix}.npy"), mmap_mode='r', allow_pickle=False)
+
+    def column(self, name):
+        """单列数组：日期、数值列为内存映射数组，文本列还原为 object 数组（缺失值为 None）"""
+        _, kind = self._columns[name]
+        values = self._load(name)
+        if kind != 'category':
+            return values
+        text = self._load(name, '.cat').tobytes().decode('utf-8')
+        offsets = self._load(name, '.off').tolist()
+        # 编码 -1 正好取到末尾追加的 None
+        categories = np.array([text[start:end] for start, end in zip(offsets, offsets[1:])] + [None],
+                              dtype=object)
+        return categories[values]
+
+    def frame(self, columns=None):
+        """按 manifest 中的列顺序组成 DataFrame；columns 为空时读取全部列，不存在的列忽略"""
+        import pandas as pd
+
+        names = [name for name in self._columns if columns is None or name in columns]
+        # copy=False：不合并为二维块，内存映射的列保持零拷贝
+        return pd.DataFrame({name: self.column(name) for name in names},
+                            index=pd.RangeIndex(self.rows), copy=False)
+
+
+def open_snapshot(db_path, stamp):
+    """打开版本戳 stamp 的快照，不存在或损坏时返回 None"""
+    path = os.path.join(snapshot_root(db_path), stamp)
+    if not os.path.isdir(path):
+        return None
+    try:
+        return Snapshot(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("快照不可用，改为从数据库读取：%s（%s）", path, e)
+        return None
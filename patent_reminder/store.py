@@ -0,0 +1,557 @@
+"""SQLite 持久化存储（WAL 模式）
+
+表结构：
+- patents：专利数据，以 (专利号, 缴费截止日期) 为唯一键，带行哈希与删除标记
+- reminder_ledger：提醒台账，按 (专利号, 截止日期, 档位, 收件人) 记录已提醒条目
+- scheduler_state：调度器维护的检查次数、检查/发送时间等
+- app_settings：页面维护的提醒天数、上传时间、邮箱配置等
+- outbox：待发送邮件（发送失败的邮件在重启后仍会重试）
+- recipient_state：每个收件人的计划发送时间与上次发送时间
+- events：检查、发送事件日志（见 events.EventLog），按时间建索引
+- leases：跨进程租约（保证同一时刻只有一个提醒检查在执行，见 locking.Lease）
+
+小的状态变化（如 check_count、last_check_time）只更新单行，不再整体重写。
+"""
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+
+from . import settings
+from .events import COLUMNS as EVENT_COLUMNS, EventLog
+from .ledger import Ledger
+from .profiling import timed
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patents (
+    id INTEGER PRIMARY KEY,
+    专利名称 TEXT,
+    专利号 TEXT NOT NULL,
+    缴费截止日期 TEXT NOT NULL,
+    缴费金额 REAL,
+    extra TEXT,
+    row_hash INTEGER,
+    deleted_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_patents_deadline ON patents(缴费截止日期);
+CREATE INDEX IF NOT EXISTS idx_patents_number ON patents(专利号);
+
+CREATE TABLE IF NOT EXISTS reminder_ledger (
+    专利号 TEXT NOT NULL,
+    deadline TEXT NOT NULL,
+    tier INTEGER NOT NULL,
+    recipient TEXT NOT NULL,
+    notified_at TEXT NOT NULL,
+    run_id TEXT,
+    outbox_id INTEGER,
+    PRIMARY KEY (专利号, deadline, tier, recipient)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_ledger_run ON reminder_ledger(run_id);
+CREATE INDEX IF NOT EXISTS idx_ledger_outbox ON reminder_ledger(outbox_id);
+
+CREATE TABLE IF NOT EXISTS scheduler_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS app_settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY,
+    recipient TEXT NOT NULL,
+    subject TEXT,
+    message BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TEXT NOT NULL,
+    last_error TEXT,
+    created_at TEXT NOT NULL,
+    sent_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at);
+
+CREATE TABLE IF NOT EXISTS recipient_state (
+    recipient TEXT PRIMARY KEY,
+    next_scheduled_send TEXT,
+    last_email_sent_time TEXT
+);
+
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    success INTEGER,
+    recipient TEXT,
+    patents INTEGER,
+    latency_ms REAL,
+    error_class TEXT,
+    message TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts);
+CREATE INDEX IF NOT EXISTS idx_events_kind_ts ON events(kind, ts);
+
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    acquired_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+"""
+
+# 以 ISO 字符串保存、读取时还原为 datetime 的键
+DATETIME_KEYS = {'last_check_time', 'next_scheduled_send', 'last_email_sent_time'}
+
+PATENT_COLUMNS = ['专利名称', '专利号', '缴费截止日期', '缴费金额']
+
+# 旧版数据库升级：补充新增列，并按唯一键去重后建立唯一索引
+SCHEMA_UPGRADES = [
+    ("patents", "row_hash", "ALTER TABLE patents ADD COLUMN row_hash INTEGER"),
+    ("patents", "deleted_at", "ALTER TABLE patents ADD COLUMN deleted_at TEXT"),
+]
+UNIQUE_KEY_INDEX = """
+DELETE FROM patents WHERE id NOT IN (
+    SELECT MAX(id) FROM patents GROUP BY 专利号, 缴费截止日期);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_patents_key ON patents(专利号, 缴费截止日期);
+"""
+
+# 导入暂存表（每个连接独立的临时表），上传数据先写入这里再与 patents 比对
+STAGING_SCHEMA = """
+CREATE TEMP TABLE IF NOT EXISTS upload_rows (
+    专利名称 TEXT,
+    专利号 TEXT NOT NULL,
+    缴费截止日期 TEXT NOT NULL,
+    缴费金额 REAL,
+    extra TEXT,
+    row_hash INTEGER,
+    PRIMARY KEY (专利号, 缴费截止日期)
+)
+"""
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return json.dumps(value.isoformat())
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _decode(key, raw):
+    if raw is None:
+        return None
+    value = json.loads(raw)
+    if key in DATETIME_KEYS and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value
+
+
+class KeyValueTable:
+    """键值表的读写封装，每次写入只影响对应的行"""
+
+    def __init__(self, store, table):
+        self.store = store
+        self.table = table
+
+    def get(self, key, default=None):
+        row = self.store.conn.execute(
+            f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return default
+        value = _decode(key, row[0])
+        return default if value is None else value
+
+    def all(self):
+        rows = self.store.conn.execute(f"SELECT key, value FROM {self.table}").fetchall()
+        return {key: _decode(key, raw) for key, raw in rows}
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, fields):
+        with self.store.conn:
+            self.store.conn.executemany(
+                f"INSERT INTO {self.table}(key, value) VALUES (?, ?) "
+                f"ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                [(key, _encode(value)) for key, value in fields.items()])
+
+    def increment(self, key, step=1):
+        """原子自增整数值，返回自增后的值"""
+        with self.store.conn:
+            self.store.conn.execute(
+                f"INSERT INTO {self.table}(key, value) VALUES (?, ?) "
+                f"ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + ?",
+                (key, str(step), step))
+        return self.get(key, 0)
+
+
+def _json_value(value):
+    # 整数值的浮点数按整数保存（1.0 与 1 视为相同内容）
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+class PatentStore:
+    """专利数据库，每个线程使用独立连接"""
+
+    def __init__(self, path=None):
+        self.path = path or settings.DB_FILE
+        self._local = threading.local()
+        self.state = KeyValueTable(self, "scheduler_state")
+        self.settings = KeyValueTable(self, "app_settings")
+        self.ledger = Ledger(self)
+        self.events = EventLog(self)
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            self._upgrade_schema()
+        self._migrate_reminder_history()
+
+    def _upgrade_schema(self):
+        for table, column, ddl in SCHEMA_UPGRADES:
+            columns = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                self.conn.execute(ddl)
+        if not self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'idx_patents_key'").fetchone():
+            self.conn.executescript(UNIQUE_KEY_INDEX)
+
+    def _migrate_reminder_history(self):
+        # 旧版 reminder_history 表导入提醒台账后删除
+        if self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'reminder_history'").fetchone():
+            ids = [row[0] for row in self.conn.execute("SELECT reminder_id FROM reminder_history")]
+            self.ledger.import_legacy_ids(ids)
+            with self.conn:
+                self.conn.execute("DROP TABLE reminder_history")
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # 专利数据
+    @staticmethod
+    def _patent_rows(df):
+        import numpy as np
+        import pandas as pd
+
+        extra_columns = [col for col in df.columns if col not in PATENT_COLUMNS]
+        names = df['专利名称'].astype(str)
+        numbers = df['专利号'].astype(str)
+        deadlines = pd.to_datetime(df['缴费截止日期']).dt.strftime('%Y-%m-%d')
+        # 金额统一为 float64、缺失统一为 NaN：同一数据按块（整数列 / 含小数的列）或
+        # 按文件类型（CSV / Excel）读出的 dtype 不同，不能让行哈希随之变化
+        amounts = pd.Series(pd.to_numeric(df['缴费金额'], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan),
+                            index=df.index)
+        amounts[amounts.isna()] = np.nan
+        if extra_columns:
+            extras = pd.Series(
+                [json.dumps({key: _json_value(value) for key, value in x.items()}, ensure_ascii=False, default=str)
+                 for x in df[extra_columns].astype(object).where(df[extra_columns].notna(), None).to_dict('records')],
+                index=df.index)
+        else:
+            extras = pd.Series(None, index=df.index, dtype=object)
+        # 行哈希：按列向量化计算，用于判断行内容是否变化
+        row_hashes = pd.util.hash_pandas_object(
+            pd.DataFrame({'n': names, 'k': numbers, 'd': deadlines, 'a': amounts, 'e': extras}),
+            index=False).to_numpy().view(np.int64)
+        return [
+            (name, number, deadline,
+             None if pd.isna(amount) else float(amount), extra, int(row_hash))
+            for name, number, deadline, amount, extra, row_hash in zip(
+                names, numbers, deadlines, amounts, extras, row_hashes)
+        ]
+
+    def _stage(self, chunks):
+        # 写入暂存表，文件内重复的 (专利号, 缴费截止日期) 以最后一行为准
+        self.conn.execute(STAGING_SCHEMA)
+        self.conn.execute("DELETE FROM upload_rows")
+        for df in chunks:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO upload_rows"
+                "(专利名称, 专利号, 缴费截止日期, 缴费金额, extra, row_hash) "
+                "VALUES (?, ?, ?, ?, ?, ?)", self._patent_rows(df))
+
+    def _staged_diff(self):
+        """比较暂存表与现有数据，返回 (新增, 变化, 未变化) 行数"""
+        added, changed, unchanged = self.conn.execute("""
+            SELECT
+                SUM(p.id IS NULL),
+                SUM(p.id IS NOT NULL AND (p.row_hash IS NOT u.row_hash OR p.deleted_at IS NOT NULL)),
+                SUM(p.id IS NOT NULL AND p.row_hash IS u.row_hash AND p.deleted_at IS NULL)
+            FROM upload_rows u
+            LEFT JOIN patents p ON p.专利号 = u.专利号 AND p.缴费截止日期 = u.缴费截止日期
+        """).fetchone()
+        return added or 0, changed or 0, unchanged or 0
+
+    @timed('save')
+    def import_patents_chunks(self, chunks, merge=False, tombstone=False, file_hash=None):
+        """在同一事务内导入专利数据并返回差异统计
+
+        merge=False：替换全部数据；merge=True：只插入新增行、更新变化行，
+        tombstone=True 时把本次文件中不存在的专利标记为已删除。
+        任一块失败则整体回滚；数据有变化时递增 dataset_version。
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.conn:
+            self._stage(chunks)
+            added, changed, unchanged = self._staged_diff()
+            if merge:
+                removed = 0
+                self.conn.execute("""
+                    INSERT INTO patents(专利名称, 专利号, 缴费截止日期, 缴费金额, extra, row_hash)
+                    SELECT 专利名称, 专利号, 缴费截止日期, 缴费金额, extra, row_hash
+                    FROM upload_rows WHERE true
+                    ON CONFLICT(专利号, 缴费截止日期) DO UPDATE SET
+                        专利名称 = excluded.专利名称,
+                        缴费金额 = excluded.缴费金额,
+                        extra = excluded.extra,
+                        row_hash = excluded.row_hash,
+                        deleted_at = NULL
+                    WHERE patents.row_hash IS NOT excluded.row_hash OR patents.deleted_at IS NOT NULL
+                """)
+                if tombstone:
+                    removed = self.conn.execute("""
+                        UPDATE patents SET deleted_at = ?
+                        WHERE deleted_at IS NULL AND NOT EXISTS (
+                            SELECT 1 FROM upload_rows u
+                            WHERE u.专利号 = patents.专利号 AND u.缴费截止日期 = patents.缴费截止日期)
+                    """, (now,)).rowcount
+            else:
+                removed = self.conn.execute("""
+                    SELECT COUNT(*) FROM patents p
+                    WHERE p.deleted_at IS NULL AND NOT EXISTS (
+                        SELECT 1 FROM upload_rows u
+                        WHERE u.专利号 = p.专利号 AND u.缴费截止日期 = p.缴费截止日期)
+                """).fetchone()[0]
+                self.conn.execute("DELETE FROM patents")
+                self.conn.execute("""
+                    INSERT INTO patents(专利名称, 专利号, 缴费截止日期, 缴费金额, extra, row_hash)
+                    SELECT 专利名称, 专利号, 缴费截止日期, 缴费金额, extra, row_hash FROM upload_rows
+                """)
+            self.conn.execute("DELETE FROM upload_rows")
+            if added or changed or removed:
+                self._bump_dataset_version()
+            if removed or changed:
+                # 专利已删除或截止日期已被更新的提醒台账条目随数据一起清理
+                self._prune_ledger()
+            if file_hash:
+                self.conn.execute(
+                    "INSERT INTO app_settings(key, value) VALUES ('last_file_hash', ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (json.dumps(file_hash),))
+        return {'added': added, 'changed': changed, 'unchanged': unchanged, 'removed': removed}
+
+    def _prune_ledger(self):
+        # 台账中的截止日期按年费规则与工作日历计算，不早于表格中的日期（见 annuity.py），
+        # 因此只要该专利仍有表格日期不晚于台账日期的行，条目就仍然有效；
+        # 专利已删除、或表格已推进到之后的年度（已缴费）时清理。不按时间清理：
+        # 长期逾期仍在表格中的专利必须保留"已提醒"记录，否则会重复发送
+        self.conn.execute("""
+            DELETE FROM reminder_ledger
+            WHERE NOT EXISTS (
+                SELECT 1 FROM patents p
+                WHERE p.专利号 = reminder_ledger.专利号 AND p.deleted_at IS NULL
+                  AND p.缴费截止日期 <= reminder_ledger.deadline)
+        """)
+        self.ledger.invalidate()
+
+    def _bump_dataset_version(self):
+        # 与数据写入处于同一事务，读到新数据时必然读到新版本号
+        self.conn.execute(
+            "INSERT INTO app_settings(key, value) VALUES ('dataset_version', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+        # 随机令牌与版本号一起标识数据快照（见 dataset.py），数据库重建后不会误用旧快照
+        self.conn.execute(
+            "INSERT INTO app_settings(key, value) VALUES ('dataset_token', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (json.dumps(uuid.uuid4().hex),))
+
+    def replace_patents(self, df):
+        """整体替换专利数据"""
+        return self.import_patents_chunks([df])
+
+    def load_patents(self):
+        """读取全部专利数据，无数据时返回 None"""
+        import pandas as pd
+
+        df = pd.read_sql_query(
+            "SELECT 专利名称, 专利号, 缴费截止日期, 缴费金额, extra FROM patents "
+            "WHERE deleted_at IS NULL ORDER BY id",
+            self.conn)
+        if df.empty:
+            return None
+        df['缴费截止日期'] = pd.to_datetime(df['缴费截止日期'])
+        extra = df.pop('extra')
+        if extra.notna().any():
+            extra_df = pd.DataFrame([json.loads(x) if x else {} for x in extra], index=df.index)
+            df = df.join(extra_df)
+        return df
+
+    def patent_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM patents WHERE deleted_at IS NULL").fetchone()[0]
+
+    # 发件箱
+    def enqueue_outbox(self, recipient, subject, message):
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO outbox(recipient, subject, message, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)", (recipient, subject, message, now, now))
+        return cur.lastrowid
+
+    def due_outbox(self, now=None, limit=500):
+        """到期待发送的邮件 (id, recipient, message, attempts)，按入队顺序"""
+        now = (now or datetime.now()).isoformat(timespec='seconds')
+        return self.conn.execute(
+            "SELECT id, recipient, message, attempts FROM outbox "
+            "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (now, limit)).fetchall()
+
+    def claim_outbox(self, outbox_id, now=None):
+        """发送前认领一封到期邮件（把下次尝试时间推后 OUTBOX_CLAIM_SECONDS），返回是否认领成功
+
+        条件更新保证同一封邮件只有一个进程能认领：读取 due_outbox 之后
+        已被其他进程认领或发出的邮件返回 False。
+        """
+        until = datetime.now() + timedelta(seconds=settings.OUTBOX_CLAIM_SECONDS)
+        with self.conn:
+            cur = self.conn.execute(
+                "UPDATE outbox SET next_attempt_at = ? "
+                "WHERE id = ? AND status = 'pending' AND next_attempt_at <= ?",
+                (until.isoformat(timespec='seconds'), outbox_id,
+                 (now or datetime.now()).isoformat(timespec='seconds')))
+        return cur.rowcount == 1
+
+    def mark_outbox_sent(self, outbox_id):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = 'sent', sent_at = ?, attempts = attempts + 1, "
+                "last_error = NULL WHERE id = ?",
+                (datetime.now().isoformat(timespec='seconds'), outbox_id))
+
+    def mark_outbox_retry(self, outbox_id, next_attempt_at, error):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? "
+                "WHERE id = ?", (next_attempt_at.isoformat(timespec='seconds'), error, outbox_id))
+
+    def mark_outbox_failed(self, outbox_id, error):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = 'failed', attempts = attempts + 1, last_error = ? "
+                "WHERE id = ?", (error, outbox_id))
+
+    def outbox_depth(self):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+
+    def pending_recipients(self):
+        return {row[0] for row in self.conn.execute(
+            "SELECT DISTINCT recipient FROM outbox WHERE status = 'pending'")}
+
+    # 提醒记录（台账 + 对应邮件的发送状态）
+    def reminder_history_version(self):
+        """提醒记录的版本标识（条目数与最近提醒时间），用于导出缓存"""
+        return self.conn.execute(
+            "SELECT COUNT(*), MAX(notified_at), (SELECT MAX(sent_at) FROM outbox) FROM reminder_ledger").fetchone()
+
+    def reminder_history_chunks(self, chunksize):
+        """按提醒时间分块读取提醒记录，返回 DataFrame 迭代器"""
+        import pandas as pd
+
+        return pd.read_sql_query(
+            "SELECT l.专利号, l.deadline AS 缴费截止日期, l.tier AS 提醒档位, l.recipient AS 收件人, "
+            "l.notified_at AS 提醒时间, "
+            "CASE o.status WHEN 'sent' THEN '已发送' WHEN 'failed' THEN '发送失败' "
+            "WHEN 'pending' THEN '待发送' END AS 发送状态, o.sent_at AS 发送时间, o.last_error AS 错误信息 "
+            "FROM reminder_ledger l LEFT JOIN outbox o ON o.id = l.outbox_id ORDER BY l.notified_at",
+            self.conn, chunksize=chunksize)
+
+    # 事件日志
+    def insert_events(self, rows):
+        """rows 为按 events.COLUMNS 顺序排列的元组，末尾附加 data（JSON）"""
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO events({', '.join(EVENT_COLUMNS)}, data) "
+                f"VALUES ({', '.join('?' * (len(EVENT_COLUMNS) + 1))})", rows)
+
+    def query_events(self, since, kind=None, failed_only=False, limit=200):
+        """since 之后的事件（新的在前），返回字典列表"""
+        sql = f"SELECT {', '.join(EVENT_COLUMNS)}, data FROM events WHERE ts >= ?"
+        params = [since.isoformat(timespec='milliseconds')]
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        if failed_only:
+            sql += " AND success = 0"
+        rows = self.conn.execute(sql + " ORDER BY ts DESC LIMIT ?", params + [limit]).fetchall()
+        return [dict(zip(EVENT_COLUMNS + ('data',), row)) for row in rows]
+
+    def event_summary(self, since):
+        """since 之后各类事件的 {kind: {'total', 'succeeded', 'failed', 'avg_latency_ms'}}"""
+        rows = self.conn.execute(
+            # 指定按时间索引做区间扫描（否则 GROUP BY 会让查询计划改为扫描整个 (kind, ts) 索引）
+            "SELECT kind, COUNT(*), SUM(success = 1), SUM(success = 0), AVG(latency_ms) "
+            "FROM events INDEXED BY idx_events_ts WHERE ts >= ? GROUP BY kind",
+            (since.isoformat(timespec='milliseconds'),)).fetchall()
+        return {
+            kind: {'total': total, 'succeeded': ok or 0, 'failed': failed or 0, 'avg_latency_ms': latency}
+            for kind, total, ok, failed, latency in rows
+        }
+
+    # 收件人发送状态
+    def recipient_states(self):
+        """{收件人: {'next_scheduled_send': ..., 'last_email_sent_time': ...}}"""
+        return {
+            recipient: {
+                'next_scheduled_send': _decode('next_scheduled_send', next_send),
+                'last_email_sent_time': _decode('last_email_sent_time', last_sent),
+            }
+            for recipient, next_send, last_sent in self.conn.execute(
+                "SELECT recipient, next_scheduled_send, last_email_sent_time FROM recipient_state")
+        }
+
+    def update_recipient_states(self, states):
+        """批量更新收件人状态，states 为 {收件人: {字段: 值}}，未给出的字段保持不变"""
+        with self.conn:
+            for recipient, fields in states.items():
+                self.conn.execute(
+                    "INSERT INTO recipient_state(recipient) VALUES (?) "
+                    "ON CONFLICT(recipient) DO NOTHING", (recipient,))
+                for key in ('next_scheduled_send', 'last_email_sent_time'):
+                    if key in fields:
+                        self.conn.execute(
+                            f"UPDATE recipient_state SET {key} = ? WHERE recipient = ?",
+                            (_encode(fields[key]), recipient))
+
+    # 邮箱配置
+    def load_email_config(self):
+        config = dict(settings.DEFAULT_EMAIL_CONFIG)
+        config.update(self.settings.get('email_config', {}))
+        return config
+
+    def save_email_config(self, config):
+        self.settings.set('email_config', config)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path=None):
+    """按路径复用存储对象（进程内单例）"""
+    path = path or settings.DB_FILE
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = PatentStore(path)
+        return _stores[path]
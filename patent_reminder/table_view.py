@@ -0,0 +1,77 @@
+"""专利表格的服务端搜索、筛选、排序与分页
+
+整表只在服务端按列向量化处理，浏览器只接收当前页；
+状态底色按列一次生成，不再对每行调用 Python 函数。
+关键字搜索使用检索索引（见 search.py）时按匹配度排序（「相关度」）。
+"""
+import numpy as np
+import pandas as pd
+
+from .render import STATUS_COLORS
+
+PAGE_SIZES = (20, 50, 100, 200)
+RELEVANCE = '相关度'
+SORT_COLUMNS = ['缴费截止日期', '距离到期天数', '缴费金额', '专利号', '专利名称', RELEVANCE]
+# 这两列与到期日索引的排序一致，可直接使用索引中的行置换
+_INDEX_SORTED = {'缴费截止日期', '距离到期天数'}
+
+
+def filter_mask(df, search='', statuses=None, matches=None):
+    """按关键字（专利号 / 专利名称，不区分大小写）与状态筛选，返回布尔数组
+
+    matches 为检索索引返回的行位置时直接使用，不再逐行匹配关键字。
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if statuses:
+        mask &= df['状态'].isin(statuses).to_numpy()
+    text = (search or '').strip()
+    if matches is not None:
+        found = np.zeros(len(df), dtype=bool)
+        found[matches] = True
+        mask &= found
+    elif text:
+        mask &= (df['专利号'].astype(str).str.contains(text, case=False, regex=False)
+                 | df['专利名称'].astype(str).str.contains(text, case=False, regex=False)).to_numpy()
+    return mask
+
+
+def sorted_positions(df, mask, sort_by='缴费截止日期', ascending=True, index=None, matches=None):
+    """满足筛选条件的行位置，按 sort_by 排序
+
+    按相关度排序时 matches 为按匹配度排好的行位置；没有搜索时按截止日期排序。
+    """
+    if sort_by == RELEVANCE and matches is None:
+        sort_by = '缴费截止日期'
+    if sort_by == RELEVANCE:
+        # 相关度高的在前；matches 之外的行会被 mask 排除
+        order = np.asarray(matches)
+    elif sort_by in _INDEX_SORTED and index is not None:
+        order = index.order
+    else:
+        order = np.argsort(df[sort_by].to_numpy(), kind='stable')
+    if not ascending:
+        order = order[::-1]
+    return order[mask[order]]
+
+
+def page_count(total, page_size):
+    return max(1, -(-total // page_size))
+
+
+def page_positions(positions, page, page_size):
+    """第 page 页（从 1 开始，超出范围时取最后一页）的行位置"""
+    page = min(max(1, page), page_count(len(positions), page_size))
+    start = (page - 1) * page_size
+    return positions[start:start + page_size]
+
+
+def status_styles(page_df):
+    """按状态列一次生成整页的底色样式（供 Styler.apply(axis=None) 使用）"""
+    colors = page_df['状态'].map(STATUS_COLORS)
+    css = ('background-color: ' + colors).where(colors.notna(), '').to_numpy()
+    return pd.DataFrame(np.repeat(css[:, None], page_df.shape[1], axis=1),
+                        index=page_df.index, columns=page_df.columns)
+
+
+def style_page(page_df):
+    return page_df.style.apply(status_styles, axis=None)
@@ -0,0 +1,115 @@
+"""多租户工作区：一个进程服务多个客户，各客户的数据与配置互相隔离
+
+- 默认工作区（DEFAULT_WORKSPACE）使用原来的 settings.DB_FILE，单客户部署不受影响
+- 其他工作区位于 settings.WORKSPACES_DIR/<名称>/，各有独立的数据库（专利数据、提醒台账、
+  邮箱配置、提醒天数都在各自数据库中）、数据快照与事件日志文件
+- 所有工作区共用一个调度器、一个后台任务队列（见 jobs.py）与按 SMTP 账号复用的连接池；
+  任务队列按工作区配额限制同时执行的任务数，一个客户的大批量发送不会占满全部线程
+- 工作区对象只保存名称与路径，数据库连接与数据缓存在首次使用时才建立
+
+不依赖 pandas，可在调度器、健康检查中直接使用。
+"""
+import os
+import re
+import threading
+
+from . import settings
+
+DEFAULT_WORKSPACE = 'default'
+DB_NAME = "patent_reminder.db"
+
+# 工作区名称同时用作目录名：字母、数字、汉字、下划线与短横线
+_NAME_PATTERN = re.compile(r'\w[\w-]{0,63}')
+
+
+class WorkspaceError(ValueError):
+    """工作区名称无效或工作区不存在"""
+
+
+class Workspace:
+    """单个工作区（只保存名称与数据库路径）"""
+
+    def __init__(self, name, db_path):
+        self.name = name
+        self.db_path = db_path
+
+    @property
+    def store(self):
+        from .store import get_store
+
+        return get_store(self.db_path)
+
+    @property
+    def max_jobs(self):
+        """本工作区同时执行的任务数配额"""
+        return self.store.settings.get('max_concurrent_jobs', settings.WORKSPACE_MAX_JOBS)
+
+    def set_max_jobs(self, limit):
+        self.store.settings.set('max_concurrent_jobs', max(1, int(limit)))
+
+    def submit(self, name, func, *args):
+        """在共用的任务队列中执行 func(store, *args, cancel=...)，受本工作区配额限制"""
+        from .jobs import get_queue
+
+        return get_queue().submit(name, func, self.store, *args, workspace=self.name, limit=self.max_jobs)
+
+    def __repr__(self):
+        return f"Workspace({self.name!r})"
+
+
+def _validate(name):
+    if not isinstance(name, str) or not _NAME_PATTERN.fullmatch(name):
+        raise WorkspaceError(f"工作区名称无效：{name!r}（只能包含字母、数字、汉字、下划线和短横线）")
+    return name
+
+
+def _db_path(name):
+    if name == DEFAULT_WORKSPACE:
+        return settings.DB_FILE
+    return os.path.join(settings.WORKSPACES_DIR, name, DB_NAME)
+
+
+def workspace_names():
+    """所有工作区名称，默认工作区在前，其余按名称排序"""
+    try:
+        entries = os.listdir(settings.WORKSPACES_DIR)
+    except FileNotFoundError:
+        entries = []
+    names = sorted(name for name in entries if name != DEFAULT_WORKSPACE and _NAME_PATTERN.fullmatch(name)
+                   and os.path.exists(os.path.join(settings.WORKSPACES_DIR, name, DB_NAME)))
+    return [DEFAULT_WORKSPACE, *names]
+
+
+_workspaces = {}
+_workspaces_lock = threading.Lock()
+
+
+def get_workspace(name=None):
+    """按名称取得工作区（进程内单例），name 为空时返回默认工作区"""
+    name = _validate(name or DEFAULT_WORKSPACE)
+    with _workspaces_lock:
+        workspace = _workspaces.get(name)
+        if workspace is None:
+            path = _db_path(name)
+            if name != DEFAULT_WORKSPACE and not os.path.exists(path):
+                raise WorkspaceError(f"工作区不存在：{name}")
+            workspace = _workspaces[name] = Workspace(name, path)
+        return workspace
+
+
+def create_workspace(name, max_jobs=None):
+    """新建工作区（已存在时直接返回），创建目录与数据库"""
+    name = _validate(name)
+    if name != DEFAULT_WORKSPACE:
+        os.makedirs(os.path.dirname(_db_path(name)), exist_ok=True)
+    from .store import get_store
+
+    get_store(_db_path(name))
+    workspace = get_workspace(name)
+    if max_jobs is not None:
+        workspace.set_max_jobs(max_jobs)
+    return workspace
+
+
+def all_workspaces():
+    return [get_workspace(name) for name in workspace_names()]
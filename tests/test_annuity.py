@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from patent_reminder.annuity import annuity_columns
+from patent_reminder.deadline_index import STATUS_EXPIRED, STATUS_NORMAL, STATUSES, status_codes_for
+
+TODAY = pd.Timestamp('2026-10-17').date()
+
+
+def _columns(deadline, filing, patent_type):
+    df = pd.DataFrame({'缴费截止日期': pd.to_datetime([deadline]), '申请日': [filing], '专利类型': [patent_type]})
+    return annuity_columns(df, TODAY)
+
+
+def test_paid_year_is_not_pulled_back():
+    # 表格已推进到下一年度：不退回已缴的 2026 年度
+    result = _columns('2027-05-05', '2023-05-05', '外观设计')
+    assert result['缴费截止日期'][0] == pd.Timestamp('2027-05-05')
+    assert result['滞纳金'][0] == 0
+
+
+def test_unpaid_row_past_grace_stays_expired():
+    # 2025-01-02 未缴且宽限期已过：保持该年度并判为已过期，不跳到 2027 年
+    result = _columns('2025-01-02', '2020-01-02', '发明')
+    due = result['缴费截止日期'].to_numpy(dtype='datetime64[D]')
+    assert due[0] == np.datetime64('2025-01-02')
+    assert result['年费年度'][0] == 6
+    assert result['宽限期截止日'][0] < pd.Timestamp(TODAY)
+    assert STATUSES[status_codes_for(due, 30, TODAY)[0]] == STATUS_EXPIRED
+
+
+def test_row_without_filing_date_keeps_sheet_deadline():
+    result = _columns('2027-03-01', None, '发明')
+    due = result['缴费截止日期'].to_numpy(dtype='datetime64[D]')
+    assert due[0] == np.datetime64('2027-03-01')
+    assert STATUSES[status_codes_for(due, 30, TODAY)[0]] == STATUS_NORMAL
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from patent_reminder.store import PatentStore
+
+
+def _frame(amounts):
+    return pd.DataFrame({
+        '专利名称': ['甲', '乙', '丙'],
+        '专利号': ['ZL1', 'ZL2', 'ZL3'],
+        '缴费截止日期': ['2026-12-01', '2026-12-02', '2026-12-03'],
+        '缴费金额': amounts,
+    })
+
+
+def test_merge_reupload_with_one_amount_changed(tmp_path):
+    store = PatentStore(str(tmp_path / "patents.db"))
+    store.import_patents_chunks([_frame([900, 1200, 600])])
+    # 一个金额改为小数后整列变为 float64，其余两行内容不变
+    diff = store.import_patents_chunks([_frame([900.5, 1200, 600])], merge=True)
+    assert (diff['added'], diff['changed'], diff['unchanged']) == (0, 1, 2)
+
+
+def test_integer_and_float_amounts_hash_the_same(tmp_path):
+    store = PatentStore(str(tmp_path / "patents.db"))
+    store.import_patents_chunks([_frame([900, 1200, None])])
+    diff = store.import_patents_chunks([_frame([900.0, 1200.0, float('nan')])], merge=True)
+    assert (diff['changed'], diff['unchanged']) == (0, 3)